@@ -1,11 +1,35 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, session, send_file
-from models import db, CaseSearch, CaseDetail, Party, CourtOrder
+from flask import Flask, request, jsonify, render_template, send_from_directory, session, send_file, Response, stream_with_context, abort
+from models import db, ensure_indexes, CaseSearch, CaseDetail, Party, CourtOrder, ScrapeJob, WatchedCase, CaseChange
 from config import Config
-import os, traceback, logging, random, time, uuid
-from datetime import datetime
-from scraper_fixed import CourtScraper
+import base64, os, traceback, logging, random, threading, time, uuid, json, tempfile
+from datetime import datetime, timedelta
+from driver_pool import get_pool, PoolExhausted
+from jobs import get_job_queue, TERMINAL_STATES
+from cause_cache import get_cause_cache
+from cause_prefetch import (get_cause_prefetcher, make_prefetcher, list_params, load_entries, store_entries,
+                            parse_filters as parse_cause_filters, filter_entries)
+from fetch_backends import fetch_stats, get_http_backend
+from raw_store import RawStore, iter_raw
+from cause_parser import iter_cause_list
+from batch_search import KEY_FIELDS, dedupe, run_batch
+from persistence import configure_sqlite, save_case_graph
+from case_documents import CaseDocumentCache
+from pdf_downloader import PdfDownloader
+from pdf_text import TextExtractor
+from backfill import Backfill
+from single_flight import get_single_flight
+from watchlist import WatchError, add_watch, get_watcher, make_watcher
+from hearings import HearingQueryError, hearing_page, parse_filters as parse_hearing_filters, stream_ics
+from export import (FORMATS as EXPORT_FORMATS, DATASETS as EXPORT_DATASETS, MIMETYPES as EXPORT_MIMETYPES,
+                    ExportError, build_query, parse_filters, stream_csv, write_xlsx, write_parquet)
+from search_index import ensure_search_index, rebuild_search_index, search_orders, SearchQueryError, SearchUnavailable
+from sqlalchemy.orm import joinedload
+from rate_limit import get_governor, CircuitOpenError, RateLimitTimeout
+import click
 # Import from the root directory since captcha.py is there
-from captcha import generate_captcha
+from captcha import get_captcha_pool
+import metrics
+from metrics import CACHE_LOOKUPS, stage
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -13,148 +37,391 @@ app.config.from_object(Config)
 # Add session secret key
 app.secret_key = os.environ.get('SECRET_KEY') or 'dev-key-please-change-in-production'
 
-# Configure upload and captcha directories
+# Configure upload directory; CAPTCHA_FOLDER only holds files from the old on-disk CAPTCHAs
 app.config['UPLOAD_FOLDER'] = os.path.join('static', 'uploads')
 app.config['CAPTCHA_FOLDER'] = os.path.join('static', 'captcha')
 
-# Ensure all required directories exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['CAPTCHA_FOLDER'], exist_ok=True)
-os.makedirs(app.config['DOWNLOAD_FOLDER'], exist_ok=True)
-os.makedirs(os.path.join(app.root_path, 'static', 'css'), exist_ok=True)
-os.makedirs(os.path.join(app.root_path, 'static', 'js'), exist_ok=True)
-
 # Initialize database
 db.init_app(app)
+configure_sqlite(app)
+
+# Request timings and /metrics; installed first so its timer wraps the other hooks
+metrics.install(app, server_timing=app.config['SERVER_TIMING'])
+
+# Rendered case documents, invalidated when their rows are written
+case_documents = CaseDocumentCache(max_entries=app.config['CASE_DOC_CACHE_SIZE'],
+                                   ttl=app.config['CASE_DOC_CACHE_TTL'])
+case_documents.install()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-app.logger.setLevel(logging.INFO)
+def configure_logging():
+    handlers = [logging.StreamHandler()]
+    if app.config.get('LOG_FILE'):
+        handlers.append(logging.FileHandler(app.config['LOG_FILE']))
+    logging.basicConfig(level=logging.INFO, handlers=handlers)
+    app.logger.setLevel(logging.INFO)
 
-# Initialize database
+configure_logging()
+
+# Importing the app does no schema work or filesystem setup so that new
+# workers start quickly; run `flask --app app init-db` once per deployment.
 def init_db():
+    """Create tables, indexes, the search index and working directories."""
+    for folder in (app.config['UPLOAD_FOLDER'], app.config['DOWNLOAD_FOLDER'], app.instance_path):
+        os.makedirs(folder, exist_ok=True)
     with app.app_context():
         db.create_all()
+        ensure_indexes()
+        ensure_search_index()
 
-# Initialize the database when the app starts
-init_db()
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database schema and working directories."""
+    init_db()
+    click.echo("Database initialized")
 
 # Routes
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def run_case_search(params, progress=None):
+    """Scrape one case and persist the result. Returns (CaseSearch id, scraped data).
+
+    Identical lookups already in flight in this or another worker are joined
+    instead of scraped again; they share the resulting search.
+    """
+    progress = progress or (lambda stage: None)
+    key = '|'.join(str(params.get(f) or '') for f in KEY_FIELDS)
+    return get_single_flight(app).run(key, lambda: scrape_case(params, progress), load_search_result,
+                                      on_wait=lambda: progress('waiting_for_identical_lookup'))
+
+def load_search_result(search_id):
+    """(search id, case data) for a search stored by a lookup this one was coalesced with."""
+    doc = get_case_document(search_id)
+    return search_id, {'case_details': doc['case'], 'parties': doc['parties'], 'orders': doc['orders'],
+                       'raw_response_path': doc['raw_path'], 'fetched_at': doc['fetched_at'], 'coalesced': True}
+
+def scrape_case(params, progress):
+    case_type, case_number, year = params['case_type'], params['case_number'], params['year']
+    court_type = params.get('court_type', 'high_court')
+
+    progress('waiting_for_scraper')
+    with get_pool(app.config).scraper() as scraper:
+        progress('scraping')
+        case_data = scraper.fetch_case_details(case_type, case_number, year, court_type=court_type, state=params.get('state'))
+
+    progress('saving')
+    with stage('db_persist'):
+        search = save_case_graph(params, case_data)
+    return search.id, case_data
+
+def case_document(search):
+    """JSON projection of a stored search with its details, parties and orders."""
+    details = search.details
+    case = None
+    if details:
+        case = dict(details.to_dict(), case_type=search.case_type, case_number=search.case_number,
+                    year=search.year, status=details.case_status)
+    return {
+        'search_id': search.id,
+        'case_id': details.id if details else None,
+        'court_type': search.court_type,
+        'fetched_at': search.search_date.isoformat() if search.search_date else None,
+        'raw_path': search.raw_response_path,
+        'case': case,
+        'parties': [p.to_dict() for p in details.parties] if details else [],
+        'orders': [o.to_dict() for o in details.orders] if details else []
+    }
+
+def load_case_document(search_id):
+    """Load a search's whole case graph in two queries and project it."""
+    search = (CaseSearch.query
+              .options(joinedload(CaseSearch.details).joinedload(CaseDetail.parties),
+                       joinedload(CaseSearch.details).selectinload(CaseDetail.orders))
+              .filter_by(id=search_id)
+              .first())
+    return case_document(search) if search else None
+
+def get_case_document(search_id):
+    return case_documents.get(search_id, load_case_document)
+
+def find_fresh_search(params):
+    """Latest stored search for these case keys that is still within the court's max age."""
+    court_type = params.get('court_type', 'high_court')
+    max_age = app.config['CASE_MAX_AGE'].get(court_type, app.config['CASE_DEFAULT_MAX_AGE'])
+    if max_age <= 0:
+        return None
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    return (CaseSearch.query
+            .filter_by(case_type=params['case_type'], case_number=str(params['case_number']),
+                       year=int(params['year']), court_type=court_type)
+            .filter(CaseSearch.search_date >= cutoff)
+            .filter(CaseSearch.details.has())
+            .order_by(CaseSearch.search_date.desc())
+            .first())
+
+def lookup_case(params, force_refresh=False):
+    """Serve a fresh stored result if there is one, otherwise scrape."""
+    fresh = None
+    if not force_refresh:
+        with stage('db_lookup'):
+            fresh = find_fresh_search(params)
+        CACHE_LOOKUPS.inc(cache='case_lookup', result='hit' if fresh is not None else 'miss')
+    if fresh is not None:
+        doc = get_case_document(fresh.id)
+        return fresh.id, {'case_details': doc['case'], 'parties': doc['parties'], 'orders': doc['orders'],
+                          'raw_response_path': doc['raw_path'], 'fetched_at': doc['fetched_at'], 'cached': True}
+    return run_case_search(params)
+
+def _run_case_search_job(params, progress=None):
+    search_id, _ = run_case_search(params, progress=progress)
+    return search_id
+
+def job_queue():
+    return get_job_queue(app, _run_case_search_job)
+
+_workers_started = False
+_workers_lock = threading.Lock()
+
+@app.before_request
+def start_background_workers():
+    # Starting on the first request (rather than at import) keeps CLI usage
+    # free of worker threads while still resuming persisted jobs promptly.
+    # Later requests only check the flag.
+    global _workers_started
+    if _workers_started:
+        return
+    with _workers_lock:
+        if not _workers_started:
+            job_queue()
+            get_captcha_pool(app.config)
+            get_cause_prefetcher(app, fetch_cause_list)
+            watcher()
+            _workers_started = True
+
 @app.route('/api/search', methods=['POST'])
 def search_case():
     if not request.is_json:
         return jsonify({'success': False, 'error': 'Request must be JSON'}), 400
     data = request.get_json()
-    case_type = data.get('case_type')
-    case_number = data.get('case_number')
-    year = data.get('year')
-    court_type = data.get('court_type', 'high_court')
-    state = data.get('state')
+    params = {
+        'case_type': data.get('case_type'),
+        'case_number': data.get('case_number'),
+        'year': data.get('year'),
+        'court_type': data.get('court_type', 'high_court'),
+        'state': data.get('state')
+    }
 
-    if not all([case_type, case_number, year]):
+    if not all([params['case_type'], params['case_number'], params['year']]):
         return jsonify({'success': False, 'error': 'Missing required fields'}), 400
-
     try:
-        search = CaseSearch(case_type=case_type, case_number=case_number, year=int(year), court_type=court_type)
-        db.session.add(search)
-        db.session.commit()
-
-        scraper = CourtScraper(headless=True, download_dir=app.config['DOWNLOAD_FOLDER'])
-        try:
-            case_data = scraper.fetch_case_details(case_type, case_number, year, court_type=court_type, state=state)
-        finally:
-            scraper.close()
+        int(params['year'])
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Year must be a number'}), 400
 
-        raw_path = case_data.get('raw_response_path')
-        if raw_path:
-            search.raw_response_path = raw_path
-            db.session.commit()
+    force_refresh = bool(data.get('force_refresh'))
+    if data.get('async'):
+        fresh = None if force_refresh else find_fresh_search(params)
+        if fresh is not None:
+            return jsonify(dict(get_case_document(fresh.id), success=True, cached=True))
+        job = job_queue().submit(params)
+        return jsonify({'success': True, 'job_id': job.id, 'status': job.status,
+                        'status_url': f"/api/jobs/{job.id}"}), 202
 
-        try:
-            saved_case = save_case_details(search.id, case_data.get('case_details', {}))
-            for p in case_data.get('parties', []):
-                party = Party(case_id=saved_case.id, party_type=p.get('type'), name=p.get('name'), advocate_name=p.get('advocate'))
-                db.session.add(party)
-            for o in case_data.get('orders', []):
-                order = CourtOrder(case_id=saved_case.id, order_type=o.get('order_type'),
-                                   order_text=o.get('order_text'), pdf_url=o.get('pdf_url'),
-                                   local_pdf_path=o.get('local_pdf_path'))
-                db.session.add(order)
-            db.session.commit()
-        except Exception:
-            app.logger.error("Failed to save parsed details: %s", traceback.format_exc())
-
-        return jsonify({'success': True, 'search_id': search.id, 'case': case_data.get('case_details', {}), 'raw_path': raw_path})
+    try:
+        search_id, case_data = lookup_case(params, force_refresh=force_refresh)
+        return jsonify({'success': True, 'search_id': search_id, 'case': case_data.get('case_details', {}),
+                        'parties': case_data.get('parties', []), 'orders': case_data.get('orders', []),
+                        'raw_path': case_data.get('raw_response_path'),
+                        'fetch_backend': case_data.get('fetch_backend'),
+                        'cached': case_data.get('cached', False),
+                        'coalesced': case_data.get('coalesced', False),
+                        'fetched_at': case_data.get('fetched_at')})
 
+    except PoolExhausted as e:
+        db.session.rollback()
+        app.logger.warning("Driver pool exhausted: %s", e)
+        return jsonify({'success': False, 'error': 'Scraper busy, please retry'}), 503
+    except (CircuitOpenError, RateLimitTimeout) as e:
+        db.session.rollback()
+        app.logger.warning("Court site unavailable: %s", e)
+        return jsonify({'success': False, 'error': 'Court site is unavailable, please retry later'}), 503
     except Exception as e:
         db.session.rollback()
         app.logger.error(traceback.format_exc())
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/search/batch', methods=['POST'])
+def search_case_batch():
+    """Look up many cases at once; identical entries are fetched only once"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('cases')
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': '"cases" must be a non-empty list'}), 400
+    if len(items) > app.config['BATCH_MAX_ITEMS']:
+        return jsonify({'success': False, 'error': f"At most {app.config['BATCH_MAX_ITEMS']} cases per batch"}), 400
+
+    if data.get('async'):
+        # Queue one job per unique case; progress is polled per job.
+        unique, results = dedupe(items)
+        queue = job_queue()
+        for group in unique.values():
+            job = queue.submit(group['params'])
+            results.append({'indexes': group['indexes'], 'request': group['params'], 'success': True,
+                            'job_id': job.id, 'status_url': f"/api/jobs/{job.id}"})
+        results.sort(key=lambda r: r['indexes'][0])
+        return jsonify({'success': True, 'results': results,
+                        'summary': {'total': len(items), 'unique': len(unique)}}), 202
+
+    force_refresh = bool(data.get('force_refresh'))
+    results, summary = run_batch(
+        app, items, lambda params: lookup_case(params, force_refresh=force_refresh),
+        max_workers=app.config['BATCH_MAX_WORKERS'],
+        court_limits=app.config['BATCH_COURT_CONCURRENCY'],
+        default_court_limit=app.config['BATCH_DEFAULT_COURT_CONCURRENCY']
+    )
+    app.logger.info("Batch search: %s", summary)
+    return jsonify({'success': True, 'results': results, 'summary': summary})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll the status of an asynchronous search job"""
+    job = db.session.get(ScrapeJob, job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(dict(job.to_dict(), success=True))
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """Server-sent events stream of job progress until it finishes"""
+    if db.session.get(ScrapeJob, job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    def events():
+        last = None
+        deadline = time.monotonic() + app.config['JOB_STREAM_TIMEOUT']
+        while time.monotonic() < deadline:
+            db.session.expire_all()
+            job = db.session.get(ScrapeJob, job_id)
+            state = job.to_dict()
+            if state != last:
+                yield f"data: {json.dumps(state)}\n\n"
+                last = state
+            if job.status in TERMINAL_STATES:
+                return
+            time.sleep(0.5)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/search/<int:search_id>', methods=['GET'])
 def get_search_details(search_id):
     try:
-        search = CaseSearch.query.get_or_404(search_id)
-        detail = None
-        if search.details:
-            d = search.details
-            detail = {
-                'cnr_number': d.cnr_number,
-                'filing_number': d.filing_number,
-                'case_status': d.case_status,
-                'court_name': d.court_name,
-                'judge_name': d.judge_name,
-                'next_hearing_date': d.next_hearing_date.isoformat() if d.next_hearing_date else None,
-                'is_disposed': d.is_disposed
-            }
-        return jsonify({'success': True, 'search_id': search.id, 'case': detail, 'raw_path': search.raw_response_path})
+        doc = get_case_document(search_id)
+        if doc is None:
+            return jsonify({'success': False, 'error': 'Not found'}), 404
+        return jsonify({'success': True, 'search_id': search_id, 'case': doc['case'], 'parties': doc['parties'],
+                        'orders': doc['orders'], 'raw_path': doc['raw_path']})
     except Exception:
         app.logger.error(traceback.format_exc())
         return jsonify({'success': False, 'error': 'Not found'}), 404
 
+@app.route('/api/search/<int:search_id>/raw', methods=['GET'])
+def get_search_raw(search_id):
+    """Stream the archived page a search was parsed from"""
+    search = CaseSearch.query.get_or_404(search_id)
+    path = search.raw_response_path
+    if not path or not os.path.exists(path):
+        return jsonify({'success': False, 'error': 'No saved page for this search'}), 404
+    return Response(iter_raw(path), mimetype='text/html',
+                    headers={'Content-Disposition': f'attachment; filename=search_{search_id}.html'})
+
 @app.route('/cause-list', endpoint='cause_list')
 def cause_list_page():
     return render_template('cause_list.html')
 
-def save_case_details(search_id, case_data):
-    try:
-        filing_date = None
-        reg_date = None
-        next_hearing = None
-        if case_data.get('filing_date'):
-            try: filing_date = datetime.strptime(case_data['filing_date'], '%Y-%m-%d')
-            except: pass
-        if case_data.get('registration_date'):
-            try: reg_date = datetime.strptime(case_data['registration_date'], '%Y-%m-%d')
-            except: pass
-        if case_data.get('next_hearing_date'):
-            try: next_hearing = datetime.strptime(case_data['next_hearing_date'], '%Y-%m-%d')
-            except: pass
-
-        case = CaseDetail(
-            search_id=search_id,
-            cnr_number=case_data.get('cnr_number'),
-            filing_number=case_data.get('filing_number'),
-            registration_number=case_data.get('registration_number'),
-            filing_date=filing_date,
-            registration_date=reg_date,
-            case_status=case_data.get('status') or case_data.get('case_status'),
-            next_hearing_date=next_hearing,
-            court_name=case_data.get('court_name'),
-            judge_name=case_data.get('judge_name'),
-            is_disposed=case_data.get('is_disposed', False)
-        )
-        db.session.add(case)
-        db.session.commit()
-        return case
-    except Exception:
-        db.session.rollback()
-        app.logger.error("Error saving case details: %s", traceback.format_exc())
-        raise
+def fetch_cause_list(date=None, court_type='high_court', state_code='dl', district_code='dl'):
+    """Scrape a cause list with a pooled scraper and store its entries (cache and prefetch fill path)."""
+    with get_pool(app.config).scraper() as scraper:
+        cases = scraper.fetch_cause_list(date=date, court_type=court_type,
+                                         state_code=state_code, district_code=district_code)
+    if cases:
+        store_entries(list_params(date, court_type, state_code, district_code), cases)
+    return cases
+
+def load_prefetched(date, court_type, state_code, district_code, filters=None):
+    """Stored entries of a list, or None once they are too old to serve.
+
+    Lists the running prefetcher keeps fresh are served for up to
+    CAUSE_PREFETCH_MAX_AGE. Any other stored list (written by a cache-fill
+    scrape) only within its court's cache TTL, so past that the cause cache
+    decides between serving stale and refreshing.
+    """
+    prefetcher = get_cause_prefetcher(app, fetch_cause_list)
+    target = {'court_type': court_type, 'state_code': state_code, 'district_code': district_code}
+    if prefetcher is not None and target in prefetcher.targets:
+        max_age = app.config['CAUSE_PREFETCH_MAX_AGE'] or None  # 0: no limit
+    else:
+        max_age = cause_cache().ttl_for(court_type)
+    stored = load_entries(list_params(date, court_type, state_code, district_code), filters, max_age=max_age)
+    return stored[0] if stored is not None else None
+
+def cause_cache():
+    return get_cause_cache(app, fetch_cause_list)
+
+@app.route('/api/causes/cache', methods=['GET'])
+def cause_cache_stats():
+    """Cause list cache hit/miss counters and size"""
+    return jsonify({'success': True, 'cache': cause_cache().snapshot()})
+
+@app.route('/api/causes/prefetch', methods=['GET'])
+def cause_prefetch_status():
+    """Scheduled cause list prefetch targets and counters"""
+    prefetcher = get_cause_prefetcher(app, fetch_cause_list)
+    return jsonify({'success': True, 'enabled': prefetcher is not None,
+                    'prefetch': prefetcher.snapshot() if prefetcher else {}})
+
+@app.route('/api/causes/stream', methods=['GET'])
+def stream_cause_list():
+    """Stream cause list entries as NDJSON, one entry per line, as they are parsed"""
+    date = request.args.get('date')
+    court_type = request.args.get('court_type', 'high_court')
+    state_code = request.args.get('state_code', 'dl')
+    district_code = request.args.get('district_code', 'dl')
+
+    prefetched = load_prefetched(date, court_type, state_code, district_code)
+    cached = cause_cache().peek(date=date, court_type=court_type,
+                                state_code=state_code, district_code=district_code) if prefetched is None else None
+    if prefetched is not None:
+        rows, cache_status = prefetched, 'prefetched'
+    elif cached is not None:
+        rows, cache_status = cached
+    else:
+        try:
+            with get_pool(app.config).scraper() as scraper:
+                raw_path, formatted_date = scraper.fetch_cause_list_page(
+                    date=date, court_type=court_type, state_code=state_code, district_code=district_code)
+        except Exception as e:
+            app.logger.error(f"Error in stream_cause_list: {traceback.format_exc()}")
+            return jsonify({'success': False, 'error': 'Failed to fetch cause list', 'details': str(e)}), 500
+        # Parsing happens lazily while the response is written.
+        rows = iter_cause_list(raw_path, defaults={'court_type': court_type, 'date': formatted_date})
+        cache_status = 'miss'
+
+    def generate():
+        streamed = False
+        for row in rows:
+            streamed = True
+            yield json.dumps(row) + '\n'
+        # Store a fully streamed miss so the next request is answered from the entries table.
+        # Rows are re-parsed from the archived page rather than kept while streaming.
+        if cache_status == 'miss' and streamed:
+            store_entries(list_params(date, court_type, state_code, district_code),
+                          iter_cause_list(raw_path, defaults={'court_type': court_type, 'date': formatted_date}))
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Cache': cache_status})
 
 @app.route('/api/causes', methods=['GET'])
 def get_cause_list():
@@ -169,26 +436,33 @@ def get_cause_list():
 
         app.logger.info(f"Parameters - date: {date}, court_type: {court_type}, state_code: {state_code}, district_code: {district_code}")
 
-        # Initialize the scraper using context manager
-        with CourtScraper() as scraper:
-            app.logger.info("Initialized CourtScraper, fetching cause list...")
-            
-            # Fetch the cause list
-            causes = scraper.fetch_cause_list(
+        filters = parse_cause_filters(request.args)
+        force_refresh = request.args.get('refresh') in ('1', 'true')
+
+        # Lists stored by the prefetcher (or an earlier scrape) are answered
+        # from the entries table without touching the scraper.
+        causes = None if force_refresh else load_prefetched(date, court_type, state_code, district_code, filters)
+        if causes is not None:
+            cache_status = 'prefetched'
+        else:
+            causes, cache_status = cause_cache().get(
                 date=date,
                 court_type=court_type,
                 state_code=state_code,
-                district_code=district_code
+                district_code=district_code,
+                force_refresh=force_refresh
             )
-            
-            app.logger.info(f"Successfully fetched {len(causes) if causes else 0} cases")
+            causes = filter_entries(causes or [], filters)
 
-            return jsonify({
-                'success': True,
-                'date': date,
-                'court_type': court_type,
-                'cases': causes if causes else []
-            })
+        app.logger.info(f"Served {len(causes) if causes else 0} cases (cache: {cache_status})")
+
+        return jsonify({
+            'success': True,
+            'date': date,
+            'court_type': court_type,
+            'cache': cache_status,
+            'cases': causes if causes else []
+        })
 
     except Exception as e:
         app.logger.error(f"Error in get_cause_list: {str(e)}")
@@ -199,32 +473,154 @@ def get_cause_list():
             'details': str(e)
         }), 500
 
+def _with_dates(values, keys):
+    """Copy of a document section with ISO date strings turned back into dates for templates."""
+    values = dict(values)
+    for key in keys:
+        if values.get(key):
+            values[key] = datetime.strptime(values[key][:10], '%Y-%m-%d')
+    return values
+
+def scraper_lease():
+    return get_pool(app.config).scraper()
+
+def notify_watch_changes(watch, changes):
+    """Change event hook: drop the cached document and POST the event to WATCH_WEBHOOK_URL."""
+    case_documents.invalidate(watch['search_id'])
+    app.logger.info("Watched case %s changed: %d fields", watch['watch_id'], len(changes))
+    if app.config['WATCH_WEBHOOK_URL']:
+        get_http_backend(app.config).session.post(
+            app.config['WATCH_WEBHOOK_URL'], json={'event': 'case_changed', 'watch': watch, 'changes': changes},
+            timeout=app.config['HTTP_TIMEOUT'])
+
+def watcher():
+    return get_watcher(app, scraper_lease, on_change=notify_watch_changes)
+
+@app.route('/api/watchlist', methods=['POST'])
+def add_watchlist_entry():
+    """Watch a case by its keys or a stored CNR number"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Body must be an object'}), 400
+    interval = data.get('interval_seconds')
+    try:
+        watch, created = add_watch(data, app.config['WATCH_INTERVAL'] if interval is None else interval)
+    except WatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'created': created, 'watch': watch.to_dict()}), 201 if created else 200
+
+@app.route('/api/watchlist', methods=['GET'])
+def list_watchlist():
+    watches = WatchedCase.query.filter_by(active=True).order_by(WatchedCase.id).all()
+    scheduler = watcher()
+    return jsonify({'success': True, 'watches': [w.to_dict() for w in watches],
+                    'scheduler': scheduler.snapshot() if scheduler else None})
+
+@app.route('/api/watchlist/<int:watch_id>', methods=['DELETE'])
+def remove_watchlist_entry(watch_id):
+    """Stop watching a case; its recorded changes are kept"""
+    watch = db.session.get(WatchedCase, watch_id)
+    if watch is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    watch.active = False
+    db.session.commit()
+    return jsonify({'success': True})
+
+@app.route('/api/watchlist/<int:watch_id>/check', methods=['POST'])
+def check_watchlist_entry(watch_id):
+    """Check one watched case now"""
+    if db.session.get(WatchedCase, watch_id) is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    outcome = (watcher() or make_watcher(app, scraper_lease, notify_watch_changes)).check(watch_id)
+    return jsonify(dict(outcome, success=outcome['result'] != 'failed'))
+
+@app.route('/api/watchlist/changes', methods=['GET'])
+def watchlist_changes():
+    """Recorded changes after change id ``since``, oldest first; poll with the returned ``next``"""
+    try:
+        since = int(request.args.get('since', 0))
+        limit = min(int(request.args.get('limit', 100)), 1000)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'since and limit must be numbers'}), 400
+    query = CaseChange.query.filter(CaseChange.id > since)
+    if request.args.get('watch_id'):
+        query = query.filter(CaseChange.watch_id == request.args.get('watch_id', type=int))
+    changes = [c.to_dict() for c in query.order_by(CaseChange.id).limit(limit)]
+    return jsonify({'success': True, 'changes': changes, 'next': changes[-1]['change_id'] if changes else since})
+
+@app.route('/api/cases/cache', methods=['GET'])
+def case_cache_stats():
+    """Case document cache counters"""
+    return jsonify({'success': True, 'cache': case_documents.snapshot()})
+
+@app.route('/api/orders/search', methods=['GET'])
+def search_orders_api():
+    """Full-text search over order text and party names"""
+    try:
+        results, next_cursor = search_orders(
+            query=request.args.get('q', '').strip() or None,
+            party=request.args.get('party', '').strip() or None,
+            limit=request.args.get('limit', 20, type=int),
+            cursor=request.args.get('cursor') or None
+        )
+        return jsonify({'success': True, 'results': results, 'next_cursor': next_cursor})
+    except SearchQueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except SearchUnavailable as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+@app.route('/api/hearings', methods=['GET'])
+def list_hearings():
+    """Upcoming hearings by date, filtered by court and judge, keyset paginated"""
+    try:
+        hearings, next_cursor = hearing_page(
+            parse_hearing_filters(request.args),
+            limit=request.args.get('limit', 100, type=int),
+            cursor=request.args.get('cursor') or None
+        )
+    except HearingQueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'hearings': hearings, 'next_cursor': next_cursor})
+
+@app.route('/api/hearings.ics', methods=['GET'])
+def hearings_calendar():
+    """The same hearings as a streamed iCalendar file"""
+    try:
+        filters = parse_hearing_filters(request.args)
+    except HearingQueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    events = stream_ics(filters, app.config['EXPORT_CHUNK_SIZE'], host=request.host.split(':')[0])
+    return Response(stream_with_context(events),
+                    mimetype='text/calendar', headers={'Content-Disposition': 'attachment; filename=hearings.ics'})
+
 @app.route('/case/<int:search_id>')
 def view_case(search_id):
+    doc = get_case_document(search_id)
+    if doc is None:
+        abort(404)
     try:
-        search = CaseSearch.query.get_or_404(search_id)
-        details = search.details
-        parties = Party.query.filter_by(case_id=details.id).all() if details else []
-        orders = CourtOrder.query.filter_by(case_id=details.id).all() if details else []
+        details = _with_dates(doc['case'] or {}, ('filing_date', 'registration_date', 'next_hearing_date'))
+        parties = doc['parties']
+        orders = [_with_dates(o, ('order_date',)) for o in doc['orders']]
         
         # Sample data - replace with actual data from your database
         case_details = {
-            'cnr_number': getattr(details, 'cnr_number', 'DLHC010012342022'),
-            'filing_number': getattr(details, 'filing_number', '1234/2022'),
-            'registration_number': getattr(details, 'registration_number', '5678/2022'),
-            'filing_date': getattr(details, 'filing_date', datetime(2022, 1, 1)),
-            'registration_date': getattr(details, 'registration_date', datetime(2022, 1, 15)),
-            'next_hearing_date': getattr(details, 'next_hearing_date', datetime(2023, 12, 15)),
-            'case_status': getattr(details, 'case_status', 'Disposed'),
-            'case_type': getattr(details, 'case_type', 'Criminal Appeal'),
-            'category': getattr(details, 'category', 'Criminal'),
-            'act': getattr(details, 'act', 'Indian Penal Code'),
-            'court_name': getattr(details, 'court_name', 'High Court of Delhi'),
-            'judge_name': getattr(details, 'judge_name', 'Honorable Justice Sharma'),
-            'bench': getattr(details, 'bench', 'Bench 1'),
-            'is_disposed': getattr(details, 'is_disposed', True),
-            'summary': getattr(details, 'summary', 'This is a sample case summary. The case involves charges under IPC sections 302, 34. The case is currently under trial with the next hearing scheduled for December 15, 2023.'),
-            'full_text': getattr(details, 'full_text', 'Full case text would be displayed here...')
+            'cnr_number': details.get('cnr_number', 'DLHC010012342022'),
+            'filing_number': details.get('filing_number', '1234/2022'),
+            'registration_number': details.get('registration_number', '5678/2022'),
+            'filing_date': details.get('filing_date', datetime(2022, 1, 1)),
+            'registration_date': details.get('registration_date', datetime(2022, 1, 15)),
+            'next_hearing_date': details.get('next_hearing_date', datetime(2023, 12, 15)),
+            'case_status': details.get('case_status', 'Disposed'),
+            'case_type': details.get('case_type', 'Criminal Appeal'),
+            'category': details.get('category', 'Criminal'),
+            'act': details.get('act', 'Indian Penal Code'),
+            'court_name': details.get('court_name', 'High Court of Delhi'),
+            'judge_name': details.get('judge_name', 'Honorable Justice Sharma'),
+            'bench': details.get('bench', 'Bench 1'),
+            'is_disposed': details.get('is_disposed', True),
+            'summary': details.get('summary', 'This is a sample case summary. The case involves charges under IPC sections 302, 34. The case is currently under trial with the next hearing scheduled for December 15, 2023.'),
+            'full_text': details.get('full_text', 'Full case text would be displayed here...')
         }
         
         return render_template(
@@ -289,6 +685,29 @@ Case Type: {getattr(details, 'case_type', 'N/A')}
         app.logger.error(f"Error downloading case {search_id}: {str(e)}")
         return jsonify({'success': False, 'error': 'Failed to generate download'}), 500
 
+@app.route('/api/export/<dataset>.<fmt>', methods=['GET'])
+def export_data(dataset, fmt):
+    """Export stored cases, parties or orders as CSV, XLSX or Parquet"""
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+        query = build_query(dataset, parse_filters(request.args))
+        chunk_size = app.config['EXPORT_CHUNK_SIZE']
+        filename = f"{dataset}_{datetime.now():%Y%m%d_%H%M%S}.{fmt}"
+        if fmt == 'csv':
+            return Response(stream_with_context(stream_csv(query, chunk_size)), mimetype=EXPORT_MIMETYPES['csv'],
+                            headers={'Content-Disposition': f'attachment; filename={filename}'})
+        # XLSX and Parquet need a seekable file; build it on disk, then stream it back.
+        output = tempfile.TemporaryFile()
+        (write_xlsx if fmt == 'xlsx' else write_parquet)(query, output, chunk_size)
+        output.seek(0)
+        return send_file(output, mimetype=EXPORT_MIMETYPES[fmt], as_attachment=True, download_name=filename)
+    except ExportError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Export of {dataset} failed: {traceback.format_exc()}")
+        return jsonify({'success': False, 'error': 'Export failed'}), 500
+
 # app.py (add these routes to your existing file)
 from flask import session, send_file
 from io import BytesIO
@@ -297,7 +716,6 @@ import uuid
 from datetime import datetime
 
 # CAPTCHA configuration is already set up at the top of the file
-os.makedirs(app.config['CAPTCHA_FOLDER'], exist_ok=True)
 
 @app.route('/search')
 def search_page():
@@ -307,21 +725,16 @@ def search_page():
 def init_session():
     """Initialize a new search session and return CAPTCHA"""
     try:
-        # Generate CAPTCHA
-        captcha_text, image_data = generate_captcha()
-        captcha_id = str(uuid.uuid4())
-        captcha_path = os.path.join(app.config['CAPTCHA_FOLDER'], f'captcha_{captcha_id}.png')
-        
-        # Save CAPTCHA image
-        with open(captcha_path, 'wb') as f:
-            f.write(image_data)
+        # Take a pre-rendered CAPTCHA
+        captcha_id, captcha_text, png = get_captcha_pool(app.config).take()
         
         # Store CAPTCHA text in session
         session['captcha'] = captcha_text.lower()
         session['captcha_id'] = captcha_id
         
-        # Return CAPTCHA image URL
-        captcha_url = f"/static/captcha/captcha_{captcha_id}.png"
+        # Inline the image: any worker can check the answer from the session,
+        # but only this one holds the PNG, and it saves the client a round trip.
+        captcha_url = 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
         
         return jsonify({
             'success': True,
@@ -331,6 +744,32 @@ def init_session():
         app.logger.error(f"Error in init_session: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/captcha/<captcha_id>.png', methods=['GET'])
+def captcha_image(captcha_id):
+    """Serve an issued CAPTCHA image from the memory of the worker that issued it"""
+    image_data = get_captcha_pool(app.config).image(captcha_id)
+    if image_data is None:
+        abort(404)
+    return Response(image_data, mimetype='image/png', headers={'Cache-Control': 'no-store'})
+
+@app.route('/api/pool', methods=['GET'])
+def pool_status():
+    """Report driver pool occupancy and per-backend fetch counters"""
+    return jsonify({'success': True, 'pool': get_pool(app.config).snapshot(), 'fetch': fetch_stats(),
+                    'coalescing': get_single_flight(app).snapshot()})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage timings and counters in the Prometheus text format (per worker process)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/hosts', methods=['GET'])
+def host_status():
+    """Per-host request rate, concurrency limit and circuit breaker state"""
+    governor = get_governor(app.config)
+    return jsonify({'success': True, 'enabled': governor is not None,
+                    'hosts': governor.snapshot() if governor else {}})
+
 @app.route('/api/districts/<state>')
 def get_districts(state):
     """Get districts for a state"""
@@ -374,12 +813,7 @@ def search_case_advanced():
         if 'captcha' in session:
             captcha_id = session.get('captcha_id')
             if captcha_id:
-                captcha_path = os.path.join(app.config['CAPTCHA_FOLDER'], f'captcha_{captcha_id}.png')
-                if os.path.exists(captcha_path):
-                    try:
-                        os.remove(captcha_path)
-                    except:
-                        pass
+                get_captcha_pool(app.config).discard(captcha_id)
             session.pop('captcha', None)
             session.pop('captcha_id', None)
         
@@ -411,6 +845,7 @@ def search_case_advanced():
         
         # Generate a mock PDF (in real app, this would be generated from scraped data)
         pdf_filename = f"case_{int(time.time())}.pdf"
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
         pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], pdf_filename)
         
         # In a real app, you would generate the PDF here
@@ -455,5 +890,150 @@ def download_file(filename):
         app.logger.error(f"Error serving file {filename}: {str(e)}")
         return jsonify({'success': False, 'error': 'File not found'}), 404
 
+@app.cli.command('archive-raw')
+@click.option('--delete', is_flag=True, help='Remove the legacy .html files after importing them.')
+def archive_raw_command(delete):
+    """Move timestamped raw HTML dumps into the content-addressed archive."""
+    raw_dir = os.path.join(app.config['DOWNLOAD_FOLDER'], 'raw')
+    files, unique, before, after = RawStore(raw_dir).migrate_legacy(raw_dir, delete=delete)
+    click.echo(f"Archived {files} files as {unique} unique pages: {before:,} bytes -> {after:,} bytes")
+
+@app.cli.command('download-pdfs')
+@click.option('--workers', type=int, default=None, help='Concurrent downloads (default PDF_DOWNLOAD_WORKERS).')
+@click.option('--limit', type=int, default=None, help='Stop after this many orders.')
+def download_pdfs_command(workers, limit):
+    """Download judgment PDFs for orders that have a pdf_url but no local copy."""
+    downloader = PdfDownloader(
+        get_http_backend(app.config).session,
+        app.config['PDF_FOLDER'],
+        workers=workers or app.config['PDF_DOWNLOAD_WORKERS'],
+        chunk_size=app.config['PDF_CHUNK_SIZE'],
+        batch_size=app.config['PDF_DOWNLOAD_BATCH_SIZE'],
+        governor=get_governor(app.config)
+    )
+    report = lambda s: click.echo(f"{s['downloaded']} done, {s['failed']} failed, {s['queued']} queued, "
+                                  f"{s['in_flight']} in flight, {s['bytes_per_sec'] / 1024:.0f} KiB/s")
+    stats = downloader.run(limit=limit, on_progress=report)
+    report(stats)
+    click.echo(f"Finished in {stats['elapsed']}s: {stats['bytes']:,} bytes, "
+               f"{stats['resumed']} resumed, {stats['deduplicated']} duplicates")
+
+@app.cli.command('export')
+@click.argument('dataset', type=click.Choice(list(EXPORT_DATASETS)))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='csv', show_default=True)
+@click.option('--output', '-o', required=True, type=click.Path(dir_okay=False), help='File to write.')
+@click.option('--court-type', default=None)
+@click.option('--case-type', default=None)
+@click.option('--year', type=int, default=None)
+@click.option('--status', default=None, help='Exact case status.')
+@click.option('--disposed/--pending', default=None, help='Only disposed or only pending cases.')
+@click.option('--from', 'date_from', default=None, help='Searched on or after YYYY-MM-DD.')
+@click.option('--to', 'date_to', default=None, help='Searched on or before YYYY-MM-DD.')
+@click.option('--all-searches', is_flag=True, help='Include every stored search, not just the latest per case.')
+@click.option('--include-text', is_flag=True, help='Include order_text in the orders export.')
+def export_command(dataset, fmt, output, court_type, case_type, year, status, disposed, date_from, date_to,
+                   all_searches, include_text):
+    """Export stored cases, parties or orders to CSV, XLSX or Parquet."""
+    try:
+        query = build_query(dataset, parse_filters({
+            'court_type': court_type, 'case_type': case_type, 'year': year, 'status': status,
+            'disposed': disposed, 'from': date_from, 'to': date_to,
+            'all_searches': all_searches, 'include_text': include_text,
+        }))
+        chunk_size = app.config['EXPORT_CHUNK_SIZE']
+        if fmt == 'csv':
+            with open(output, 'w', newline='', encoding='utf-8') as f:
+                for chunk in stream_csv(query, chunk_size):
+                    f.write(chunk)
+        else:
+            with open(output, 'wb') as f:
+                (write_xlsx if fmt == 'xlsx' else write_parquet)(query, f, chunk_size)
+    except ExportError as e:
+        raise click.UsageError(str(e))
+    click.echo(f"Wrote {output}")
+
+@app.cli.command('prefetch-causes')
+@click.option('--date', default=None, help='First list date, YYYY-MM-DD (default today).')
+@click.option('--days-ahead', type=int, default=None, help='Further days to fetch (default CAUSE_PREFETCH_DAYS_AHEAD).')
+@click.option('--force', is_flag=True, help='Fetch lists even when the stored copy is fresh.')
+def prefetch_causes_command(date, days_ahead, force):
+    """Fetch and store upcoming cause lists for CAUSE_PREFETCH_TARGETS once."""
+    prefetcher = make_prefetcher(app, fetch_cause_list)
+    if days_ahead is not None:
+        prefetcher.days_ahead = days_ahead
+    if not prefetcher.targets:
+        raise click.UsageError('CAUSE_PREFETCH_TARGETS is empty')
+    counts = prefetcher.run_once(start_date=date, force=force)
+    click.echo(f"{counts['fetched']} lists fetched ({counts['entries']} entries), "
+               f"{counts['skipped']} fresh, {counts['failed']} failed")
+
+@app.cli.command('check-watchlist')
+@click.option('--all', 'check_all', is_flag=True, help='Check every active watch, not only those due.')
+def check_watchlist_command(check_all):
+    """Check due watched cases once and record their changes."""
+    checker = make_watcher(app, scraper_lease, notify_watch_changes)
+    if check_all:
+        WatchedCase.query.filter_by(active=True).update({'next_check_at': datetime.utcnow()})
+        db.session.commit()
+    totals = {'checked': 0, 'unchanged': 0, 'baseline': 0, 'changed': 0, 'failed': 0}
+    while True:
+        counts = checker.run_once()
+        for name, n in counts.items():
+            totals[name] += n
+        if counts['checked'] == 0:
+            break
+    click.echo(f"{totals['checked']} cases checked: {totals['changed']} changed, {totals['unchanged']} unchanged, "
+               f"{totals['baseline']} first checks, {totals['failed']} failed")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild and optimize the full-text index over orders and parties."""
+    rebuild_search_index()
+    click.echo("Search index rebuilt")
+
+@app.cli.command('extract-pdf-text')
+@click.option('--workers', type=int, default=None, help='Worker processes (default PDF_EXTRACT_WORKERS).')
+@click.option('--limit', type=int, default=None, help='Stop after this many orders.')
+@click.option('--force', is_flag=True, help='Re-extract orders and files that already have text.')
+def extract_pdf_text_command(workers, limit, force):
+    """Fill CourtOrder.order_text from downloaded judgment PDFs."""
+    extractor = TextExtractor(
+        app.config['PDF_TEXT_FOLDER'],
+        workers=workers or app.config['PDF_EXTRACT_WORKERS'],
+        pages_per_task=app.config['PDF_EXTRACT_PAGES_PER_TASK'],
+        batch_size=app.config['PDF_EXTRACT_BATCH_SIZE'],
+        max_chars=app.config['PDF_TEXT_MAX_CHARS'] or None
+    )
+    report = lambda s: click.echo(f"{s['updated']}/{s['orders']} orders updated, {s['extracted']} extracted, "
+                                  f"{s['reused']} reused, {s['failed']} failed, {s['truncated']} truncated, "
+                                  f"{s['pages_per_sec']} pages/s")
+    stats = extractor.run(limit=limit, force=force, on_progress=report)
+    report(stats)
+    click.echo(f"Finished in {stats['elapsed']}s: {stats['pages']} pages, {stats['missing']} missing files")
+
+@app.cli.command('backfill')
+@click.option('--kind', 'kinds', multiple=True, type=click.Choice(['case', 'causelist']),
+              help='Page kinds to parse (default both).')
+@click.option('--workers', type=int, default=None, help='Parser processes (default BACKFILL_WORKERS).')
+@click.option('--limit', type=int, default=None, help='Stop after this many pages.')
+@click.option('--force', is_flag=True, help='Re-parse pages already parsed by the current parser version.')
+def backfill_command(kinds, workers, limit, force):
+    """Parse archived pages in downloads/raw into cases and cause list entries."""
+    from scraper_fixed import BASE_URLS
+    backfill = Backfill(
+        os.path.join(app.config['DOWNLOAD_FOLDER'], 'raw'),
+        workers=workers or app.config['BACKFILL_WORKERS'],
+        batch_size=app.config['BACKFILL_BATCH_SIZE'],
+        base_urls={court: app.config.get(f'{court.upper()}_URL') or url for court, url in BASE_URLS.items()}
+    )
+    report = lambda s: click.echo(f"{s['pages']} pages parsed: {s['searches']} searches updated "
+                                  f"({s['created']} recreated), {s['entries']} cause list entries, "
+                                  f"{s['empty']} empty, {s['failed']} failed, {s['pages_per_sec']} pages/s")
+    stats = backfill.run(kinds=kinds or ('case', 'causelist'), limit=limit, force=force, on_progress=report)
+    report(stats)
+    click.echo(f"Finished in {stats['elapsed']}s: {stats['skipped']} already parsed, "
+               f"{stats['superseded']} superseded by newer pages")
+
 if __name__ == '__main__':
+    init_db()
     app.run(debug=True, port=5000)
@@ -0,0 +1,238 @@
+import hashlib, logging, os, re, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from sqlalchemy import delete, insert
+from models import db, CaseSearch, ParsedPage
+from raw_store import SUFFIX, RawStore, iter_raw
+from persistence import upsert_case_graphs
+from cause_prefetch import list_fetched_at, store_entries
+import case_parser, cause_parser
+
+logger = logging.getLogger(__name__)
+
+PARSER_VERSIONS = {'case': case_parser.PARSER_VERSION, 'causelist': cause_parser.PARSER_VERSION}
+
+# causelist_high_court_06-10-2025_20251007_013043.html
+LEGACY_NAME = re.compile(r'^(?P<kind>case|causelist)_(?P<court_type>high_court|district_court)_(?P<rest>.*)_\d{8}_\d{6}\.html$')
+
+
+def _legacy_fields(name):
+    """kind, court_type and (for cause lists) date from a legacy dump's file name."""
+    match = LEGACY_NAME.match(name)
+    if not match:
+        return None, None, {}
+    params = {'date': match['rest']} if match['kind'] == 'causelist' else {}
+    return match['kind'], match['court_type'], params
+
+
+def _iso_date(value):
+    try:
+        return datetime.strptime(value, '%d-%m-%Y').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def archive_pages(raw_dir):
+    """Yield one record per distinct page under ``raw_dir``.
+
+    Archived objects are described by their latest ``index.jsonl`` line;
+    ``*.html`` dumps not yet moved into the archive are classified by name.
+    """
+    store = RawStore(raw_dir)
+    latest = {}
+    for record in store.iter_index():
+        latest[record['hash']] = record
+    for content_hash, record in latest.items():
+        path = store.path_for(content_hash)
+        if not os.path.exists(path):
+            continue
+        params = dict(record.get('params') or {})
+        kind, court_type = params.pop('kind', None), record.get('court_type')
+        if kind is None and params.get('legacy_file'):
+            kind, court_type, legacy = _legacy_fields(params['legacy_file'])
+            params.update(legacy)
+        yield {'hash': content_hash, 'path': path, 'kind': kind, 'court_type': court_type or 'high_court',
+               'params': params, 'fetched_at': datetime.fromisoformat(record['fetched_at'])}
+    for name in sorted(os.listdir(raw_dir)):
+        path = os.path.join(raw_dir, name)
+        if not name.endswith('.html') or not os.path.isfile(path):
+            continue
+        kind, court_type, params = _legacy_fields(name)
+        with open(path, 'rb') as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        if content_hash in latest:
+            continue
+        yield {'hash': content_hash, 'path': path, 'kind': kind, 'court_type': court_type or 'high_court',
+               'params': params, 'fetched_at': datetime.utcfromtimestamp(os.path.getmtime(path))}
+
+
+def parse_page(path, kind, court_type, params, base_url=None):
+    """Parse one saved page. Runs in a worker process.
+
+    Cause lists return their entries; case pages return ``case_data`` or
+    None when the page holds no case details.
+    """
+    if kind == 'causelist':
+        defaults = {'court_type': court_type, 'date': params.get('date')}
+        return list(cause_parser.iter_cause_list(path, defaults=defaults))
+    return case_parser.parse_case_page(b''.join(iter_raw(path)), base_url=base_url)
+
+
+class Backfill:
+    """Re-parse archived pages into the database without touching the court sites.
+
+    Pages are parsed on a process pool and written back in batches of
+    ``batch_size``: case pages update the searches that saved them (or
+    recreate a search from the fetch parameters when none does), cause lists
+    replace the stored entries of their list unless a newer copy is stored.
+    Each page's hash and parser version is recorded in ``parsed_pages``, so
+    re-runs only parse new pages and pages whose parser has been bumped.
+    """
+
+    def __init__(self, raw_dir, workers=None, batch_size=200, progress_interval=5.0, base_urls=None):
+        self.raw_dir = raw_dir
+        self.workers = workers or os.cpu_count() or 2
+        self.batch_size = batch_size
+        self.progress_interval = progress_interval
+        self.base_urls = base_urls or {}
+        self.stats = {'pages': 0, 'skipped': 0, 'parsed': 0, 'empty': 0, 'superseded': 0, 'failed': 0,
+                      'searches': 0, 'created': 0, 'entries': 0}
+        self._searches = {}
+
+    def pending(self, kinds, force=False):
+        """Pages needing a parse; older copies of the same cause list come back marked superseded."""
+        done = dict(db.session.query(ParsedPage.content_hash, ParsedPage.parser_version)
+                    .filter(ParsedPage.status != 'failed'))
+        pages, newest_list = [], {}
+        for page in archive_pages(self.raw_dir):
+            if page['kind'] not in kinds:
+                continue
+            if not force and done.get(page['hash']) == PARSER_VERSIONS[page['kind']]:
+                self.stats['skipped'] += 1
+                continue
+            if page['kind'] == 'causelist':
+                page['list'] = {'date': _iso_date(page['params'].get('date')), 'court_type': page['court_type'],
+                                'state_code': page['params'].get('state_code', 'dl'),
+                                'district_code': page['params'].get('district_code', 'dl')}
+                if page['list']['date'] is None:
+                    logger.info("Skipping cause list %s without a list date", page['path'])
+                    continue
+                key = tuple(page['list'].values())
+                if key in newest_list and newest_list[key]['fetched_at'] >= page['fetched_at']:
+                    page['superseded'] = True
+                else:
+                    if key in newest_list:
+                        newest_list[key]['superseded'] = True
+                    newest_list[key] = page
+            pages.append(page)
+        return pages
+
+    def _load_searches(self):
+        """Map archive hashes and legacy paths to the searches that saved them."""
+        self._searches = {}
+        rows = db.session.query(CaseSearch.id, CaseSearch.raw_response_path).filter(
+            CaseSearch.raw_response_path.isnot(None))
+        for search_id, path in rows:
+            name = os.path.basename(path)
+            key = name[:-len(SUFFIX)] if name.endswith(SUFFIX) else os.path.abspath(path)
+            self._searches.setdefault(key, []).append(search_id)
+
+    def _search_ids(self, page):
+        ids = self._searches.get(page['hash']) or self._searches.get(os.path.abspath(page['path']))
+        if ids:
+            return ids
+        params = page['params']
+        if not all(params.get(k) for k in ('case_type', 'case_number', 'year')):
+            return []
+        search = CaseSearch(case_type=params['case_type'], case_number=str(params['case_number']),
+                            year=int(params['year']), court_type=page['court_type'],
+                            search_date=page['fetched_at'], raw_response_path=page['path'])
+        db.session.add(search)
+        db.session.flush()
+        self.stats['created'] += 1
+        self._searches[page['hash']] = [search.id]
+        return [search.id]
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        records, cases = [], []
+        for page, result, error in batch:
+            status, rows = 'parsed', 0
+            if error is not None:
+                status = 'failed'
+            elif page.get('superseded'):
+                status = 'superseded'
+            elif not result:
+                status = 'empty'
+            elif page['kind'] == 'causelist':
+                newer = list_fetched_at(page['list'])
+                if newer is not None and newer > page['fetched_at']:
+                    status = 'superseded'
+                else:
+                    rows = store_entries(page['list'], result, fetched_at=page['fetched_at'], commit=False)
+                    self.stats['entries'] += rows
+            else:
+                ids = self._search_ids(page)
+                cases.extend((search_id, result) for search_id in ids)
+                rows = len(ids)
+                self.stats['searches'] += rows
+            self.stats[status] += 1
+            records.append({'content_hash': page['hash'], 'kind': page['kind'],
+                            'parser_version': PARSER_VERSIONS[page['kind']], 'status': status, 'rows': rows,
+                            'error': error, 'parsed_at': datetime.utcnow()})
+        try:
+            upsert_case_graphs(cases)
+            db.session.execute(delete(ParsedPage).where(ParsedPage.content_hash.in_([r['content_hash'] for r in records])))
+            db.session.execute(insert(ParsedPage), records)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        batch.clear()
+
+    def _report(self, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        stats = dict(self.stats, elapsed=round(elapsed, 1))
+        stats['pages_per_sec'] = round(stats['pages'] / elapsed, 1)
+        return stats
+
+    def run(self, kinds=('case', 'causelist'), limit=None, force=False, on_progress=None):
+        """Parse every pending page (or ``limit`` of them). Must run in an app context."""
+        started = last_report = time.monotonic()
+        pages = self.pending(kinds, force)[:limit]
+        if 'case' in kinds:
+            self._load_searches()
+        batch, in_flight = [], {}
+        queue = iter(pages)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                # Keep a bounded number of pages in flight so results stream back in order of completion.
+                while len(in_flight) < self.workers * 4:
+                    page = next(queue, None)
+                    if page is None:
+                        break
+                    if page.get('superseded'):
+                        batch.append((page, None, None))
+                        continue
+                    future = pool.submit(parse_page, page['path'], page['kind'], page['court_type'],
+                                         page['params'], self.base_urls.get(page['court_type']))
+                    in_flight[future] = page
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    page = in_flight.pop(future)
+                    try:
+                        batch.append((page, future.result(), None))
+                    except Exception as e:
+                        logger.warning("Failed to parse %s: %s", page['path'], e)
+                        batch.append((page, None, str(e)))
+                    self.stats['pages'] += 1
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                if on_progress and time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    on_progress(self._report(started))
+        self._flush(batch)
+        return self._report(started)
@@ -0,0 +1,112 @@
+import logging, threading, time, traceback
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ('case_type', 'case_number', 'year', 'court_type', 'state')
+
+_court_slots = {}
+_court_slots_lock = threading.Lock()
+
+
+def court_slot(court_type, limits, default_limit):
+    """Process-wide semaphore bounding concurrent scrapes against one court."""
+    with _court_slots_lock:
+        if court_type not in _court_slots:
+            _court_slots[court_type] = threading.BoundedSemaphore(limits.get(court_type, default_limit))
+        return _court_slots[court_type]
+
+
+def normalize_item(item):
+    """Return ``(params, error)`` for one batch entry."""
+    if not isinstance(item, dict):
+        return None, 'Entry must be an object'
+    for field in ('case_type', 'court_type', 'state'):
+        if item.get(field) is not None and not isinstance(item[field], str):
+            return None, f'{field} must be a string'
+    if item.get('case_number') is not None and not isinstance(item['case_number'], (str, int)):
+        return None, 'case_number must be a string or number'
+    params = {
+        'case_type': (item.get('case_type') or '').strip(),
+        'case_number': str(item.get('case_number') or '').strip(),
+        'year': item.get('year'),
+        'court_type': item.get('court_type') or 'high_court',
+        'state': item.get('state'),
+    }
+    if not all([params['case_type'], params['case_number'], params['year']]):
+        return None, 'Missing required fields'
+    try:
+        params['year'] = int(params['year'])
+    except (TypeError, ValueError):
+        return None, 'Year must be a number'
+    return params, None
+
+
+def dedupe(items):
+    """Group batch entries by lookup key.
+
+    Returns ``(unique, invalid)``: ``unique`` maps each key to its params and
+    the input positions that asked for it, ``invalid`` lists per-position errors.
+    """
+    unique, invalid = {}, []
+    for index, item in enumerate(items):
+        params, error = normalize_item(item)
+        if error:
+            invalid.append({'indexes': [index], 'success': False, 'error': error})
+            continue
+        key = tuple(params[f] for f in KEY_FIELDS)
+        if key in unique:
+            unique[key]['indexes'].append(index)
+        else:
+            unique[key] = {'params': params, 'indexes': [index]}
+    return unique, invalid
+
+
+def run_batch(app, items, runner, max_workers=4, court_limits=None, default_court_limit=2):
+    """Look up every unique case in ``items`` over a bounded worker pool.
+
+    ``runner(params)`` must return ``(search_id, case_data)`` and is called
+    inside an application context. Duplicate entries share one lookup.
+    """
+    started = time.perf_counter()
+    unique, results = dedupe(items)
+    court_limits = court_limits or {}
+
+    def lookup(group):
+        params = group['params']
+        slot = court_slot(params['court_type'], court_limits, default_court_limit)
+        t0 = time.perf_counter()
+        with slot:
+            waited = time.perf_counter() - t0
+            try:
+                with app.app_context():
+                    search_id, case_data = runner(params)
+                result = {'success': True, 'search_id': search_id, 'case': case_data.get('case_details', {}),
+                          'cached': case_data.get('cached', False)}
+            except Exception as e:
+                logger.error("Batch lookup %s failed: %s", params, traceback.format_exc())
+                result = {'success': False, 'error': str(e)}
+        result.update(indexes=group['indexes'], request=params,
+                      queued_ms=round(waited * 1000, 1),
+                      elapsed_ms=round((time.perf_counter() - t0 - waited) * 1000, 1))
+        return result
+
+    if unique:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique)), thread_name_prefix='batch-search') as pool:
+            results.extend(pool.map(lookup, unique.values()))
+
+    looked_up = [r for r in results if 'request' in r]
+    elapsed = time.perf_counter() - started
+    summary = {
+        'total': len(items),
+        'unique': len(unique),
+        'duplicates': len(items) - len(unique) - (len(results) - len(looked_up)),
+        'invalid': len(results) - len(looked_up),
+        'succeeded': sum(1 for r in looked_up if r['success']),
+        'cached': sum(1 for r in looked_up if r.get('cached')),
+        'failed': sum(1 for r in looked_up if not r['success']),
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'avg_lookup_ms': round(sum(r['elapsed_ms'] for r in looked_up) / len(looked_up), 1) if looked_up else None,
+    }
+    results.sort(key=lambda r: r['indexes'][0])
+    return results, summary
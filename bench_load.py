@@ -0,0 +1,229 @@
+"""Offline load benchmark: drive the app against a local eCourts stand-in.
+
+Starts ecourts_standin.py on the pages in downloads/raw, runs the app as a
+separate process (FETCH_MODE=http, throwaway database and download folder)
+pointed at it, and fires each scenario at it from a pool of concurrent
+clients. Reports latency percentiles, throughput, errors and the server's
+peak RSS:
+
+    python bench_load.py --concurrency 8 --requests 200 --latency-ms 80 --error-rate 0.02
+    python bench_load.py --json baseline.json
+    python bench_load.py --baseline baseline.json --max-regression 0.2   # exits 1 on regression
+"""
+import argparse, json, math, os, resource, socket, subprocess, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from ecourts_standin import start_standin
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CAUSE_DATE = '2025-10-06'
+
+
+def _search(i, refresh=True):
+    return 'POST', '/api/search', {'case_type': 'WP(C)', 'case_number': str(i), 'year': 2024,
+                                   'court_type': 'high_court', 'force_refresh': refresh}
+
+
+# name -> request builder taking the request number
+SCENARIOS = {
+    'init': lambda i: ('GET', '/api/init', None),
+    'search': lambda i: _search(i),
+    'search_cached': lambda i: _search(i % 10, refresh=False),
+    'causes': lambda i: ('GET', f'/api/causes?date={CAUSE_DATE}&refresh=1', None),
+    'causes_cached': lambda i: ('GET', f'/api/causes?date={CAUSE_DATE}', None),
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return round(sorted_values[index], 1)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+    }
+
+
+def peak_rss_mb(pid):
+    """Peak resident set size of ``pid`` (Linux ``VmHWM``), or None where unavailable."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_app(env, port, timeout=60):
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT, env=env,
+                   check=True, capture_output=True)
+    proc = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port),
+                             '--no-reload', '--no-debugger', '--with-threads'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('App server exited during startup')
+        try:
+            if requests.get(base + '/api/hosts', timeout=2).status_code == 200:
+                return proc, base
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError('App server did not become ready')
+
+
+def run_scenario(base, build, total, concurrency, timeout):
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, body = build(i)
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, base + path, json=body, timeout=timeout)
+            ok = resp.status_code < 400 and (resp.headers.get('Content-Type', '').startswith('application/json')
+                                             and resp.json().get('success', True))
+        except requests.RequestException:
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return summarize([ms for ms, _ in results], sum(1 for _, ok in results if not ok), elapsed)
+
+
+def run_persist(total, concurrency, tmp):
+    """Write synthetic cases through save_case_graph in this process, against its own database."""
+    os.environ.update(DATABASE_URL='sqlite:///' + os.path.join(tmp, 'persist.db'), LOG_FILE='')
+    import app as app_module
+    from persistence import save_case_graph
+    app_module.init_db()
+
+    def one(i):
+        case = {'case_details': {'cnr_number': f'BENCH{i:08d}', 'status': 'Pending', 'filing_date': '2024-01-15'},
+                'parties': [{'type': 'Petitioner', 'name': f'Petitioner {i}'},
+                            {'type': 'Respondent', 'name': 'State'}],
+                'orders': [{'order_date': '2024-02-01', 'order_type': 'Interim', 'order_text': 'Adjourned.'}] * 3}
+        start = time.perf_counter()
+        try:
+            with app_module.app.app_context():
+                save_case_graph({'case_type': 'WP(C)', 'case_number': str(i), 'year': 2024,
+                                 'court_type': 'high_court'}, case)
+            ok = True
+        except Exception:
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    summary = summarize([ms for ms, _ in results], sum(1 for _, ok in results if not ok), elapsed)
+    summary['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return summary
+
+
+def compare(results, baseline, max_regression):
+    """Return human-readable regressions of p95 latency or throughput beyond ``max_regression``."""
+    problems = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before.get('p95_ms') and current['p95_ms'] and current['p95_ms'] > before['p95_ms'] * (1 + max_regression):
+            problems.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if before.get('rps') and current['rps'] and current['rps'] < before['rps'] * (1 - max_regression):
+            problems.append(f"{name}: throughput {before['rps']} -> {current['rps']} req/s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(list(SCENARIOS) + ['persist']),
+                        help='Comma-separated subset of: ' + ', '.join(list(SCENARIOS) + ['persist']))
+    parser.add_argument('--requests', type=int, default=100, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=60, help='Client timeout per request (s)')
+    parser.add_argument('--raw-dir', default=os.path.join(ROOT, 'downloads', 'raw'), help='Fixture pages')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Stand-in response delay')
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of stand-in requests that fail')
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--rate-limit', action='store_true', help='Keep the per-host governor enabled')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Earlier --json output to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    unknown = set(names) - set(SCENARIOS) - {'persist'}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        http_names = [n for n in names if n in SCENARIOS]
+        if http_names:
+            standin = start_standin(args.raw_dir, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                                    error_rate=args.error_rate, error_status=args.error_status, seed=1)
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'app.db'),
+                       DOWNLOAD_FOLDER=os.path.join(tmp, 'downloads'), LOG_FILE='', FETCH_MODE='http',
+                       HIGH_COURT_URL=standin.url + '/hcservices/main.php',
+                       DISTRICT_COURT_URL=standin.url + '/ecourtindia_v6/',
+                       RATE_LIMIT_ENABLED='1' if args.rate_limit else '0',
+                       RATE_LIMIT_DB=os.path.join(tmp, 'rate_limits.db'),
+                       DRIVER_POOL_MAX_SIZE=str(args.concurrency))
+            proc, base = start_app(env, free_port())
+            try:
+                for name in http_names:
+                    if name.endswith('_cached'):
+                        run_scenario(base, SCENARIOS[name], min(args.requests, 10), 1, args.timeout)  # warm up
+                    results[name] = run_scenario(base, SCENARIOS[name], args.requests, args.concurrency, args.timeout)
+                    results[name]['peak_rss_mb'] = peak_rss_mb(proc.pid)
+                    print(f"{name:<14} {results[name]}", flush=True)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+            print(f"stand-in: {standin.stats}")
+            standin.shutdown()
+        if 'persist' in names:
+            results['persist'] = run_persist(args.requests, args.concurrency, tmp)
+            print(f"{'persist':<14} {results['persist']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
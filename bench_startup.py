@@ -0,0 +1,83 @@
+"""Measure how long a fresh worker takes to import the app and serve its first request.
+
+Each run starts a new interpreter, so module caches are cold as they would
+be in a newly forked gunicorn worker:
+
+    python bench_startup.py --runs 10
+
+A throwaway SQLite database is initialized first unless --database is given.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+HEAVY_MODULES = ('selenium', 'webdriver_manager', 'PIL', 'lxml', 'requests', 'pandas', 'pyarrow',
+                 'openpyxl', 'pdfplumber', 'PyPDF2')
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': response.status_code,
+    'heavy_modules': [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_child(env, code, *args):
+    result = subprocess.run([sys.executable, *args, '-c', code], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    return result
+
+
+def import_profile(env, top):
+    """Largest cumulative import times (ms) of top-level modules, from ``-X importtime``."""
+    stderr = run_child(env, 'import app', '-X', 'importtime').stderr
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:  # modules imported directly by app
+            modules[name.strip()] = int(cumulative) / 1000
+    return sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def summarize(values):
+    values = sorted(values)
+    return {'min': round(values[0], 1), 'median': round(statistics.median(values), 1),
+            'max': round(values[-1], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database', help='DATABASE_URL to use instead of a temporary SQLite file')
+    parser.add_argument('--top', type=int, default=10, help='Modules to list in the import profile')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, LOG_FILE='')
+        env['DATABASE_URL'] = args.database or 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        if not args.database:
+            run_child(env, 'import app; app.init_db()')
+
+        runs = [json.loads(run_child(env, CHILD).stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+        profile = import_profile(env, args.top)
+
+    print(f"runs: {args.runs}")
+    print(f"import app (ms):    {summarize([r['import_ms'] for r in runs])}")
+    print(f"first request (ms): {summarize([r['first_request_ms'] for r in runs])}")
+    print(f"heavy modules loaded by import + first request: {runs[-1]['heavy_modules'] or 'none'}")
+    print("slowest direct imports of app (cumulative ms):")
+    for name, ms in profile:
+        print(f"  {name:<24} {ms:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
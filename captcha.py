@@ -1,11 +1,29 @@
 # utils/captcha.py
 import random
 import string
+import threading
+import time
+import uuid
+import glob
+import logging
+from collections import OrderedDict, deque
+from functools import lru_cache
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
 import os
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def get_font(size=36):
+    """Load the CAPTCHA font once per process."""
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
 def generate_captcha():
+    from PIL import Image, ImageDraw  # imported on first render, off the app import path
     # Generate random text
     captcha_text = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
     
@@ -23,10 +41,7 @@ def generate_captcha():
         draw.line([(x1, y1), (x2, y2)], fill=(200, 200, 200), width=2)
     
     # Add text
-    try:
-        font = ImageFont.truetype("arial.ttf", 36)
-    except:
-        font = ImageFont.load_default()
+    font = get_font()
     
     # Draw each character with random position and rotation
     x = 10
@@ -48,4 +63,120 @@ def generate_captcha():
     image.save(buffer, format='PNG')
     image_data = buffer.getvalue()
     
-    return captcha_text, image_data
\ No newline at end of file
+    return captcha_text, image_data
+
+
+class CaptchaPool:
+    """Pre-rendered CAPTCHAs handed out without rendering on the request path.
+
+    A background thread keeps ``size`` images ready. ``take`` pops one and
+    returns its PNG for inlining in the response. It also remembers the PNG
+    so ``image`` can serve it for ``ttl`` seconds (at most ``max_issued`` are
+    kept). Those copies live only in the process that issued them.
+    """
+
+    def __init__(self, size=32, ttl=600, max_issued=10000):
+        self.size = size
+        self.ttl = ttl
+        self.max_issued = max_issued
+        self._ready = deque()
+        self._issued = OrderedDict()  # captcha_id -> (expires_at, png)
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+        self.stats = {'served_from_pool': 0, 'rendered_inline': 0, 'expired': 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refill, name='captcha-refill', daemon=True)
+                self._thread.start()
+        self._wanted.set()
+
+    def _refill(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            while len(self._ready) < self.size:
+                try:
+                    self._ready.append(generate_captcha())
+                except Exception:
+                    logger.exception("Failed to pre-render CAPTCHA")
+                    time.sleep(1)
+                    break
+
+    def take(self):
+        """Return ``(captcha_id, text, png)``; the image also stays available via ``image``."""
+        try:
+            text, png = self._ready.popleft()
+            source = 'served_from_pool'
+        except IndexError:
+            text, png = generate_captcha()
+            source = 'rendered_inline'
+        self._wanted.set()
+        captcha_id = str(uuid.uuid4())
+        now = time.monotonic()
+        with self._lock:
+            self.stats[source] += 1
+            self._evict(now)
+            self._issued[captcha_id] = (now + self.ttl, png)
+            while len(self._issued) > self.max_issued:
+                self._issued.popitem(last=False)
+        return captcha_id, text, png
+
+    def image(self, captcha_id):
+        with self._lock:
+            entry = self._issued.get(captcha_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def discard(self, captcha_id):
+        with self._lock:
+            self._issued.pop(captcha_id, None)
+
+    def _evict(self, now):
+        # Entries are in issue order and share one ttl, so expired ones are at the front.
+        while self._issued:
+            captcha_id, (expires_at, _) = next(iter(self._issued.items()))
+            if expires_at > now:
+                break
+            del self._issued[captcha_id]
+            self.stats['expired'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, ready=len(self._ready), issued=len(self._issued), size=self.size)
+
+
+def remove_legacy_files(folder):
+    """Delete CAPTCHA PNGs left on disk by the old file-based flow."""
+    removed = 0
+    for path in glob.glob(os.path.join(folder, 'captcha_*.png')):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_captcha_pool(config):
+    """Return the process-wide CAPTCHA pool, starting its refill thread on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CaptchaPool(
+                size=config.get('CAPTCHA_POOL_SIZE', 32),
+                ttl=config.get('CAPTCHA_TTL', 600),
+                max_issued=config.get('CAPTCHA_MAX_ISSUED', 10000)
+            )
+            _pool.start()
+            removed = remove_legacy_files(config.get('CAPTCHA_FOLDER', os.path.join('static', 'captcha')))
+            if removed:
+                logger.info("Removed %d legacy CAPTCHA files", removed)
+    return _pool
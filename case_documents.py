@@ -0,0 +1,107 @@
+import threading, time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import CaseSearch, CaseDetail, Party, CourtOrder
+from metrics import CACHE_LOOKUPS
+
+
+class CaseDocumentCache:
+    """In-process LRU of rendered case documents keyed by CaseSearch id.
+
+    ORM writes to a cached case invalidate it when their transaction commits.
+    Writes made with bulk ``insert``/``update`` statements bypass the ORM and
+    must call ``invalidate``/``invalidate_case`` themselves. Entries also
+    expire after ``ttl`` seconds, which bounds staleness when another worker
+    process did the write.
+    """
+
+    def __init__(self, max_entries=1000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._docs = OrderedDict()  # search_id -> (expires_at, doc)
+        self._case_to_search = {}  # CaseDetail id -> search_id, for party/order writes
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get(self, search_id, loader):
+        """Return the cached document, calling ``loader(search_id)`` on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._docs.get(search_id)
+            if cached and cached[0] > now:
+                self._docs.move_to_end(search_id)
+                self.stats['hits'] += 1
+                CACHE_LOOKUPS.inc(cache='case_document', result='hit')
+                return cached[1]
+            self.stats['misses'] += 1
+        CACHE_LOOKUPS.inc(cache='case_document', result='miss')
+        doc = loader(search_id)
+        if doc is not None:
+            self.put(search_id, doc)
+        return doc
+
+    def put(self, search_id, doc):
+        with self._lock:
+            self._docs[search_id] = (time.monotonic() + self.ttl, doc)
+            self._docs.move_to_end(search_id)
+            if doc.get('case_id') is not None:
+                self._case_to_search[doc['case_id']] = search_id
+            while len(self._docs) > self.max_entries:
+                old_id, (_, old_doc) = self._docs.popitem(last=False)
+                self._forget_case(old_doc)
+                self.stats['evictions'] += 1
+
+    def _forget_case(self, doc):
+        self._case_to_search.pop(doc.get('case_id'), None)
+
+    def invalidate(self, search_id):
+        with self._lock:
+            cached = self._docs.pop(search_id, None)
+            if cached:
+                self._forget_case(cached[1])
+                self.stats['invalidations'] += 1
+
+    def invalidate_case(self, case_id):
+        """Invalidate by CaseDetail id, e.g. after writing parties or orders."""
+        with self._lock:
+            search_id = self._case_to_search.get(case_id)
+        if search_id is not None:
+            self.invalidate(search_id)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._case_to_search.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._docs), max_entries=self.max_entries, ttl=self.ttl)
+
+    def install(self):
+        """Invalidate documents touched by ORM flushes once their transaction commits."""
+        event.listen(Session, 'after_flush', self._collect)
+        event.listen(Session, 'after_commit', self._apply)
+        event.listen(Session, 'after_soft_rollback', self._discard)
+
+    def _collect(self, session, flush_context):
+        pending = session.info.setdefault('case_doc_invalidations', (set(), set()))
+        search_ids, case_ids = pending
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, CaseSearch):
+                search_ids.add(obj.id)
+            elif isinstance(obj, CaseDetail):
+                search_ids.add(obj.search_id)
+                case_ids.add(obj.id)
+            elif isinstance(obj, (Party, CourtOrder)):
+                case_ids.add(obj.case_id)
+
+    def _apply(self, session):
+        search_ids, case_ids = session.info.pop('case_doc_invalidations', (set(), set()))
+        for search_id in search_ids:
+            self.invalidate(search_id)
+        for case_id in case_ids:
+            self.invalidate_case(case_id)
+
+    def _discard(self, session, previous_transaction):
+        session.info.pop('case_doc_invalidations', None)
@@ -0,0 +1,192 @@
+import hashlib, re
+from datetime import datetime
+from urllib.parse import urljoin
+
+# Bump when parsing changes so `flask backfill` re-parses archived case pages.
+PARSER_VERSION = 1
+
+# Label text (lower-cased, punctuation stripped) -> case_details field.
+LABEL_ALIASES = {
+    'cnr number': 'cnr_number', 'cnr no': 'cnr_number', 'cnr': 'cnr_number',
+    'filing number': 'filing_number', 'filing no': 'filing_number',
+    'filing date': 'filing_date', 'date of filing': 'filing_date',
+    'registration number': 'registration_number', 'registration no': 'registration_number',
+    'registration date': 'registration_date', 'date of registration': 'registration_date',
+    'next hearing date': 'next_hearing_date', 'next date': 'next_hearing_date',
+    'next date purpose': 'next_hearing_date',
+    'case status': 'status', 'stage of case': 'status', 'status': 'status',
+    'nature of disposal': 'disposal', 'decision date': 'decision_date',
+    'court number and judge': 'court_name', 'court no': 'court_name', 'court': 'court_name',
+    'coram': 'judge_name', 'judge': 'judge_name', 'hon ble judge': 'judge_name',
+}
+DATE_FIELDS = ('filing_date', 'registration_date', 'next_hearing_date', 'decision_date')
+DATE_FORMATS = ('%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y', '%Y-%m-%d', '%d %B %Y', '%d %b %Y', '%d-%b-%Y')
+
+# Order table header text -> order field.
+ORDER_HEADERS = {
+    'order date': 'order_date', 'order on': 'order_date', 'date of order': 'order_date', 'date': 'order_date',
+    'order details': 'order_type', 'order type': 'order_type', 'details': 'order_type', 'purpose': 'order_type',
+}
+
+PARTY_SECTIONS = (('petitioner', 'Petitioner'), ('appellant', 'Petitioner'), ('respondent', 'Respondent'))
+ADVOCATE_RE = re.compile(r'\badvocate\s*[-:]?\s*', re.I)
+NUMBERING_RE = re.compile(r'^\s*\d+\)\s*')
+
+
+def _text(el):
+    return ' '.join(''.join(el.itertext()).split())
+
+
+def _normalize(text):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def parse_date(value):
+    """Return ``value`` as YYYY-MM-DD, or None if it is not a recognisable date."""
+    if not value:
+        return None
+    value = re.sub(r'(\d)(st|nd|rd|th)\b', r'\1', value.strip())
+    match = re.search(r'\d{1,2}[-/.]\d{1,2}[-/.]\d{4}|\d{4}-\d{2}-\d{2}|\d{1,2}[- ][A-Za-z]+[- ]\d{4}', value)
+    if not match:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(match.group(0), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _labelled_values(doc):
+    """Yield ``(field, value)`` for label/value cell pairs anywhere in the page."""
+    for row in doc.iter('tr'):
+        cells = [c for c in row if c.tag in ('td', 'th')]
+        for label, value in zip(cells, cells[1:]):
+            field = LABEL_ALIASES.get(_normalize(_text(label)))
+            if field:
+                yield field, _text(value)
+
+
+def _party_blocks(doc):
+    """``(party_type, element)`` for each petitioner/respondent advocate block."""
+    for el in doc.iter():
+        if not isinstance(el.tag, str):
+            continue
+        classes = (el.get('class') or '').lower()
+        if 'advocate' in classes:
+            for marker, party_type in PARTY_SECTIONS:
+                if marker in classes:
+                    yield party_type, el
+                    break
+
+
+def _parties(doc):
+    """Petitioners and respondents from the eCourts '1) NAME Advocate- X' blocks."""
+    parties = []
+    for party_type, el in _party_blocks(doc):
+        section = []
+        for line in (line.strip() for line in el.itertext()):
+            if not line:
+                continue
+            if ADVOCATE_RE.match(line):
+                if section:
+                    section[-1]['advocate'] = ADVOCATE_RE.sub('', line, count=1).strip() or None
+            else:
+                name = NUMBERING_RE.sub('', line).strip()
+                if name:
+                    section.append({'type': party_type, 'name': name, 'advocate': None})
+        parties.extend(section)
+    return parties
+
+
+def _order_table(doc):
+    """``(fields, rows)`` of the first table whose header names an order date column."""
+    for table in doc.iter('table'):
+        rows = [[c for c in row if c.tag in ('td', 'th')] for row in table.iter('tr')]
+        rows = [cells for cells in rows if cells]
+        if not rows:
+            continue
+        fields = [ORDER_HEADERS.get(_normalize(_text(c))) for c in rows[0]]
+        if 'order_date' in fields:
+            return fields, rows[1:]
+    return None, []
+
+
+def _orders(doc, base_url):
+    fields, rows = _order_table(doc)
+    orders = []
+    for cells in rows:
+        if len(cells) != len(fields):
+            continue
+        order = {'order_date': None, 'order_type': None, 'pdf_url': None}
+        for field, cell in zip(fields, cells):
+            if field == 'order_date':
+                order['order_date'] = parse_date(_text(cell))
+            elif field:
+                order[field] = _text(cell) or None
+            links = cell.xpath('.//a/@href')
+            if links and not order['pdf_url']:
+                order['pdf_url'] = urljoin(base_url, links[0]) if base_url else links[0]
+        if order['order_date'] or order['pdf_url']:
+            orders.append(order)
+    return orders
+
+
+def _document(html):
+    import lxml.html
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    try:
+        return lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return None
+
+
+def section_fingerprints(html):
+    """Hash the text of each part of a case page that ``parse_case_page`` reads.
+
+    Returns ``{'details': ..., 'parties': ..., 'orders': ...}`` or None for
+    pages without case details. Scripts, form state and anything else around
+    these sections are left out, so an unchanged case hashes the same on
+    every fetch and its page need not be parsed again.
+    """
+    doc = _document(html)
+    if doc is None:
+        return None
+    details = [_text(row) for row in doc.iter('tr')
+               if any(LABEL_ALIASES.get(_normalize(_text(c))) for c in row if c.tag in ('td', 'th'))]
+    if not details:
+        return None
+    fields, rows = _order_table(doc)
+    sections = {
+        'details': details,
+        'parties': [' | '.join(line.strip() for line in el.itertext() if line.strip()) for _, el in _party_blocks(doc)],
+        'orders': [' | '.join([_text(c) for c in cells] + cells[0].getparent().xpath('.//a/@href'))
+                   for cells in rows],
+    }
+    return {name: hashlib.sha1('\n'.join(lines).encode('utf-8')).hexdigest() for name, lines in sections.items()}
+
+
+def parse_case_page(html, base_url=None):
+    """Parse an eCourts case status page into the ``case_data`` shape used by save_case_graph.
+
+    Returns None for pages that carry no case details (search forms, error
+    pages), so callers can tell "nothing to store" from "empty case".
+    """
+    doc = _document(html)
+    if doc is None:
+        return None
+    details = {}
+    for field, value in _labelled_values(doc):
+        if value and field not in details:
+            details[field] = value
+    if not details.get('cnr_number') and not details.get('registration_number'):
+        return None
+    for field in DATE_FIELDS:
+        if field in details:
+            details[field] = parse_date(details[field])
+    disposal = details.pop('disposal', None)
+    status = details.get('status') or ''
+    details['is_disposed'] = bool(disposal or details.get('decision_date') or 'disposed' in status.lower())
+    details.pop('decision_date', None)
+    return {'case_details': details, 'parties': _parties(doc), 'orders': _orders(doc, base_url)}
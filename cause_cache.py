@@ -0,0 +1,181 @@
+import json, logging, threading, traceback
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, CauseListCacheEntry
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_RESULTS = {'hits': 'hit', 'stale_hits': 'stale', 'misses': 'miss'}
+
+
+def normalize_date(date):
+    """Return the cause list date as YYYY-MM-DD, defaulting to today like the scraper does."""
+    if date:
+        try:
+            return datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+class CauseListCache:
+    """Database-backed cause list cache with stale-while-revalidate.
+
+    An entry younger than its court's TTL is served as a hit. Past the TTL
+    but within ``stale_seconds`` it is still served, and a background refresh
+    is started. Anything older is treated as a miss and fetched inline.
+    """
+
+    def __init__(self, app, fetcher, ttls=None, default_ttl=3600, stale_seconds=6 * 3600, max_entries=500):
+        self.app = app
+        self.fetcher = fetcher
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0, 'evictions': 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+        if name in LOOKUP_RESULTS:
+            CACHE_LOOKUPS.inc(n, cache='cause_list', result=LOOKUP_RESULTS[name])
+
+    def ttl_for(self, court_type):
+        return self.ttls.get(court_type, self.default_ttl)
+
+    @staticmethod
+    def make_key(date, court_type, state_code, district_code):
+        return '|'.join([date, court_type or '', state_code or '', district_code or ''])
+
+    def get(self, date=None, court_type='high_court', state_code='dl', district_code='dl', force_refresh=False):
+        """Return ``(cases, status)`` where status is 'hit', 'stale', 'miss' or 'refresh'."""
+        params = {'date': normalize_date(date), 'court_type': court_type,
+                  'state_code': state_code, 'district_code': district_code}
+        key = self.make_key(params['date'], court_type, state_code, district_code)
+        if force_refresh:
+            self._count('misses')
+            return self._fetch_and_store(key, params), 'refresh'
+        cached = self._lookup(key, params)
+        if cached is not None:
+            return cached
+
+        self._count('misses')
+        return self._fetch_and_store(key, params), 'miss'
+
+    def peek(self, date=None, court_type='high_court', state_code='dl', district_code='dl'):
+        """Like ``get`` but never fetches inline; returns None on a miss."""
+        params = {'date': normalize_date(date), 'court_type': court_type,
+                  'state_code': state_code, 'district_code': district_code}
+        cached = self._lookup(self.make_key(params['date'], court_type, state_code, district_code), params)
+        if cached is None:
+            self._count('misses')
+        return cached
+
+    def _lookup(self, key, params):
+        entry = CauseListCacheEntry.query.filter_by(cache_key=key).first()
+        if entry is None:
+            return None
+        age = (datetime.utcnow() - entry.fetched_at).total_seconds()
+        ttl = self.ttl_for(params['court_type'])
+        if age < ttl:
+            self._count('hits')
+            return json.loads(entry.payload), 'hit'
+        if age < ttl + self.stale_seconds:
+            self._count('stale_hits')
+            self._refresh_in_background(key, params)
+            return json.loads(entry.payload), 'stale'
+        return None
+
+    def _fetch_and_store(self, key, params):
+        cases = self.fetcher(**params)
+        # fetch_cause_list reports failures as an empty list, so empty
+        # results are never cached.
+        if cases:
+            self._store(key, params, cases)
+        return cases
+
+    def _store(self, key, params, cases):
+        payload = json.dumps(cases)
+        values = dict(list_date=params['date'], court_type=params['court_type'],
+                      state_code=params['state_code'], district_code=params['district_code'],
+                      payload=payload, size_bytes=len(payload), fetched_at=datetime.utcnow())
+        try:
+            updated = CauseListCacheEntry.query.filter_by(cache_key=key).update(values, synchronize_session=False)
+            if not updated:
+                db.session.add(CauseListCacheEntry(cache_key=key, **values))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker inserted the same key first; overwrite its row.
+            db.session.rollback()
+            CauseListCacheEntry.query.filter_by(cache_key=key).update(values, synchronize_session=False)
+            db.session.commit()
+        self.evict()
+
+    def _refresh_in_background(self, key, params):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, params),
+                         name='cause-list-refresh', daemon=True).start()
+
+    def _refresh(self, key, params):
+        try:
+            with self.app.app_context():
+                self._fetch_and_store(key, params)
+            self._count('refreshes')
+        except Exception:
+            self._count('refresh_errors')
+            logger.error("Background cause list refresh failed: %s", traceback.format_exc())
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def evict(self):
+        """Drop entries past every court's stale window, then the oldest beyond ``max_entries``."""
+        max_ttl = max([self.default_ttl] + list(self.ttls.values()))
+        cutoff = datetime.utcnow() - timedelta(seconds=max_ttl + self.stale_seconds)
+        removed = CauseListCacheEntry.query.filter(CauseListCacheEntry.fetched_at < cutoff).delete(synchronize_session=False)
+        overflow = CauseListCacheEntry.query.count() - self.max_entries
+        if overflow > 0:
+            oldest = (db.session.query(CauseListCacheEntry.id)
+                      .order_by(CauseListCacheEntry.fetched_at)
+                      .limit(overflow).subquery())
+            removed += (CauseListCacheEntry.query
+                        .filter(CauseListCacheEntry.id.in_(db.select(oldest.c.id)))
+                        .delete(synchronize_session=False))
+        db.session.commit()
+        if removed:
+            self._count('evictions', removed)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 3) if lookups else None
+        stats['entries'] = CauseListCacheEntry.query.count()
+        stats['bytes'] = db.session.query(db.func.coalesce(db.func.sum(CauseListCacheEntry.size_bytes), 0)).scalar()
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cause_cache(app, fetcher):
+    """Return the process-wide cause list cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CauseListCache(
+                app, fetcher,
+                ttls=app.config.get('CAUSE_LIST_TTLS'),
+                default_ttl=app.config.get('CAUSE_LIST_DEFAULT_TTL', 3600),
+                stale_seconds=app.config.get('CAUSE_LIST_STALE_SECONDS', 6 * 3600),
+                max_entries=app.config.get('CAUSE_LIST_CACHE_MAX_ENTRIES', 500),
+            )
+        return _cache
@@ -0,0 +1,98 @@
+import re
+from raw_store import iter_raw
+
+# Bump when parsing changes so `flask backfill` re-parses archived cause lists.
+PARSER_VERSION = 2
+
+# Header text (lower-cased, punctuation stripped) -> cause list entry field.
+HEADER_ALIASES = {
+    'sr no': 'serial', 's no': 'serial', 'sl no': 'serial', 'item no': 'serial', 'sno': 'serial',
+    'case no': 'case_number', 'case number': 'case_number', 'case details': 'case_number', 'case': 'case_number',
+    'party name': 'parties', 'parties': 'parties', 'party': 'parties',
+    'petitioner vs respondent': 'parties', 'petitioner versus respondent': 'parties',
+    'advocate': 'advocate', 'advocate name': 'advocate', 'petitioner advocate': 'advocate',
+    'respondent advocate': 'respondent_advocate',
+    'court no': 'court_name', 'court': 'court_name', 'court name': 'court_name',
+    'judge': 'judge_name', 'judge name': 'judge_name', 'coram': 'judge_name', 'hon ble judge': 'judge_name',
+    'bench': 'bench',
+    'time': 'hearing_time', 'hearing time': 'hearing_time',
+    'case type': 'case_type',
+    'stage': 'status', 'purpose': 'status', 'status': 'status', 'listing purpose': 'status',
+    'act section': 'section', 'section': 'section', 'under section': 'section',
+}
+
+
+def _cell_text(el):
+    return ' '.join(''.join(el.itertext()).split())
+
+
+def _normalize_header(text):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def _header_fields(cells):
+    """Map a header row to entry fields, or None if it is not a cause list header."""
+    fields = [HEADER_ALIASES.get(_normalize_header(_cell_text(c))) for c in cells]
+    return fields if 'case_number' in fields else None
+
+
+def parse_cause_list(chunks, defaults=None):
+    """Yield cause list entries from an iterable of HTML byte chunks.
+
+    Rows are parsed incrementally with lxml's pull parser and discarded as
+    soon as they are emitted, so memory stays flat however long the list is.
+    Only tables whose header row names a case-number column are read;
+    layout tables are skipped.
+    """
+    from lxml import etree
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    headers = []  # one entry per open <table>: field list, or None until a header row is seen
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _read_entries(parser, headers, defaults)
+    # close() flushes rows whose closing tags only arrive at EOF (or never, on a truncated page).
+    parser.close()
+    yield from _read_entries(parser, headers, defaults)
+
+
+def _read_entries(parser, headers, defaults):
+    for event, el in parser.read_events():
+        if el.tag == 'table':
+            if event == 'start':
+                headers.append(None)
+            else:
+                if headers:
+                    headers.pop()
+                el.clear()
+        elif el.tag == 'tr' and event == 'end' and headers:
+            entry = _row_entry(el, headers, defaults)
+            if entry:
+                yield entry
+            el.clear()
+            # Drop already-processed rows so the tree does not grow.
+            parent = el.getparent()
+            while parent is not None and el.getprevious() is not None:
+                del parent[0]
+
+
+def _row_entry(row, headers, defaults):
+    cells = [c for c in row if c.tag in ('td', 'th')]
+    if not cells:
+        return None
+    fields = headers[-1]
+    if fields is None:
+        headers[-1] = _header_fields(cells)
+        return None
+    if len(cells) != len(fields):
+        # Section headings and spacer rows span the table.
+        return None
+    entry = dict(defaults or {})
+    for field, cell in zip(fields, cells):
+        if field:
+            entry[field] = _cell_text(cell)
+    return entry if entry.get('case_number') else None
+
+
+def iter_cause_list(path, defaults=None, chunk_size=64 * 1024):
+    """Yield cause list entries straight from a saved (archived or legacy) page."""
+    return parse_cause_list(iter_raw(path, chunk_size=chunk_size), defaults=defaults)
@@ -0,0 +1,230 @@
+import json, logging, threading, traceback
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert
+from models import db, CauseListEntry
+from cause_cache import normalize_date
+
+logger = logging.getLogger(__name__)
+
+# Parsed entry fields copied into their own columns; the whole entry is kept in payload.
+ENTRY_COLUMNS = ('court_name', 'bench', 'judge_name', 'serial', 'case_number', 'parties', 'hearing_time')
+
+# Query filter -> (entry field, exact match). Court and bench match exactly so the
+# list index covers them; the rest are case-insensitive substring matches.
+FILTERS = {
+    'court': ('court_name', True),
+    'bench': ('bench', True),
+    'judge': ('judge_name', False),
+    'case_number': ('case_number', False),
+    'party': ('parties', False),
+}
+
+
+def list_params(date=None, court_type='high_court', state_code='dl', district_code='dl'):
+    return {'date': normalize_date(date), 'court_type': court_type,
+            'state_code': state_code, 'district_code': district_code}
+
+
+def _list_clause(params):
+    return (CauseListEntry.list_date == params['date'], CauseListEntry.court_type == params['court_type'],
+            CauseListEntry.state_code == params['state_code'],
+            CauseListEntry.district_code == params['district_code'])
+
+
+def parse_filters(args):
+    """Pick the non-empty cause list filters out of query-string values."""
+    return {name: args[name].strip() for name in FILTERS if (args.get(name) or '').strip()}
+
+
+def filter_entries(entries, filters):
+    """Apply ``filters`` to already loaded entries with the same rules as ``load_entries``."""
+    for name, value in filters.items():
+        field, exact = FILTERS[name]
+        if exact:
+            entries = [e for e in entries if e.get(field) == value]
+        else:
+            entries = [e for e in entries if value.lower() in (e.get(field) or '').lower()]
+    return entries
+
+
+def store_entries(params, cases, fetched_at=None, commit=True, batch_size=500):
+    """Replace the stored rows of one cause list with ``cases``, committing unless ``commit`` is false.
+
+    ``cases`` may be any iterable, e.g. a parser over the archived page;
+    rows are inserted ``batch_size`` at a time so the list is never held whole.
+    """
+    fetched_at = fetched_at or datetime.utcnow()
+    db.session.execute(delete(CauseListEntry).where(*_list_clause(params)))
+    rows, stored = [], 0
+    for entry in cases:
+        rows.append(dict({column: entry.get(column) for column in ENTRY_COLUMNS},
+                         list_date=params['date'], court_type=params['court_type'],
+                         state_code=params['state_code'], district_code=params['district_code'],
+                         payload=json.dumps(entry), fetched_at=fetched_at))
+        if len(rows) >= batch_size:
+            db.session.execute(insert(CauseListEntry), rows)
+            stored += len(rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(CauseListEntry), rows)
+        stored += len(rows)
+    if commit:
+        db.session.commit()
+    return stored
+
+
+def list_fetched_at(params):
+    """When the stored copy of a list was fetched, or None if there is none."""
+    return db.session.query(func.max(CauseListEntry.fetched_at)).filter(*_list_clause(params)).scalar()
+
+
+def load_entries(params, filters=None, max_age=None):
+    """Return ``(entries, fetched_at)`` for a stored list, or None if it is missing or older than ``max_age``."""
+    fetched_at = list_fetched_at(params)
+    if fetched_at is None:
+        return None
+    if max_age is not None and (datetime.utcnow() - fetched_at).total_seconds() > max_age:
+        return None
+    query = db.session.query(CauseListEntry.payload).filter(*_list_clause(params))
+    for name, value in (filters or {}).items():
+        field, exact = FILTERS[name]
+        column = getattr(CauseListEntry, field)
+        query = query.filter(column == value if exact else column.ilike(f'%{value}%'))
+    return [json.loads(payload) for (payload,) in query.order_by(CauseListEntry.id)], fetched_at
+
+
+def prune_entries(retention_days):
+    """Delete stored lists dated more than ``retention_days`` ago."""
+    cutoff = (datetime.now() - timedelta(days=retention_days)).strftime('%Y-%m-%d')
+    removed = db.session.execute(delete(CauseListEntry).where(CauseListEntry.list_date < cutoff)).rowcount
+    db.session.commit()
+    return removed
+
+
+def parse_targets(spec):
+    """Parse ``court_type:state_code:district_code`` items separated by commas."""
+    targets = []
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        parts = [p.strip() for p in item.split(':')] + ['dl', 'dl']
+        targets.append({'court_type': parts[0], 'state_code': parts[1] or 'dl', 'district_code': parts[2] or 'dl'})
+    return targets
+
+
+class CausePrefetcher:
+    """Fetch upcoming cause lists before they are asked for.
+
+    Every ``interval`` seconds each target court is checked for today and
+    the next ``days_ahead`` days, and lists that are missing or older than
+    ``refresh_seconds`` are fetched through ``fetcher`` (which stores the
+    entries). Freshness is re-read from the database before each fetch, so
+    processes running the scheduler side by side mostly skip each other's
+    work; to rule out duplicate scrapes, run it in one process or from cron
+    with ``flask prefetch-causes``.
+    """
+
+    def __init__(self, app, fetcher, targets, days_ahead=1, interval=1800, refresh_seconds=3 * 3600,
+                 retention_days=30):
+        self.app = app
+        self.fetcher = fetcher
+        self.targets = list(targets)
+        self.days_ahead = days_ahead
+        self.interval = interval
+        self.refresh_seconds = refresh_seconds
+        self.retention_days = retention_days
+        self._wake = threading.Condition()
+        self._stopped = False
+        self._lock = threading.Lock()
+        self.stats = {'runs': 0, 'fetched': 0, 'skipped': 0, 'failed': 0, 'entries': 0, 'last_run': None}
+
+    def start(self):
+        threading.Thread(target=self._loop, name='cause-prefetch', daemon=True).start()
+        logger.info("Prefetching cause lists for %d courts every %ds", len(self.targets), self.interval)
+
+    def stop(self):
+        with self._wake:
+            self._stopped = True
+            self._wake.notify_all()
+
+    def due(self, params):
+        fetched_at = list_fetched_at(params)
+        return fetched_at is None or (datetime.utcnow() - fetched_at).total_seconds() >= self.refresh_seconds
+
+    def run_once(self, start_date=None, force=False):
+        """Fetch every due list once; returns this pass's counters."""
+        start = datetime.strptime(normalize_date(start_date), '%Y-%m-%d')
+        counts = {'fetched': 0, 'skipped': 0, 'failed': 0, 'entries': 0}
+        for offset in range(self.days_ahead + 1):
+            date = (start + timedelta(days=offset)).strftime('%Y-%m-%d')
+            for target in self.targets:
+                params = list_params(date, **target)
+                if not force and not self.due(params):
+                    counts['skipped'] += 1
+                    continue
+                try:
+                    cases = self.fetcher(**params)
+                except Exception:
+                    db.session.rollback()
+                    cases = None
+                    logger.error("Cause list prefetch failed for %s: %s", params, traceback.format_exc())
+                if cases:
+                    counts['fetched'] += 1
+                    counts['entries'] += len(cases)
+                else:
+                    # Scraper failures come back as an empty list; the next pass retries.
+                    counts['failed'] += 1
+        prune_entries(self.retention_days)
+        with self._lock:
+            for name, n in counts.items():
+                self.stats[name] += n
+            self.stats['runs'] += 1
+            self.stats['last_run'] = datetime.utcnow().isoformat()
+        logger.info("Cause list prefetch: %s", counts)
+        return counts
+
+    def _loop(self):
+        while not self._stopped:
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception:
+                logger.error("Cause list prefetch error: %s", traceback.format_exc())
+            with self._wake:
+                if not self._stopped:
+                    self._wake.wait(self.interval)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(targets=self.targets, days_ahead=self.days_ahead, interval=self.interval)
+        return stats
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def make_prefetcher(app, fetcher):
+    config = app.config
+    return CausePrefetcher(
+        app, fetcher,
+        parse_targets(config.get('CAUSE_PREFETCH_TARGETS')),
+        days_ahead=config.get('CAUSE_PREFETCH_DAYS_AHEAD', 1),
+        interval=config.get('CAUSE_PREFETCH_INTERVAL', 0),
+        refresh_seconds=config.get('CAUSE_PREFETCH_REFRESH_SECONDS', 3 * 3600),
+        retention_days=config.get('CAUSE_LIST_RETENTION_DAYS', 30),
+    )
+
+
+def get_cause_prefetcher(app, fetcher):
+    """Return the process-wide prefetcher, started on first use, or None when it is disabled."""
+    global _prefetcher
+    if app.config.get('CAUSE_PREFETCH_INTERVAL', 0) <= 0:
+        return None
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = make_prefetcher(app, fetcher)
+            if _prefetcher.targets:
+                _prefetcher.start()
+        return _prefetcher
@@ -8,5 +8,152 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    DOWNLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'downloads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
\ No newline at end of file
+    # SQLite connection tuning (ignored for other databases)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    DOWNLOAD_FOLDER = os.environ.get('DOWNLOAD_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'downloads')
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    LOG_FILE = os.environ.get('LOG_FILE', 'scraper.log')  # opened when the app is set up; empty to disable
+
+    # ChromeDriver binary. When unset, webdriver-manager resolves it once and the
+    # result is cached in CHROMEDRIVER_CACHE so restarts work offline.
+    CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH')
+    CHROMEDRIVER_CACHE = os.environ.get('CHROMEDRIVER_CACHE') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'chromedriver.json')
+
+    # Court site entry points; override to point scrapers at another host (e.g. bench_load.py's stand-in)
+    HIGH_COURT_URL = os.environ.get('HIGH_COURT_URL')
+    DISTRICT_COURT_URL = os.environ.get('DISTRICT_COURT_URL')
+
+    # Browser page waits: seconds for each page type to become ready after navigating
+    PAGE_WAIT_TIMEOUTS = {
+        'case': float(os.environ.get('PAGE_WAIT_TIMEOUT_CASE', 10)),
+        'cause_list': float(os.environ.get('PAGE_WAIT_TIMEOUT_CAUSE_LIST', 15)),
+    }
+    PAGE_WAIT_POLL = float(os.environ.get('PAGE_WAIT_POLL', 0.1))  # seconds between readiness checks
+    # Lean browser profile (opt-in): eager page loads, no images or fonts, no requests
+    # to BROWSER_BLOCKED_HOSTS, and loading stopped past BROWSER_MAX_PAGE_BYTES (0 = no cap)
+    BROWSER_LEAN = os.environ.get('BROWSER_LEAN', '0').lower() in ('1', 'true', 'yes')
+    BROWSER_MAX_PAGE_BYTES = int(os.environ.get('BROWSER_MAX_PAGE_BYTES', 5 * 1024 * 1024))
+    BROWSER_BLOCKED_HOSTS = [h.strip() for h in os.environ.get(
+        'BROWSER_BLOCKED_HOSTS',
+        'google-analytics.com,googletagmanager.com,doubleclick.net,fonts.googleapis.com,fonts.gstatic.com,'
+        'facebook.net,facebook.com,twitter.com').split(',') if h.strip()]
+
+    # Warm WebDriver pool shared by /api/search and /api/causes
+    DRIVER_POOL_MIN_SIZE = int(os.environ.get('DRIVER_POOL_MIN_SIZE', 1))
+    DRIVER_POOL_MAX_SIZE = int(os.environ.get('DRIVER_POOL_MAX_SIZE', 4))
+    DRIVER_POOL_MAX_USES = int(os.environ.get('DRIVER_POOL_MAX_USES', 50))  # navigations before recycling
+    DRIVER_POOL_CHECKOUT_TIMEOUT = int(os.environ.get('DRIVER_POOL_CHECKOUT_TIMEOUT', 30))  # seconds
+
+    # Background scrape jobs (POST /api/search with "async": true)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2.0))  # seconds between queue polls
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))  # requeue running jobs with no heartbeat
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_STREAM_TIMEOUT = int(os.environ.get('JOB_STREAM_TIMEOUT', 300))  # max lifetime of an SSE stream
+
+    # Cause list cache (seconds). Entries older than the court's TTL are served
+    # stale while a background refresh runs, up to CAUSE_LIST_STALE_SECONDS.
+    CAUSE_LIST_TTLS = {
+        'high_court': int(os.environ.get('CAUSE_LIST_TTL_HIGH_COURT', 3600)),
+        'district_court': int(os.environ.get('CAUSE_LIST_TTL_DISTRICT_COURT', 1800)),
+    }
+    CAUSE_LIST_DEFAULT_TTL = int(os.environ.get('CAUSE_LIST_DEFAULT_TTL', 3600))
+    CAUSE_LIST_STALE_SECONDS = int(os.environ.get('CAUSE_LIST_STALE_SECONDS', 6 * 3600))
+    CAUSE_LIST_CACHE_MAX_ENTRIES = int(os.environ.get('CAUSE_LIST_CACHE_MAX_ENTRIES', 500))
+
+    # Cause list prefetch: every CAUSE_PREFETCH_INTERVAL seconds (0 disables the
+    # in-process scheduler) fetch today's and the next CAUSE_PREFETCH_DAYS_AHEAD
+    # days' lists for each court_type:state_code:district_code target.
+    CAUSE_PREFETCH_TARGETS = os.environ.get('CAUSE_PREFETCH_TARGETS', 'high_court:dl:dl')
+    CAUSE_PREFETCH_INTERVAL = int(os.environ.get('CAUSE_PREFETCH_INTERVAL', 0))
+    CAUSE_PREFETCH_DAYS_AHEAD = int(os.environ.get('CAUSE_PREFETCH_DAYS_AHEAD', 1))
+    CAUSE_PREFETCH_REFRESH_SECONDS = int(os.environ.get('CAUSE_PREFETCH_REFRESH_SECONDS', 3 * 3600))
+    CAUSE_PREFETCH_MAX_AGE = int(os.environ.get('CAUSE_PREFETCH_MAX_AGE', 24 * 3600))  # oldest stored list served
+    CAUSE_LIST_RETENTION_DAYS = int(os.environ.get('CAUSE_LIST_RETENTION_DAYS', 30))
+
+    # Case watchlist (/api/watchlist): due cases are checked every WATCH_POLL_INTERVAL
+    # seconds (0 disables the scheduler; `flask check-watchlist` still works).
+    WATCH_INTERVAL = int(os.environ.get('WATCH_INTERVAL', 6 * 3600))  # default seconds between checks of a case
+    WATCH_POLL_INTERVAL = int(os.environ.get('WATCH_POLL_INTERVAL', 0))
+    WATCH_WORKERS = int(os.environ.get('WATCH_WORKERS', 2))
+    WATCH_RETRY_SECONDS = int(os.environ.get('WATCH_RETRY_SECONDS', 600))  # after a failed check
+    WATCH_WEBHOOK_URL = os.environ.get('WATCH_WEBHOOK_URL')  # POSTed each change event as JSON
+
+    # Page fetching: 'auto' uses plain HTTP and falls back to Selenium only when
+    # a page needs a browser; 'selenium' always drives Chrome; 'http' never does.
+    FETCH_MODE = os.environ.get('FETCH_MODE', 'auto')
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))  # distinct hosts kept alive
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))  # connections per host
+    HTTP_TIMEOUT = int(os.environ.get('HTTP_TIMEOUT', 15))  # seconds
+
+    # Identical concurrent lookups share one scrape; the lock row of a worker
+    # that died mid-scrape is taken over after LOOKUP_LOCK_LEASE_SECONDS.
+    LOOKUP_LOCK_LEASE_SECONDS = int(os.environ.get('LOOKUP_LOCK_LEASE_SECONDS', 120))
+    LOOKUP_LOCK_POLL_INTERVAL = float(os.environ.get('LOOKUP_LOCK_POLL_INTERVAL', 0.25))
+
+    # Batch lookups (POST /api/search/batch)
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 500))
+    BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+    BATCH_COURT_CONCURRENCY = {
+        'high_court': int(os.environ.get('BATCH_HIGH_COURT_CONCURRENCY', 2)),
+        'district_court': int(os.environ.get('BATCH_DISTRICT_COURT_CONCURRENCY', 2)),
+    }
+    BATCH_DEFAULT_COURT_CONCURRENCY = int(os.environ.get('BATCH_DEFAULT_COURT_CONCURRENCY', 2))
+
+    # Shared per-host pacing and circuit breaking for court sites. State is kept
+    # in a SQLite file so all worker processes on a machine share one budget.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') not in ('0', 'false', 'False')
+    RATE_LIMIT_DB = os.environ.get('RATE_LIMIT_DB') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'rate_limits.db')
+    RATE_LIMIT_RATE = float(os.environ.get('RATE_LIMIT_RATE', 2.0))  # starting requests/second per host
+    RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 5))
+    RATE_LIMIT_MIN_RATE = float(os.environ.get('RATE_LIMIT_MIN_RATE', 0.2))
+    RATE_LIMIT_MAX_RATE = float(os.environ.get('RATE_LIMIT_MAX_RATE', 10.0))
+    RATE_LIMIT_MAX_CONCURRENCY = int(os.environ.get('RATE_LIMIT_MAX_CONCURRENCY', 8))
+    RATE_LIMIT_TARGET_LATENCY = float(os.environ.get('RATE_LIMIT_TARGET_LATENCY', 5.0))  # slower responses back off
+    RATE_LIMIT_ACQUIRE_TIMEOUT = int(os.environ.get('RATE_LIMIT_ACQUIRE_TIMEOUT', 30))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))  # consecutive failures
+    CIRCUIT_OPEN_SECONDS = int(os.environ.get('CIRCUIT_OPEN_SECONDS', 60))
+
+    # Case lookups younger than this (seconds) are answered from the database
+    # unless the request sets "force_refresh". 0 disables reuse for a court.
+    CASE_MAX_AGE = {
+        'high_court': int(os.environ.get('CASE_MAX_AGE_HIGH_COURT', 6 * 3600)),
+        'district_court': int(os.environ.get('CASE_MAX_AGE_DISTRICT_COURT', 6 * 3600)),
+    }
+    CASE_DEFAULT_MAX_AGE = int(os.environ.get('CASE_DEFAULT_MAX_AGE', 6 * 3600))
+
+    # In-process LRU of case documents served by /case/<id> and /api/search/<id>
+    CASE_DOC_CACHE_SIZE = int(os.environ.get('CASE_DOC_CACHE_SIZE', 1000))
+    CASE_DOC_CACHE_TTL = int(os.environ.get('CASE_DOC_CACHE_TTL', 300))  # seconds; bounds cross-worker staleness
+
+    # Pre-rendered CAPTCHAs served by /api/init
+    CAPTCHA_POOL_SIZE = int(os.environ.get('CAPTCHA_POOL_SIZE', 32))
+    CAPTCHA_TTL = int(os.environ.get('CAPTCHA_TTL', 600))  # seconds an issued image stays fetchable
+    CAPTCHA_MAX_ISSUED = int(os.environ.get('CAPTCHA_MAX_ISSUED', 10000))
+
+    # Judgment PDF downloads (flask download-pdfs)
+    PDF_FOLDER = os.environ.get('PDF_FOLDER') or os.path.join(DOWNLOAD_FOLDER, 'pdfs')
+    PDF_DOWNLOAD_WORKERS = int(os.environ.get('PDF_DOWNLOAD_WORKERS', 4))
+    PDF_DOWNLOAD_BATCH_SIZE = int(os.environ.get('PDF_DOWNLOAD_BATCH_SIZE', 50))  # rows per DB update
+    PDF_CHUNK_SIZE = int(os.environ.get('PDF_CHUNK_SIZE', 64 * 1024))
+
+    # Judgment text extraction (flask extract-pdf-text)
+    PDF_TEXT_FOLDER = os.environ.get('PDF_TEXT_FOLDER') or os.path.join(PDF_FOLDER, 'text')
+    PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', os.cpu_count() or 2))  # processes
+    PDF_EXTRACT_PAGES_PER_TASK = int(os.environ.get('PDF_EXTRACT_PAGES_PER_TASK', 16))
+    PDF_EXTRACT_BATCH_SIZE = int(os.environ.get('PDF_EXTRACT_BATCH_SIZE', 50))  # rows per DB update
+    PDF_TEXT_MAX_CHARS = int(os.environ.get('PDF_TEXT_MAX_CHARS', 2_000_000))  # per order_text; 0 = no limit
+
+    # Re-parsing the raw page archive (flask backfill)
+    BACKFILL_WORKERS = int(os.environ.get('BACKFILL_WORKERS', os.cpu_count() or 2))  # processes
+    BACKFILL_BATCH_SIZE = int(os.environ.get('BACKFILL_BATCH_SIZE', 200))  # pages per DB transaction
+
+    # Bulk exports (/api/export, flask export)
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))  # rows fetched and written per step
+
+    # Instrumentation (/metrics); Server-Timing exposes stage durations to every client, so it is opt-in
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '0').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,216 @@
+import atexit, logging, threading, time
+from collections import deque
+from contextlib import contextmanager
+from fetch_backends import get_http_backend
+from rate_limit import get_governor
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """Raised when no scraper could be checked out within the timeout."""
+
+
+class DriverPool:
+    """Bounded pool of warm CourtScraper instances.
+
+    Scrapers are checked out with ``pool.scraper()`` and returned when the
+    block exits. A scraper is recycled once it has served ``max_uses``
+    navigations, when its browser fails a health check, or when the block
+    raised a WebDriver error.
+    """
+
+    def __init__(self, min_size=1, max_size=4, max_uses=50, checkout_timeout=30,
+                 headless=True, download_dir='downloads', fetch_mode='selenium', http_backend=None, governor=None,
+                 driver_path=None, driver_cache=None, base_urls=None, wait_timeouts=None, wait_poll=0.1,
+                 lean=False, max_page_bytes=0, blocked_hosts=()):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self.headless = headless
+        self.download_dir = download_dir
+        self.fetch_mode = fetch_mode
+        self.http_backend = http_backend
+        self.governor = governor
+        self.driver_path = driver_path
+        self.driver_cache = driver_cache
+        self.base_urls = base_urls
+        self.wait_timeouts = wait_timeouts
+        self.wait_poll = wait_poll
+        self.lean = lean
+        self.max_page_bytes = max_page_bytes
+        self.blocked_hosts = blocked_hosts
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {'created': 0, 'recycled': 0, 'checkouts': 0, 'waits': 0}
+
+    def _create(self):
+        from scraper_fixed import CourtScraper  # pulls in the scraping stack on first use
+        scraper = CourtScraper(headless=self.headless, download_dir=self.download_dir,
+                               fetch_mode=self.fetch_mode, http_backend=self.http_backend,
+                               governor=self.governor, driver_path=self.driver_path,
+                               driver_cache=self.driver_cache, base_urls=self.base_urls,
+                               wait_timeouts=self.wait_timeouts, wait_poll=self.wait_poll, lean=self.lean,
+                               max_page_bytes=self.max_page_bytes, blocked_hosts=self.blocked_hosts)
+        with self._cond:
+            self.stats['created'] += 1
+        return scraper
+
+    def _destroy(self, scraper):
+        with self._cond:
+            self.stats['recycled'] += 1
+        scraper.close()
+
+    def warm(self, background=True):
+        """Launch scrapers until the pool holds ``min_size`` instances."""
+        if background:
+            threading.Thread(target=self.warm, kwargs={'background': False},
+                             name='driver-pool-warm', daemon=True).start()
+            return
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                scraper = self._create()
+            except Exception:
+                logger.error("Failed to pre-launch scraper for pool")
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                return
+            with self._cond:
+                self._idle.append(scraper)
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                scraper = self._checkout_idle(deadline, timeout)
+            if scraper is None:
+                break
+            if scraper.is_alive():
+                return scraper
+            logger.warning("Discarding unhealthy scraper from pool")
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            self._destroy(scraper)
+        try:
+            scraper = self._create()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats['checkouts'] += 1
+        return scraper
+
+    def _checkout_idle(self, deadline, timeout):
+        # Called with the lock held. Returns an idle scraper, or None after
+        # reserving a slot for a new one.
+        while True:
+            if self._closed:
+                raise PoolExhausted("Driver pool is closed")
+            if self._idle:
+                # LIFO keeps the most recently used browsers hot.
+                self.stats['checkouts'] += 1
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolExhausted(f"No scraper available after {timeout}s")
+            self.stats['waits'] += 1
+            self._cond.wait(remaining)
+
+    def release(self, scraper, broken=False):
+        recycle = broken or self._closed or scraper.navigations >= self.max_uses
+        with self._cond:
+            if not recycle:
+                self._idle.append(scraper)
+                self._cond.notify()
+                return
+            self._size -= 1
+            self._cond.notify()
+        logger.info("Recycling scraper after %s navigations (broken=%s)", scraper.navigations, broken)
+        self._destroy(scraper)
+        if not self._closed:
+            self.warm()
+
+    @contextmanager
+    def scraper(self, timeout=None):
+        with stage('pool_checkout'):
+            scraper = self.acquire(timeout)
+        broken = False
+        try:
+            yield scraper
+        except Exception as e:
+            from selenium.common.exceptions import WebDriverException
+            broken = isinstance(e, WebDriverException) or not scraper.is_alive()
+            raise
+        finally:
+            self.release(scraper, broken=broken)
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, size=self._size, idle=len(self._idle),
+                        min_size=self.min_size, max_size=self.max_size)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for scraper in idle:
+            scraper.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(config):
+    """Return the process-wide pool, creating and warming it on first use.
+
+    The pool is built lazily so that forked workers each launch their own
+    browsers instead of sharing the parent's Chrome processes.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            fetch_mode = config.get('FETCH_MODE', 'selenium')
+            _pool = DriverPool(
+                min_size=config.get('DRIVER_POOL_MIN_SIZE', 1),
+                max_size=config.get('DRIVER_POOL_MAX_SIZE', 4),
+                max_uses=config.get('DRIVER_POOL_MAX_USES', 50),
+                checkout_timeout=config.get('DRIVER_POOL_CHECKOUT_TIMEOUT', 30),
+                download_dir=config.get('DOWNLOAD_FOLDER', 'downloads'),
+                fetch_mode=fetch_mode,
+                http_backend=get_http_backend(config) if fetch_mode != 'selenium' else None,
+                governor=get_governor(config),
+                driver_path=config.get('CHROMEDRIVER_PATH'),
+                driver_cache=config.get('CHROMEDRIVER_CACHE'),
+                base_urls={'high_court': config.get('HIGH_COURT_URL'),
+                           'district_court': config.get('DISTRICT_COURT_URL')},
+                wait_timeouts=config.get('PAGE_WAIT_TIMEOUTS'),
+                wait_poll=config.get('PAGE_WAIT_POLL', 0.1),
+                lean=config.get('BROWSER_LEAN', False),
+                max_page_bytes=config.get('BROWSER_MAX_PAGE_BYTES', 0),
+                blocked_hosts=config.get('BROWSER_BLOCKED_HOSTS', ()),
+            )
+            _pool.warm()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,98 @@
+"""Local stand-in for the eCourts sites, serving archived pages for offline benchmarks.
+
+Every GET is answered with one of the fixture pages (round-robin) after an
+injected delay; a configurable fraction of requests fails instead:
+
+    python ecourts_standin.py --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+
+Point the app at it with HIGH_COURT_URL / DISTRICT_COURT_URL and FETCH_MODE=http.
+"""
+import argparse, glob, itertools, os, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from raw_store import SUFFIX, iter_raw
+
+
+def load_fixtures(raw_dir):
+    """Read every archived page (gzip objects and legacy ``*.html`` dumps) under ``raw_dir``."""
+    paths = sorted(glob.glob(os.path.join(raw_dir, 'objects', '**', '*' + SUFFIX), recursive=True))
+    paths += sorted(glob.glob(os.path.join(raw_dir, '*.html')))
+    return [b''.join(iter_raw(path)) for path in paths]
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pages, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, seed=None):
+        if not pages:
+            raise ValueError("No fixture pages to serve")
+        super().__init__(address, StandinHandler)
+        self.pages = itertools.cycle(pages)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'bytes': 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def next_response(self):
+        """Pick ``(delay, status, body)`` for one request."""
+        with self.lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.error_rate
+            body = b'Service Unavailable' if failed else next(self.pages)
+            self.stats['requests'] += 1
+            self.stats['errors'] += failed
+            self.stats['bytes'] += len(body)
+        return delay, self.error_status if failed else 200, body
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        delay, status, body = self.server.next_response()
+        time.sleep(delay)
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_standin(raw_dir, host='127.0.0.1', port=0, **options):
+    """Start a stand-in server on a background thread; returns the server (``.url``, ``.stats``)."""
+    server = StandinServer((host, port), load_fixtures(raw_dir), **options)
+    threading.Thread(target=server.serve_forever, name='ecourts-standin', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--raw-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'downloads', 'raw'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=500)
+    args = parser.parse_args()
+    server = StandinServer((args.host, args.port), load_fixtures(args.raw_dir), latency=args.latency_ms / 1000,
+                           jitter=args.jitter_ms / 1000, error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Serving {args.raw_dir} at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import csv, io
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from models import db, CaseSearch, CaseDetail, Party, CourtOrder
+
+FORMATS = ('csv', 'xlsx', 'parquet')
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+CASE_COLUMNS = [
+    CaseSearch.id.label('search_id'), CaseSearch.case_type, CaseSearch.case_number, CaseSearch.year,
+    CaseSearch.court_type, CaseSearch.search_date, CaseDetail.cnr_number,
+]
+DATASETS = {
+    'cases': CASE_COLUMNS + [
+        CaseDetail.filing_number, CaseDetail.registration_number, CaseDetail.filing_date,
+        CaseDetail.registration_date, CaseDetail.case_status, CaseDetail.is_disposed,
+        CaseDetail.next_hearing_date, CaseDetail.court_name, CaseDetail.judge_name,
+    ],
+    'parties': CASE_COLUMNS + [
+        Party.id.label('party_id'), Party.party_type, Party.name, Party.advocate_name,
+    ],
+    'orders': CASE_COLUMNS + [
+        CourtOrder.id.label('order_id'), CourtOrder.order_date, CourtOrder.order_type,
+        CourtOrder.pdf_url, CourtOrder.local_pdf_path, CourtOrder.downloaded,
+    ],
+}
+
+
+class ExportError(ValueError):
+    """Raised for unknown datasets/formats and malformed filters."""
+
+
+def _date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ExportError(f'{name} must be a YYYY-MM-DD date')
+
+
+def parse_filters(args):
+    """Validate export filters from query-string or CLI values (missing/empty means unfiltered)."""
+    filters = {key: args[key] for key in ('court_type', 'case_type', 'status') if args.get(key)}
+    if args.get('year'):
+        try:
+            filters['year'] = int(args['year'])
+        except (TypeError, ValueError):
+            raise ExportError('year must be a number')
+    if args.get('disposed') not in (None, ''):
+        filters['disposed'] = str(args['disposed']).lower() in ('1', 'true', 'yes')
+    if args.get('from'):
+        filters['from'] = _date(args['from'], 'from')
+    if args.get('to'):
+        filters['to'] = _date(args['to'], 'to') + timedelta(days=1)
+    filters['all_searches'] = str(args.get('all_searches', '')).lower() in ('1', 'true', 'yes')
+    filters['include_text'] = str(args.get('include_text', '')).lower() in ('1', 'true', 'yes')
+    return filters
+
+
+def build_query(dataset, filters):
+    """Return the column select for ``dataset``.
+
+    Unless ``all_searches`` is set, only the latest search of each case is
+    exported; refreshes otherwise repeat a case once per scrape.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}'; expected one of {', '.join(DATASETS)}")
+    columns = list(DATASETS[dataset])
+    if dataset == 'orders' and filters.get('include_text'):
+        columns.append(CourtOrder.order_text)
+    query = select(*columns).select_from(CaseSearch).join(CaseDetail, CaseDetail.search_id == CaseSearch.id)
+    if dataset == 'parties':
+        query = query.join(Party, Party.case_id == CaseDetail.id).order_by(CaseSearch.id, Party.id)
+    elif dataset == 'orders':
+        query = query.join(CourtOrder, CourtOrder.case_id == CaseDetail.id).order_by(CaseSearch.id, CourtOrder.id)
+    else:
+        query = query.order_by(CaseSearch.id)
+
+    for key, column in (('court_type', CaseSearch.court_type), ('case_type', CaseSearch.case_type),
+                        ('year', CaseSearch.year), ('status', CaseDetail.case_status),
+                        ('disposed', CaseDetail.is_disposed)):
+        if key in filters:
+            query = query.where(column == filters[key])
+    if 'from' in filters:
+        query = query.where(CaseSearch.search_date >= filters['from'])
+    if 'to' in filters:
+        query = query.where(CaseSearch.search_date < filters['to'])
+    if not filters.get('all_searches'):
+        latest = (select(func.max(CaseSearch.id))
+                  .group_by(CaseSearch.case_type, CaseSearch.case_number, CaseSearch.year, CaseSearch.court_type))
+        query = query.where(CaseSearch.id.in_(latest))
+    return query
+
+
+def iter_chunks(query, chunk_size):
+    """Yield lists of at most ``chunk_size`` rows, fetched incrementally from the cursor."""
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield partition
+
+
+def column_names(query):
+    return [c.name for c in query.selected_columns]
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    return value
+
+
+def stream_csv(query, chunk_size=1000):
+    """Yield the CSV export one chunk of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column_names(query))
+    for chunk in iter_chunks(query, chunk_size):
+        writer.writerows([_cell(v) for v in row] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_xlsx(query, fileobj, chunk_size=1000):
+    """Write an XLSX with openpyxl's write-only workbook, which spools rows to disk."""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('export')
+    sheet.append(column_names(query))
+    for chunk in iter_chunks(query, chunk_size):
+        for row in chunk:
+            sheet.append(list(row))
+    workbook.save(fileobj)
+
+
+def _arrow_schema(query):
+    import pyarrow as pa
+    fields = []
+    for column in query.selected_columns:
+        python_type = column.type.python_type
+        if python_type is bool:
+            arrow_type = pa.bool_()
+        elif python_type is int:
+            arrow_type = pa.int64()
+        elif python_type is datetime:
+            arrow_type = pa.timestamp('us')
+        elif python_type.__name__ == 'date':
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def write_parquet(query, fileobj, chunk_size=1000):
+    """Write a Parquet file with one row group per chunk."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError('Parquet export requires pyarrow')
+    schema = _arrow_schema(query)
+    names = schema.names
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for chunk in iter_chunks(query, chunk_size):
+            columns = {name: [row[i] for row in chunk] for i, name in enumerate(names)}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
@@ -0,0 +1,125 @@
+import logging, threading
+from metrics import PAGE_BYTES, PAGE_FETCHES
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/118.0 Safari/537.36')
+
+# Markers of bot-challenge interstitials that only a real browser can pass.
+# The court portals' own search CAPTCHA is part of a normal server-rendered
+# page and is deliberately not listed here. Pages that need JavaScript to
+# render are caught by the MIN_TEXT_LENGTH check instead, since "enable
+# JavaScript" notices also appear in <noscript> tags of ordinary pages.
+BROWSER_REQUIRED_MARKERS = (
+    'cf-challenge',
+    'challenge-platform',
+    'g-recaptcha',
+    'h-captcha',
+    'verify you are human',
+)
+MIN_TEXT_LENGTH = 200
+
+FETCH_MODES = ('auto', 'http', 'selenium')
+
+FETCH_STATS = {'http': 0, 'selenium': 0, 'escalations': 0, 'http_bytes': 0, 'http_seconds': 0.0,
+               'selenium_bytes': 0, 'selenium_seconds': 0.0, 'selenium_wait_seconds': 0.0}
+_stats_lock = threading.Lock()
+
+
+class FetchError(Exception):
+    """Raised in 'http' fetch mode when a page cannot be fetched without a browser."""
+
+
+def record_fetch(backend, seconds, nbytes=0, escalated=False, wait_seconds=0.0):
+    PAGE_FETCHES.inc(backend=backend)
+    PAGE_BYTES.inc(nbytes, backend=backend)
+    with _stats_lock:
+        FETCH_STATS[backend] += 1
+        FETCH_STATS[f'{backend}_seconds'] += seconds
+        FETCH_STATS[f'{backend}_bytes'] += nbytes
+        if backend == 'selenium':
+            FETCH_STATS['selenium_wait_seconds'] += wait_seconds
+        if escalated:
+            FETCH_STATS['escalations'] += 1
+
+
+def fetch_stats():
+    with _stats_lock:
+        return dict(FETCH_STATS)
+
+
+def needs_browser(html):
+    """Return why a page fetched over plain HTTP is unusable, or None if it is fine."""
+    if not html or not html.strip():
+        return 'empty response'
+    lowered = html.lower()
+    for marker in BROWSER_REQUIRED_MARKERS:
+        if marker in lowered:
+            return f'found marker {marker!r}'
+    import lxml.html
+    try:
+        doc = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return 'unparseable response'
+    for el in doc.xpath('//script|//style|//noscript'):
+        el.drop_tree()
+    if len(' '.join(doc.text_content().split())) < MIN_TEXT_LENGTH:
+        return 'page has no server-rendered content'
+    return None
+
+
+class HttpBackend:
+    """Keep-alive ``requests.Session`` shared by every scraper in the process."""
+
+    name = 'http'
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, timeout=15, retries=2):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(['GET', 'HEAD']))
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+
+    def fetch(self, url):
+        """Return ``(html, wire_bytes)``; raises ``requests.RequestException`` on failure."""
+        resp = self.session.get(url, timeout=self.timeout)
+        resp.raise_for_status()
+        wire_bytes = len(resp.content)
+        if resp.headers.get('Content-Length', '').isdigit():
+            # Content-Length is the compressed size when gzip was negotiated.
+            wire_bytes = int(resp.headers['Content-Length'])
+        return resp.text, wire_bytes
+
+    def close(self):
+        self.session.close()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_http_backend(config=None):
+    """Return the process-wide HTTP backend."""
+    global _backend
+    config = config or {}
+    with _backend_lock:
+        if _backend is None:
+            _backend = HttpBackend(
+                pool_connections=config.get('HTTP_POOL_CONNECTIONS', 10),
+                pool_maxsize=config.get('HTTP_POOL_MAXSIZE', 20),
+                timeout=config.get('HTTP_TIMEOUT', 15),
+            )
+        return _backend
+
@@ -0,0 +1,164 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import exists, select, tuple_
+from sqlalchemy.orm import aliased
+from models import db, CaseSearch, CaseDetail
+
+MAX_PAGE_SIZE = 1000
+
+COLUMNS = [
+    CaseDetail.id.label('case_id'), CaseSearch.id.label('search_id'), CaseSearch.case_type,
+    CaseSearch.case_number, CaseSearch.year, CaseSearch.court_type, CaseDetail.cnr_number,
+    CaseDetail.next_hearing_date, CaseDetail.court_name, CaseDetail.judge_name, CaseDetail.case_status,
+]
+
+
+class HearingQueryError(ValueError):
+    """Raised for malformed hearing filters or cursors."""
+
+
+def _date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise HearingQueryError(f'{name} must be a YYYY-MM-DD date')
+
+
+def parse_filters(args):
+    """Validate ``from``/``to`` (inclusive, ``from`` defaulting to today), ``court`` and ``judge``."""
+    filters = {'from': _date(args['from'], 'from') if args.get('from') else date.today()}
+    if args.get('to'):
+        filters['to'] = _date(args['to'], 'to')
+        if filters['to'] < filters['from']:
+            raise HearingQueryError('to must not be before from')
+    for key in ('court', 'judge'):
+        if (args.get(key) or '').strip():
+            filters[key] = args[key].strip()
+    return filters
+
+
+def _encode_cursor(hearing_date, case_id):
+    return f'{hearing_date.isoformat()}:{case_id}'
+
+
+def _decode_cursor(cursor):
+    try:
+        hearing_date, case_id = cursor.split(':', 1)
+        return datetime.strptime(hearing_date, '%Y-%m-%d').date(), int(case_id)
+    except (AttributeError, ValueError):
+        raise HearingQueryError('Invalid cursor')
+
+
+def build_query(filters, after=None):
+    """Hearings in date order, seeking past ``after = (date, case_id)`` rather than skipping rows.
+
+    Court and judge match exactly so that the ``(court_name|judge_name,
+    next_hearing_date, id)`` indexes serve both the filter and the order.
+    Only the latest search of each case is listed; older searches carry
+    stale hearing dates.
+    """
+    newer = aliased(CaseSearch)
+    query = (select(*COLUMNS)
+             .select_from(CaseDetail)
+             .join(CaseSearch, CaseSearch.id == CaseDetail.search_id)
+             .where(CaseDetail.next_hearing_date >= filters['from'])
+             .where(~exists().where(newer.case_type == CaseSearch.case_type,
+                                    newer.case_number == CaseSearch.case_number,
+                                    newer.year == CaseSearch.year,
+                                    newer.court_type == CaseSearch.court_type,
+                                    newer.id > CaseSearch.id))
+             .order_by(CaseDetail.next_hearing_date, CaseDetail.id))
+    if 'to' in filters:
+        query = query.where(CaseDetail.next_hearing_date <= filters['to'])
+    if 'court' in filters:
+        query = query.where(CaseDetail.court_name == filters['court'])
+    if 'judge' in filters:
+        query = query.where(CaseDetail.judge_name == filters['judge'])
+    if after:
+        query = query.where(tuple_(CaseDetail.next_hearing_date, CaseDetail.id) > tuple_(*after))
+    return query
+
+
+def _row(row):
+    return dict(row._mapping, next_hearing_date=row.next_hearing_date.isoformat())
+
+
+def hearing_page(filters, limit=100, cursor=None):
+    """One page of hearings; pass the returned ``next_cursor`` back as ``cursor``.
+
+    Returns ``(hearings, next_cursor)``, ``next_cursor`` being None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor) if cursor else None
+    rows = db.session.execute(build_query(filters, after).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].next_hearing_date, rows[-1].case_id)
+    return [_row(row) for row in rows], next_cursor
+
+
+def iter_hearings(filters, chunk_size=1000):
+    """Yield every matching hearing row, one short keyset query per ``chunk_size`` rows."""
+    after = None
+    while True:
+        rows = db.session.execute(build_query(filters, after).limit(chunk_size)).all()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1].next_hearing_date, rows[-1].case_id)
+
+
+def _ics_text(value):
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_line(line):
+    """Fold a content line at 75 octets as RFC 5545 requires."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # do not split a UTF-8 sequence
+        parts.append(encoded[start:end].decode('utf-8'))
+        start = end
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _ics_event(row, stamp, host):
+    case_label = f'{row.case_type} {row.case_number}/{row.year}'
+    description = [f'{label}: {value}' for label, value in (
+        ('Court', row.court_name), ('Judge', row.judge_name), ('CNR', row.cnr_number),
+        ('Status', row.case_status)) if value]
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:hearing-{row.case_id}-{row.next_hearing_date:%Y%m%d}@{host}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART;VALUE=DATE:{row.next_hearing_date:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{row.next_hearing_date + timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{_ics_text("Hearing: " + case_label)}',
+    ]
+    if row.court_name:
+        lines.append(f'LOCATION:{_ics_text(row.court_name)}')
+    if description:
+        lines.append(f'DESCRIPTION:{_ics_text(chr(10).join(description))}')
+    lines.append('END:VEVENT')
+    return ''.join(_ics_line(line) for line in lines)
+
+
+def stream_ics(filters, chunk_size=1000, host='court-data-fetcher'):
+    """Yield an iCalendar file of the matching hearings as all-day events, one chunk of events at a time."""
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    yield ''.join(_ics_line(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//court-data-fetcher//hearings//EN',
+        'CALSCALE:GREGORIAN', 'METHOD:PUBLISH', 'X-WR-CALNAME:Court hearings'))
+    chunk = []
+    for row in iter_hearings(filters, chunk_size):
+        chunk.append(_ics_event(row, stamp, host))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk) + 'END:VCALENDAR\r\n'
@@ -0,0 +1,165 @@
+import json, logging, threading, traceback, uuid
+from datetime import datetime, timedelta
+from models import db, ScrapeJob
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ('done', 'failed')
+
+
+class JobQueue:
+    """Background scrape workers fed from the ``scrape_jobs`` table.
+
+    Jobs are persisted before they are queued, so anything still queued when
+    the process dies is picked up again on the next start. Workers claim a job
+    with a conditional UPDATE, which keeps several processes sharing one
+    database from running the same job twice. Running jobs whose heartbeat is
+    older than ``lease_seconds`` are assumed orphaned and requeued. A job
+    whose runner raises is queued again until it has been tried
+    ``max_attempts`` times.
+    """
+
+    def __init__(self, app, runner, workers=2, poll_interval=2.0, lease_seconds=300, max_attempts=3):
+        self.app = app
+        self.runner = runner
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._wake = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f'scrape-worker-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info("Started %d scrape workers", self.workers)
+
+    def stop(self):
+        with self._wake:
+            self._stopped = True
+            self._wake.notify_all()
+
+    def submit(self, params):
+        job = ScrapeJob(id=str(uuid.uuid4()), status='queued', progress='queued', params=json.dumps(params))
+        db.session.add(job)
+        db.session.commit()
+        with self._wake:
+            self._wake.notify()
+        return job
+
+    def _work(self):
+        while not self._stopped:
+            try:
+                with self.app.app_context():
+                    job_id = self._claim()
+                    if job_id:
+                        self._run(job_id)
+                        continue
+            except Exception:
+                logger.error("Scrape worker error: %s", traceback.format_exc())
+            with self._wake:
+                if not self._stopped:
+                    self._wake.wait(self.poll_interval)
+
+    def _claim(self):
+        self._requeue_stale()
+        candidates = (db.session.query(ScrapeJob.id)
+                      .filter_by(status='queued')
+                      .order_by(ScrapeJob.created_at)
+                      .limit(5).all())
+        for (job_id,) in candidates:
+            claimed = (ScrapeJob.query
+                       .filter_by(id=job_id, status='queued')
+                       .update({'status': 'running', 'progress': 'starting',
+                                'attempts': ScrapeJob.attempts + 1,
+                                'updated_at': datetime.utcnow()},
+                               synchronize_session=False))
+            db.session.commit()
+            if claimed:
+                return job_id
+        return None
+
+    def _requeue_stale(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        stale = ScrapeJob.query.filter(ScrapeJob.status == 'running', ScrapeJob.updated_at < cutoff)
+        for job in stale.all():
+            if (job.attempts or 0) >= self.max_attempts:
+                job.status, job.error, job.finished_at = 'failed', 'Worker lease expired', datetime.utcnow()
+            else:
+                job.status, job.progress = 'queued', 'requeued'
+            job.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    def _set_progress(self, job_id, stage):
+        ScrapeJob.query.filter_by(id=job_id).update(
+            {'progress': stage, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+    def _start_heartbeat(self, job_id):
+        """Keep the running job's ``updated_at`` fresh until the returned event is set.
+
+        A lookup can sit in one stage (rate limiter, circuit breaker, an
+        identical lookup in another worker) for longer than the lease.
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    with self.app.app_context():
+                        ScrapeJob.query.filter_by(id=job_id, status='running').update(
+                            {'updated_at': datetime.utcnow()}, synchronize_session=False)
+                        db.session.commit()
+                except Exception:
+                    logger.warning("Could not renew lease of scrape job %s", job_id, exc_info=True)
+
+        threading.Thread(target=beat, name='scrape-job-heartbeat', daemon=True).start()
+        return stop
+
+    def _run(self, job_id):
+        job = db.session.get(ScrapeJob, job_id)
+        params = json.loads(job.params)
+        logger.info("Running scrape job %s (attempt %s)", job_id, job.attempts)
+        stop = self._start_heartbeat(job_id)
+        try:
+            search_id = self.runner(params, progress=lambda stage: self._set_progress(job_id, stage))
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Scrape job %s failed: %s", job_id, traceback.format_exc())
+            job = db.session.get(ScrapeJob, job_id)
+            job.error = str(e)
+            if (job.attempts or 0) < self.max_attempts:
+                job.status, job.progress = 'queued', 'retrying'
+                job.updated_at = datetime.utcnow()
+                db.session.commit()
+                return
+            job.status = 'failed'
+        else:
+            job = db.session.get(ScrapeJob, job_id)
+            job.status, job.search_id, job.progress = 'done', search_id, 'done'
+        finally:
+            stop.set()
+        job.updated_at = job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(app, runner):
+    """Return the process-wide job queue, starting its workers on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(
+                app, runner,
+                workers=app.config.get('JOB_WORKERS', 2),
+                poll_interval=app.config.get('JOB_POLL_INTERVAL', 2.0),
+                lease_seconds=app.config.get('JOB_LEASE_SECONDS', 300),
+                max_attempts=app.config.get('JOB_MAX_ATTEMPTS', 3),
+            )
+            _queue.start()
+        return _queue
@@ -0,0 +1,161 @@
+import bisect, threading, time
+from contextlib import contextmanager
+
+# Seconds; spans a cached DB read up to a slow browser navigation.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {series[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('ecourts_stage_seconds', 'Time spent in each lookup stage.', ['stage'])
+REQUEST_SECONDS = Histogram('ecourts_http_request_seconds', 'Time to serve HTTP requests.',
+                            ['endpoint', 'method', 'status'])
+DRIVER_LAUNCHES = Counter('ecourts_driver_launches_total', 'Chrome WebDriver sessions started.')
+PAGE_FETCHES = Counter('ecourts_page_fetches_total', 'Court pages fetched, by backend.', ['backend'])
+PAGE_BYTES = Counter('ecourts_page_bytes_total', 'Bytes of court pages fetched, by backend.', ['backend'])
+PAGE_WAIT_OUTCOMES = Counter('ecourts_page_wait_outcomes_total',
+                             'Browser page readiness waits by page type and outcome (ready, timeout, byte_cap).',
+                             ['page', 'outcome'])
+CACHE_LOOKUPS = Counter('ecourts_cache_lookups_total', 'Cache lookups by cache and result.', ['cache', 'result'])
+LOOKUPS_COALESCED = Counter('ecourts_lookups_coalesced_total',
+                            'Case lookups answered by an identical in-flight scrape (scrapes saved), '
+                            'by where that scrape ran.', ['scope'])
+WATCH_CHECKS = Counter('ecourts_watch_checks_total',
+                       'Watchlist checks by result (unchanged, baseline, changed, failed).', ['result'])
+WATCH_CHANGES = Counter('ecourts_watch_changes_total', 'Watchlist checks that found changes, by section.',
+                        ['section'])
+DB_COMMITS = Counter('ecourts_db_commits_total', 'Database transactions committed through the ORM session.')
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, DRIVER_LAUNCHES, PAGE_FETCHES, PAGE_BYTES, PAGE_WAIT_OUTCOMES,
+            CACHE_LOOKUPS, LOOKUPS_COALESCED, WATCH_CHECKS, WATCH_CHANGES, DB_COMMITS]
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """Time a block into ``ecourts_stage_seconds`` and the current request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def start_request_timings():
+    _local.timings = {}
+
+
+def pop_request_timings():
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    return timings or {}
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def install(app, server_timing=False):
+    """Time every request, count ORM commits and, optionally, add a Server-Timing header.
+
+    Metrics are kept per process; with several workers each one is scraped
+    (or aggregated) separately.
+    """
+    from flask import g, request
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    event.listen(Session, 'after_commit', lambda session: DB_COMMITS.inc())
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        start_request_timings()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('request_started', None)
+        timings = pop_request_timings()
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unmatched', method=request.method,
+                                status=response.status_code)
+        if server_timing:
+            parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in timings.items()]
+            parts.append(f'total;dur={elapsed * 1000:.1f}')
+            response.headers['Server-Timing'] = ', '.join(parts)
+        return response
@@ -1,10 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import json
 
 db = SQLAlchemy()
 
 class CaseSearch(db.Model):
     __tablename__ = 'case_searches'
+    __table_args__ = (
+        db.Index('ix_case_searches_lookup', 'case_type', 'case_number', 'year', 'court_type', 'search_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     case_type = db.Column(db.String(100), nullable=False)
     case_number = db.Column(db.String(50), nullable=False)
@@ -16,9 +20,16 @@ class CaseSearch(db.Model):
 
 class CaseDetail(db.Model):
     __tablename__ = 'case_details'
+    # Hearing calendar (hearings.py): range scans by date, optionally within one
+    # court or judge, ordered by (date, id) for keyset pagination.
+    __table_args__ = (
+        db.Index('ix_case_details_hearing', 'next_hearing_date', 'id'),
+        db.Index('ix_case_details_court_hearing', 'court_name', 'next_hearing_date', 'id'),
+        db.Index('ix_case_details_judge_hearing', 'judge_name', 'next_hearing_date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    search_id = db.Column(db.Integer, db.ForeignKey('case_searches.id'), nullable=False)
-    cnr_number = db.Column(db.String(50))
+    search_id = db.Column(db.Integer, db.ForeignKey('case_searches.id'), nullable=False, index=True)
+    cnr_number = db.Column(db.String(50), index=True)
     filing_number = db.Column(db.String(100))
     registration_number = db.Column(db.String(100))
     filing_date = db.Column(db.Date)
@@ -31,21 +42,217 @@ class CaseDetail(db.Model):
     parties = db.relationship('Party', backref='case', lazy=True, cascade='all, delete-orphan')
     orders = db.relationship('CourtOrder', backref='case', lazy=True, cascade='all, delete-orphan')
 
+    def to_dict(self):
+        return {
+            'cnr_number': self.cnr_number,
+            'filing_number': self.filing_number,
+            'registration_number': self.registration_number,
+            'filing_date': self.filing_date.isoformat() if self.filing_date else None,
+            'registration_date': self.registration_date.isoformat() if self.registration_date else None,
+            'case_status': self.case_status,
+            'court_name': self.court_name,
+            'judge_name': self.judge_name,
+            'next_hearing_date': self.next_hearing_date.isoformat() if self.next_hearing_date else None,
+            'is_disposed': self.is_disposed
+        }
+
 class Party(db.Model):
     __tablename__ = 'parties'
     id = db.Column(db.Integer, primary_key=True)
-    case_id = db.Column(db.Integer, db.ForeignKey('case_details.id'), nullable=False)
+    case_id = db.Column(db.Integer, db.ForeignKey('case_details.id'), nullable=False, index=True)
     party_type = db.Column(db.String(50))
     name = db.Column(db.String(200), nullable=False)
     advocate_name = db.Column(db.String(200))
 
+    def to_dict(self):
+        return {'party_type': self.party_type, 'name': self.name, 'advocate_name': self.advocate_name}
+
 class CourtOrder(db.Model):
     __tablename__ = 'court_orders'
     id = db.Column(db.Integer, primary_key=True)
-    case_id = db.Column(db.Integer, db.ForeignKey('case_details.id'), nullable=False)
+    case_id = db.Column(db.Integer, db.ForeignKey('case_details.id'), nullable=False, index=True)
     order_date = db.Column(db.Date)
     order_type = db.Column(db.String(100))
     order_text = db.Column(db.Text)
     pdf_url = db.Column(db.String(500))
     local_pdf_path = db.Column(db.String(500))
     downloaded = db.Column(db.Boolean, default=False)
+
+    def to_dict(self):
+        return {
+            'order_date': self.order_date.isoformat() if self.order_date else None,
+            'order_type': self.order_type,
+            'order_text': self.order_text,
+            'pdf_url': self.pdf_url,
+            'downloaded': self.downloaded
+        }
+
+class ScrapeJob(db.Model):
+    __tablename__ = 'scrape_jobs'
+    id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    progress = db.Column(db.String(100))
+    params = db.Column(db.Text, nullable=False)  # JSON-encoded search parameters
+    search_id = db.Column(db.Integer, db.ForeignKey('case_searches.id'))
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'search_id': self.search_id,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class CauseListCacheEntry(db.Model):
+    __tablename__ = 'cause_list_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(200), nullable=False, unique=True)
+    list_date = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD
+    court_type = db.Column(db.String(20), nullable=False)
+    state_code = db.Column(db.String(20))
+    district_code = db.Column(db.String(20))
+    payload = db.Column(db.Text, nullable=False)  # JSON-encoded list of cause list entries
+    size_bytes = db.Column(db.Integer, default=0)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+# One row per scraped cause list entry; the rows of a list share its key columns and fetched_at.
+class CauseListEntry(db.Model):
+    __tablename__ = 'cause_list_entries'
+    __table_args__ = (
+        db.Index('ix_cause_list_entries_list', 'list_date', 'court_type', 'state_code', 'district_code',
+                 'court_name', 'bench'),
+        db.Index('ix_cause_list_entries_case', 'case_number', 'list_date'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    list_date = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD
+    court_type = db.Column(db.String(20), nullable=False)
+    state_code = db.Column(db.String(20))
+    district_code = db.Column(db.String(20))
+    court_name = db.Column(db.String(200))
+    bench = db.Column(db.String(200))
+    judge_name = db.Column(db.String(500))
+    serial = db.Column(db.String(20))
+    case_number = db.Column(db.String(200))
+    parties = db.Column(db.Text)
+    hearing_time = db.Column(db.String(50))
+    payload = db.Column(db.Text, nullable=False)  # JSON-encoded entry as parsed
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# One row per case lookup key being scraped, shared by all worker processes (see single_flight.py).
+class LookupLock(db.Model):
+    __tablename__ = 'lookup_locks'
+    key = db.Column(db.String(300), primary_key=True)
+    owner = db.Column(db.String(36), nullable=False)
+    status = db.Column(db.String(10), nullable=False)  # running, done, failed
+    search_id = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # lease end while running, finish time after
+
+
+# Archived pages already parsed into the database, for `flask backfill`.
+class ParsedPage(db.Model):
+    __tablename__ = 'parsed_pages'
+    content_hash = db.Column(db.String(64), primary_key=True)  # RawStore object hash
+    kind = db.Column(db.String(20), nullable=False)  # 'case' or 'causelist'
+    parser_version = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # parsed, empty, superseded, failed
+    rows = db.Column(db.Integer, default=0)  # searches or cause list entries written
+    error = db.Column(db.Text)
+    parsed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Cases polled for changes (see watchlist.py). ``snapshot`` holds the last parsed
+# details, parties and orders that changes are diffed against.
+class WatchedCase(db.Model):
+    __tablename__ = 'watched_cases'
+    __table_args__ = (
+        db.UniqueConstraint('case_type', 'case_number', 'year', 'court_type', 'state', name='uq_watched_cases_key'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    case_type = db.Column(db.String(100), nullable=False)
+    case_number = db.Column(db.String(50), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    court_type = db.Column(db.String(20), nullable=False)
+    state = db.Column(db.String(20))
+    cnr_number = db.Column(db.String(50), index=True)
+    search_id = db.Column(db.Integer, db.ForeignKey('case_searches.id'))  # kept up to date in place
+    interval_seconds = db.Column(db.Integer, nullable=False)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    fingerprint = db.Column(db.String(40))  # hash over section_hashes
+    section_hashes = db.Column(db.Text)  # JSON: section -> hash of its text
+    snapshot = db.Column(db.Text)  # JSON
+    next_check_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_checked_at = db.Column(db.DateTime)
+    last_changed_at = db.Column(db.DateTime)
+    failures = db.Column(db.Integer, nullable=False, default=0)  # consecutive
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def params(self):
+        return {'case_type': self.case_type, 'case_number': self.case_number, 'year': self.year,
+                'court_type': self.court_type, 'state': self.state}
+
+    def to_dict(self):
+        return dict(
+            self.params(),
+            watch_id=self.id,
+            cnr_number=self.cnr_number,
+            search_id=self.search_id,
+            interval_seconds=self.interval_seconds,
+            active=self.active,
+            next_check_at=self.next_check_at.isoformat() if self.next_check_at else None,
+            last_checked_at=self.last_checked_at.isoformat() if self.last_checked_at else None,
+            last_changed_at=self.last_changed_at.isoformat() if self.last_changed_at else None,
+            failures=self.failures,
+            last_error=self.last_error
+        )
+
+
+# One row per changed field found by a watchlist check; values are JSON-encoded.
+class CaseChange(db.Model):
+    __tablename__ = 'case_changes'
+    id = db.Column(db.Integer, primary_key=True)
+    watch_id = db.Column(db.Integer, db.ForeignKey('watched_cases.id'), nullable=False, index=True)
+    search_id = db.Column(db.Integer)
+    section = db.Column(db.String(20), nullable=False)  # details, parties, orders
+    field = db.Column(db.String(500), nullable=False)
+    old_value = db.Column(db.Text)
+    new_value = db.Column(db.Text)
+    detected_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'change_id': self.id,
+            'watch_id': self.watch_id,
+            'search_id': self.search_id,
+            'section': self.section,
+            'field': self.field,
+            'old': json.loads(self.old_value) if self.old_value is not None else None,
+            'new': json.loads(self.new_value) if self.new_value is not None else None,
+            'detected_at': self.detected_at.isoformat()
+        }
+
+
+def ensure_indexes():
+    """Create indexes declared above on databases whose tables predate them.
+
+    ``db.create_all()`` skips tables that already exist, including their
+    indexes, so ``init_db`` (``flask init-db``, or ``python app.py``) runs
+    this after it. Nothing runs it when a worker starts: existing databases
+    only get new indexes once ``flask init-db`` is run after an upgrade.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
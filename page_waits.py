@@ -0,0 +1,88 @@
+import logging, time
+
+logger = logging.getLogger(__name__)
+
+# One round trip per poll: load state, whether any wanted element is present,
+# DOM size (to tell when scripts stop rewriting the page) and bytes transferred
+# so far according to the Resource Timing API. Cross-origin resources that do
+# not send Timing-Allow-Origin report 0 bytes, so the total is a lower bound.
+PROBE_SCRIPT = """
+const selectors = arguments[0];
+const nav = performance.getEntriesByType('navigation')[0];
+let bytes = nav ? (nav.transferSize || 0) : 0;
+for (const r of performance.getEntriesByType('resource')) bytes += r.transferSize || 0;
+return [document.readyState,
+        selectors.length === 0 || selectors.some(s => document.querySelector(s) !== null),
+        document.documentElement ? document.documentElement.innerHTML.length : 0,
+        bytes];
+"""
+
+# Resource patterns dropped by the lean browser profile (Network.setBlockedURLs).
+BLOCKED_RESOURCE_PATTERNS = (
+    '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*', '*.bmp*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+)
+
+
+class PageWait:
+    """DOM readiness conditions for one kind of court page.
+
+    A page is ready once ``document.readyState`` is one of ``ready_states``,
+    one of ``selectors`` matches, and the DOM size has stayed the same for
+    ``stable_polls`` consecutive polls.
+    """
+
+    def __init__(self, selectors=(), ready_states=('interactive', 'complete'), stable_polls=0):
+        self.selectors = list(selectors)
+        self.ready_states = ready_states
+        self.stable_polls = stable_polls
+
+
+PAGE_WAITS = {
+    # Search form of the case status page
+    'case': PageWait(selectors=('form select', 'form input[type=submit]', 'form button')),
+    # Cause lists are tables that some benches fill in with script after load
+    'cause_list': PageWait(selectors=('table td',), stable_polls=2),
+}
+DEFAULT_WAIT = PageWait(ready_states=('complete',))
+
+
+def wait_for_page(driver, page, timeout=10, poll=0.1, max_bytes=0):
+    """Poll until ``page``'s readiness conditions hold.
+
+    Returns ``(outcome, seconds, bytes)``, outcome being 'ready', 'timeout' or
+    'byte_cap'. Neither a timeout nor the byte cap raises: loading is stopped
+    and the caller works with whatever has rendered, as it did after the
+    fixed sleeps this replaces.
+    """
+    wait = PAGE_WAITS.get(page, DEFAULT_WAIT)
+    start = time.perf_counter()
+    deadline = start + timeout
+    last_size, stable, nbytes = None, 0, 0
+    while True:
+        state, matched, size, nbytes = driver.execute_script(PROBE_SCRIPT, wait.selectors)
+        stable = stable + 1 if size == last_size else 0
+        last_size = size
+        if state in wait.ready_states and matched and stable >= wait.stable_polls:
+            outcome = 'ready'
+            break
+        if max_bytes and nbytes > max_bytes:
+            outcome = 'byte_cap'
+            break
+        if time.perf_counter() >= deadline:
+            outcome = 'timeout'
+            break
+        time.sleep(poll)
+    if outcome != 'ready':
+        driver.execute_script('window.stop();')
+        logger.warning("%s page not ready (%s) after %.1fs, %d bytes", page, outcome,
+                       time.perf_counter() - start, nbytes)
+    return outcome, time.perf_counter() - start, nbytes
+
+
+def blocked_url_patterns(blocked_hosts=()):
+    """URL patterns for the lean profile: images, fonts and the given third-party hosts."""
+    patterns = list(BLOCKED_RESOURCE_PATTERNS)
+    for host in blocked_hosts:
+        patterns += [f'*://{host}/*', f'*://*.{host}/*']
+    return patterns
@@ -0,0 +1,165 @@
+import hashlib, logging, os, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from sqlalchemy import or_, update
+from models import db, CourtOrder
+
+logger = logging.getLogger(__name__)
+
+
+class PdfDownloader:
+    """Download pending CourtOrder PDFs concurrently.
+
+    Bodies are streamed to ``<dest>/.partial/`` in chunks; an interrupted
+    download is resumed with an HTTP Range request on the next run. Finished
+    files are stored once per SHA-256 under ``<dest>/<h[:2]>/<h>.pdf``, so
+    identical judgments linked from several orders share one file. Orders
+    that link the same URL (every refresh of a case re-inserts its orders)
+    wait for one download of it instead of writing the same partial file.
+    Order rows are marked downloaded in batches.
+    """
+
+    def __init__(self, session, dest_dir, workers=4, chunk_size=64 * 1024, batch_size=50,
+                 timeout=60, governor=None, progress_interval=5.0):
+        self.session = session
+        self.dest_dir = dest_dir
+        self.partial_dir = os.path.join(dest_dir, '.partial')
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.governor = governor
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._url_paths = {}  # URL -> stored path, for orders sharing a URL within this run
+        self.stats = {'queued': 0, 'in_flight': 0, 'downloaded': 0, 'deduplicated': 0,
+                      'resumed': 0, 'failed': 0, 'bytes': 0}
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, n in deltas.items():
+                self.stats[name] += n
+
+    @staticmethod
+    def pending_orders():
+        return (CourtOrder.query
+                .filter(or_(CourtOrder.downloaded.is_(False), CourtOrder.downloaded.is_(None)))
+                .filter(CourtOrder.pdf_url.like('http%')))
+
+    def download(self, url):
+        """Fetch one PDF; returns ``(path, bytes transferred)``."""
+        part = os.path.join(self.partial_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.part')
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        transferred = 0
+        with self.governor.slot(url) if self.governor else nullcontext():
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+                if resp.status_code == 416 and offset:
+                    pass  # the partial file already holds the whole body
+                else:
+                    resp.raise_for_status()
+                    if offset and resp.status_code == 206:
+                        mode = 'ab'
+                        self._count(resumed=1)
+                    else:
+                        mode = 'wb'  # server ignored the Range header; start over
+                    with open(part, mode) as f:
+                        for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                            transferred += len(chunk)
+                            self._count(bytes=len(chunk))
+        return self._finalize(part), transferred
+
+    def _finalize(self, part):
+        digest = hashlib.sha256()
+        with open(part, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        path = os.path.join(self.dest_dir, content_hash[:2], content_hash + '.pdf')
+        if os.path.exists(path):
+            os.remove(part)
+            self._count(deduplicated=1)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(part, path)
+        return path
+
+    def _download_order(self, order_id, url):
+        self._count(queued=-1, in_flight=1)
+        try:
+            with self._lock:
+                url_lock = self._url_locks.setdefault(url, threading.Lock())
+            with url_lock:
+                path = self._url_paths.get(url)
+                if path is not None:
+                    self._count(deduplicated=1)
+                else:
+                    path, _ = self.download(url)
+                    self._url_paths[url] = path
+            self._count(downloaded=1)
+            return order_id, path
+        except Exception as e:
+            self._count(failed=1)
+            logger.warning("Failed to download %s: %s", url, e)
+            return order_id, None
+        finally:
+            self._count(in_flight=-1)
+
+    def _flush(self, done):
+        if not done:
+            return
+        db.session.execute(update(CourtOrder), [
+            {'id': order_id, 'local_pdf_path': path, 'downloaded': True} for order_id, path in done
+        ])
+        db.session.commit()
+        done.clear()
+
+    def _report(self, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        with self._lock:
+            stats = dict(self.stats)
+        stats['elapsed'] = round(elapsed, 1)
+        stats['bytes_per_sec'] = round(stats['bytes'] / elapsed)
+        return stats
+
+    def run(self, limit=None, on_progress=None):
+        """Download every pending order (or ``limit`` of them). Must run in an app context."""
+        started = last_report = time.monotonic()
+        queue_cap = self.workers * 4
+        done, futures, last_id, seen = [], set(), 0, 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdf-download') as pool:
+            while True:
+                page_size = queue_cap - len(futures)
+                if limit is not None:
+                    page_size = min(page_size, limit - seen)
+                batch = []
+                if page_size > 0:
+                    batch = (self.pending_orders()
+                             .filter(CourtOrder.id > last_id)
+                             .order_by(CourtOrder.id)
+                             .with_entities(CourtOrder.id, CourtOrder.pdf_url)
+                             .limit(page_size).all())
+                for order_id, url in batch:
+                    futures.add(pool.submit(self._download_order, order_id, url))
+                    self._count(queued=1)
+                    last_id, seen = order_id, seen + 1
+                if not futures:
+                    break
+                # Wait for the queue to drain below capacity before paging on.
+                for future in as_completed(list(futures)):
+                    futures.discard(future)
+                    order_id, path = future.result()
+                    if path:
+                        done.append((order_id, path))
+                    if len(done) >= self.batch_size:
+                        self._flush(done)
+                    if on_progress and time.monotonic() - last_report >= self.progress_interval:
+                        last_report = time.monotonic()
+                        on_progress(self._report(started))
+                    if len(futures) <= queue_cap // 2 and batch:
+                        break
+        self._flush(done)
+        return self._report(started)
@@ -0,0 +1,239 @@
+import hashlib, logging, os, shutil, time
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from sqlalchemy import update
+from models import db, CourtOrder
+
+logger = logging.getLogger(__name__)
+
+PAGE_BREAK = '\f'
+HEX_DIGITS = set('0123456789abcdef')
+
+
+def content_hash(path, chunk_size=64 * 1024):
+    """SHA-256 of a PDF. Files stored by PdfDownloader are already named by it."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if len(stem) == 64 and set(stem) <= HEX_DIGITS:
+        return stem
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def page_count(path):
+    from PyPDF2 import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def extract_pages(path, start, stop, out_path):
+    """Write the text of pages ``[start, stop)`` to ``out_path`` one page at a time.
+
+    Runs in a worker process. Each page ends with a form feed; pdfplumber is
+    tried first and PyPDF2 is the fallback for files it cannot parse.
+    Returns the number of pages written.
+    """
+    try:
+        import pdfplumber
+        with pdfplumber.open(path, pages=list(range(start + 1, stop + 1))) as pdf, \
+                open(out_path, 'w', encoding='utf-8') as out:
+            for page in pdf.pages:
+                out.write((page.extract_text() or '') + PAGE_BREAK)
+                page.close()  # drop the parsed layout before the next page
+        return stop - start
+    except Exception as e:
+        logger.info("pdfplumber failed on %s pages %d-%d (%s); using PyPDF2", path, start, stop, e)
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    with open(out_path, 'w', encoding='utf-8') as out:
+        for index in range(start, stop):
+            out.write((reader.pages[index].extract_text() or '') + PAGE_BREAK)
+    return stop - start
+
+
+class TextExtractor:
+    """Extract judgment text from downloaded PDFs into ``CourtOrder.order_text``.
+
+    Long documents are split into ``pages_per_task`` page ranges that run in
+    parallel on a process pool; workers stream page text to files under
+    ``<text_dir>/.partial/`` which are then stitched into
+    ``<text_dir>/<h[:2]>/<h>.txt`` keyed by the PDF's SHA-256. A PDF whose text
+    file already exists is never parsed again, so orders sharing a judgment
+    and re-runs are cheap. Order rows are updated in batches as documents finish.
+
+    The text file keeps the whole document; at most ``max_chars`` characters
+    of it (None for no limit) are read back and stored per order, so a huge
+    scanned judgment cannot blow up memory or the row size.
+    """
+
+    def __init__(self, text_dir, workers=None, pages_per_task=16, batch_size=50, progress_interval=5.0,
+                 max_chars=None):
+        self.text_dir = text_dir
+        self.partial_dir = os.path.join(text_dir, '.partial')
+        self.workers = workers or os.cpu_count() or 2
+        self.pages_per_task = max(1, pages_per_task)
+        self.batch_size = batch_size
+        self.progress_interval = progress_interval
+        self.max_chars = max_chars
+        self.stats = {'orders': 0, 'updated': 0, 'extracted': 0, 'reused': 0, 'pages': 0,
+                      'missing': 0, 'failed': 0, 'truncated': 0}
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    @staticmethod
+    def pending_orders(force=False):
+        query = (CourtOrder.query
+                 .filter(CourtOrder.downloaded.is_(True))
+                 .filter(CourtOrder.local_pdf_path.isnot(None)))
+        if not force:
+            query = query.filter(CourtOrder.order_text.is_(None))
+        return query
+
+    def text_path(self, content_hash):
+        return os.path.join(self.text_dir, content_hash[:2], content_hash + '.txt')
+
+    def read_text(self, path):
+        """Read back a document's text, truncated to ``max_chars``."""
+        with open(path, encoding='utf-8') as f:
+            if self.max_chars is None:
+                return f.read().rstrip(PAGE_BREAK)
+            text = f.read(self.max_chars + 1)
+        if len(text) > self.max_chars:
+            self.stats['truncated'] += 1
+            text = text[:self.max_chars]
+        return text.rstrip(PAGE_BREAK)
+
+    def _assemble(self, content_hash, parts):
+        """Concatenate a document's page-range files, in page order, into its text file."""
+        path = self.text_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(self.partial_dir, content_hash + '.txt')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as out:
+                for part in parts:
+                    with open(part, encoding='utf-8') as f:
+                        shutil.copyfileobj(f, out)
+            os.replace(tmp, path)
+        finally:
+            self._discard(parts + [tmp])
+        return path
+
+    @staticmethod
+    def _discard(parts):
+        for part in parts:
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass
+
+    def _extract(self, pool, docs):
+        """Extract ``{hash: pdf_path}`` on the pool; yields ``(hash, text_path or None)``.
+
+        Page-range files of documents that fail, or that are still unassembled
+        when the caller stops early, are removed once their tasks are done.
+        """
+        counts = {pool.submit(page_count, pdf): h for h, pdf in docs.items()}
+        ranges, parts, remaining, failed = {}, {}, {}, set()
+        try:
+            for future in as_completed(counts):
+                h = counts[future]
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    logger.warning("Cannot open %s: %s", docs[h], e)
+                    failed.add(h)
+                    yield h, None
+                    continue
+                if not pages:
+                    yield h, self._assemble(h, [])
+                    continue
+                bounds = [(start, min(start + self.pages_per_task, pages))
+                          for start in range(0, pages, self.pages_per_task)]
+                parts[h] = [os.path.join(self.partial_dir, f'{h}.{start:06d}.txt') for start, _ in bounds]
+                remaining[h] = len(bounds)
+                for (start, stop), out in zip(bounds, parts[h]):
+                    ranges[pool.submit(extract_pages, docs[h], start, stop, out)] = h
+
+            for future in as_completed(ranges):
+                h = ranges[future]
+                if h in failed:
+                    continue
+                try:
+                    self.stats['pages'] += future.result()
+                except Exception as e:
+                    logger.warning("Text extraction failed for %s: %s", docs[h], e)
+                    failed.add(h)
+                    yield h, None
+                    continue
+                remaining[h] -= 1
+                if not remaining[h]:
+                    yield h, self._assemble(h, parts[h])
+        finally:
+            for future in chain(counts, ranges):
+                future.cancel()
+            wait(ranges)
+            for h in parts:
+                if remaining[h]:
+                    self._discard(parts[h])
+
+    def _flush(self, done):
+        if not done:
+            return
+        db.session.execute(update(CourtOrder), [
+            {'id': order_id, 'order_text': text} for order_id, text in done
+        ])
+        db.session.commit()
+        self.stats['updated'] += len(done)
+        done.clear()
+
+    def _report(self, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        stats = dict(self.stats, elapsed=round(elapsed, 1))
+        stats['pages_per_sec'] = round(stats['pages'] / elapsed, 1)
+        return stats
+
+    def run(self, limit=None, force=False, on_progress=None):
+        """Extract text for every pending order (or ``limit`` of them). Must run in an app context."""
+        started = last_report = time.monotonic()
+        page_size = max(self.batch_size, self.workers * 4)
+        done, last_id = [], 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while limit is None or self.stats['orders'] < limit:
+                size = page_size if limit is None else min(page_size, limit - self.stats['orders'])
+                batch = (self.pending_orders(force)
+                         .filter(CourtOrder.id > last_id)
+                         .order_by(CourtOrder.id)
+                         .with_entities(CourtOrder.id, CourtOrder.local_pdf_path)
+                         .limit(size).all())
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                self.stats['orders'] += len(batch)
+
+                orders_by_hash, to_extract = {}, {}
+                for order_id, pdf in batch:
+                    if not os.path.exists(pdf):
+                        self.stats['missing'] += 1
+                        continue
+                    h = content_hash(pdf)
+                    orders_by_hash.setdefault(h, []).append(order_id)
+                    if h not in to_extract and (force or not os.path.exists(self.text_path(h))):
+                        to_extract[h] = pdf
+
+                ready = [(h, self.text_path(h)) for h in orders_by_hash if h not in to_extract]
+                self.stats['reused'] += len(ready)
+                for h, path in chain(ready, self._extract(pool, to_extract)):
+                    if path is None:
+                        self.stats['failed'] += 1
+                        continue
+                    if h in to_extract:
+                        self.stats['extracted'] += 1
+                    text = self.read_text(path)
+                    done.extend((order_id, text) for order_id in orders_by_hash[h])
+                    if len(done) >= self.batch_size:
+                        self._flush(done)
+                    if on_progress and time.monotonic() - last_report >= self.progress_interval:
+                        last_report = time.monotonic()
+                        on_progress(self._report(started))
+        self._flush(done)
+        return self._report(started)
@@ -0,0 +1,147 @@
+import logging
+from datetime import datetime
+from sqlalchemy import delete, event, insert, update
+from models import db, CaseSearch, CaseDetail, Party, CourtOrder
+
+logger = logging.getLogger(__name__)
+
+
+def configure_sqlite(app):
+    """Apply the SQLITE_* settings from Config to every new SQLite connection."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+    journal_mode = app.config.get('SQLITE_JOURNAL_MODE', 'WAL')
+    synchronous = app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    busy_timeout = int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        if journal_mode:
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        if synchronous:
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.close()
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def detail_values(details):
+    """CaseDetail column values from a scraped ``case_details`` dict."""
+    return dict(
+        cnr_number=details.get('cnr_number'),
+        filing_number=details.get('filing_number'),
+        registration_number=details.get('registration_number'),
+        filing_date=_parse_date(details.get('filing_date')),
+        registration_date=_parse_date(details.get('registration_date')),
+        case_status=details.get('status') or details.get('case_status'),
+        next_hearing_date=_parse_date(details.get('next_hearing_date')),
+        court_name=details.get('court_name'),
+        judge_name=details.get('judge_name'),
+        is_disposed=details.get('is_disposed', False)
+    )
+
+
+def party_rows(case_id, parties):
+    return [{'case_id': case_id, 'party_type': p.get('type') or p.get('party_type'),
+             'name': p.get('name'), 'advocate_name': p.get('advocate') or p.get('advocate_name')}
+            for p in parties]
+
+
+def order_rows(case_id, orders):
+    return [{'case_id': case_id, 'order_date': _parse_date(o.get('order_date')),
+             'order_type': o.get('order_type'), 'order_text': o.get('order_text'),
+             'pdf_url': o.get('pdf_url'), 'local_pdf_path': o.get('local_pdf_path'),
+             'downloaded': bool(o.get('local_pdf_path'))}
+            for o in orders]
+
+
+def save_case_graph(params, case_data):
+    """Persist a scraped case (search, details, parties, orders) in one transaction.
+
+    Parties and orders are written with executemany-style bulk inserts.
+    Returns the new CaseSearch; nothing is written if any part fails.
+    """
+    details = case_data.get('case_details') or {}
+    try:
+        search = CaseSearch(
+            case_type=params['case_type'],
+            case_number=str(params['case_number']),
+            year=int(params['year']),
+            court_type=params.get('court_type', 'high_court'),
+            raw_response_path=case_data.get('raw_response_path')
+        )
+        case = CaseDetail(search=search, **detail_values(details))
+        db.session.add(search)
+        db.session.flush()
+
+        parties = party_rows(case.id, case_data.get('parties', []))
+        orders = order_rows(case.id, case_data.get('orders', []))
+        if parties:
+            db.session.execute(db.insert(Party), parties)
+        if orders:
+            db.session.execute(db.insert(CourtOrder), orders)
+        db.session.commit()
+        return search
+    except Exception:
+        db.session.rollback()
+        logger.error("Failed to save case %s", params, exc_info=True)
+        raise
+
+
+def upsert_case_graphs(cases):
+    """Rewrite the details, parties and orders of existing searches from ``[(search_id, case_data)]``.
+
+    Details are updated in place and parties replaced. Orders are matched on
+    their PDF link (or date and type) so downloads and extracted text recorded
+    against existing rows survive. The caller commits.
+    """
+    if not cases:
+        return
+    details = {d.search_id: d for d in
+               CaseDetail.query.filter(CaseDetail.search_id.in_([s for s, _ in cases]))}
+    for search_id, case_data in cases:
+        if search_id not in details:
+            details[search_id] = CaseDetail(search_id=search_id)
+            db.session.add(details[search_id])
+    db.session.flush()
+    db.session.execute(update(CaseDetail), [
+        dict(detail_values(case_data['case_details']), id=details[search_id].id) for search_id, case_data in cases
+    ])
+
+    case_ids = [details[search_id].id for search_id, _ in cases]
+    db.session.execute(delete(Party).where(Party.case_id.in_(case_ids)))
+    parties = [row for search_id, case_data in cases
+               for row in party_rows(details[search_id].id, case_data['parties'])]
+    if parties:
+        db.session.execute(insert(Party), parties)
+
+    existing = {}
+    for order_id, case_id, order_date, order_type, pdf_url in db.session.query(
+            CourtOrder.id, CourtOrder.case_id, CourtOrder.order_date, CourtOrder.order_type,
+            CourtOrder.pdf_url).filter(CourtOrder.case_id.in_(case_ids)):
+        existing[(case_id, pdf_url or (order_date, order_type))] = order_id
+    inserts, updates = [], []
+    for search_id, case_data in cases:
+        for row in order_rows(details[search_id].id, case_data['orders']):
+            order_id = existing.pop((row['case_id'], row['pdf_url'] or (row['order_date'], row['order_type'])), None)
+            if order_id is None:
+                inserts.append(row)
+            else:
+                updates.append({'id': order_id, 'order_date': row['order_date'], 'order_type': row['order_type']})
+    if existing:
+        db.session.execute(delete(CourtOrder).where(CourtOrder.id.in_(list(existing.values()))))
+    if updates:
+        db.session.execute(update(CourtOrder), updates)
+    if inserts:
+        db.session.execute(insert(CourtOrder), inserts)
@@ -0,0 +1,208 @@
+import logging, os, sqlite3, threading, time, uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the host while its circuit breaker is open."""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no request slot for a host frees up in time."""
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS host_state (
+    host TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    refilled_at REAL NOT NULL,
+    rate REAL NOT NULL,
+    concurrency REAL NOT NULL,
+    ewma_latency REAL,
+    failures INTEGER NOT NULL DEFAULT 0,
+    circuit TEXT NOT NULL DEFAULT 'closed',
+    opened_at REAL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_leases_host ON leases (host, expires_at);
+"""
+
+
+class HostGovernor:
+    """Per-host token bucket, AIMD concurrency limit and circuit breaker.
+
+    State lives in a small SQLite file so every worker process on the box
+    shares one budget per court host. Each request takes a token and a lease;
+    on completion the observed latency and outcome adjust the host's rate and
+    concurrency limit additively upwards on success and multiplicatively
+    downwards on errors or slow responses. ``failure_threshold`` consecutive
+    failures open the circuit for ``open_seconds``, after which a single probe
+    request decides whether it closes again. Leases expire, so a crashed
+    worker cannot hold a slot forever.
+    """
+
+    def __init__(self, db_path, rate=2.0, burst=5, min_rate=0.2, max_rate=10.0,
+                 max_concurrency=8, target_latency=5.0, failure_threshold=5,
+                 open_seconds=60, lease_seconds=120, acquire_timeout=30):
+        self.db_path = db_path
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.lease_seconds = lease_seconds
+        self.acquire_timeout = acquire_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _state(self, conn, host, now):
+        row = conn.execute('SELECT * FROM host_state WHERE host = ?', (host,)).fetchone()
+        if row is None:
+            conn.execute('INSERT INTO host_state (host, tokens, refilled_at, rate, concurrency) VALUES (?, ?, ?, ?, ?)',
+                         (host, self.burst, now, self.rate, max(1, self.max_concurrency // 2)))
+            row = conn.execute('SELECT * FROM host_state WHERE host = ?', (host,)).fetchone()
+        return dict(row)
+
+    def acquire(self, host, timeout=None):
+        """Block until a request to ``host`` may start; returns a lease id."""
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            with self._transaction() as conn:
+                now = time.time()
+                state = self._state(conn, host, now)
+                if state['circuit'] == 'open':
+                    if now - state['opened_at'] < self.open_seconds:
+                        raise CircuitOpenError(f"{host} is unhealthy; retry after "
+                                               f"{self.open_seconds - (now - state['opened_at']):.0f}s")
+                    state['circuit'] = 'half_open'
+                conn.execute('DELETE FROM leases WHERE host = ? AND expires_at < ?', (host, now))
+                in_flight = conn.execute('SELECT COUNT(*) FROM leases WHERE host = ?', (host,)).fetchone()[0]
+                limit = 1 if state['circuit'] == 'half_open' else int(state['concurrency'])
+                tokens = min(self.burst, state['tokens'] + (now - state['refilled_at']) * state['rate'])
+                if tokens >= 1 and in_flight < limit:
+                    lease = uuid.uuid4().hex
+                    conn.execute('INSERT INTO leases (id, host, expires_at) VALUES (?, ?, ?)',
+                                 (lease, host, now + self.lease_seconds))
+                    conn.execute('UPDATE host_state SET tokens = ?, refilled_at = ?, circuit = ? WHERE host = ?',
+                                 (tokens - 1, now, state['circuit'], host))
+                    return lease
+                conn.execute('UPDATE host_state SET tokens = ?, refilled_at = ?, circuit = ? WHERE host = ?',
+                             (tokens, now, state['circuit'], host))
+                wait = (1 - tokens) / state['rate'] if tokens < 1 else 0.05
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RateLimitTimeout(f"No request slot for {host} within the timeout")
+            time.sleep(min(max(wait, 0.01), 0.5, remaining))
+
+    def release(self, host, lease, latency, ok):
+        """Return a slot and feed the outcome into the host's limits."""
+        with self._transaction() as conn:
+            now = time.time()
+            state = self._state(conn, host, now)
+            conn.execute('DELETE FROM leases WHERE id = ?', (lease,))
+            ewma = latency if state['ewma_latency'] is None else 0.8 * state['ewma_latency'] + 0.2 * latency
+            rate, concurrency = state['rate'], state['concurrency']
+            failures, circuit, opened_at = state['failures'], state['circuit'], state['opened_at']
+            if ok and latency <= self.target_latency:
+                rate = min(self.max_rate, rate + 0.1)
+                concurrency = min(self.max_concurrency, concurrency + 1.0 / concurrency)
+            else:
+                rate = max(self.min_rate, rate * 0.5)
+                concurrency = max(1.0, concurrency * 0.5)
+            if ok:
+                failures, circuit = 0, 'closed'
+            else:
+                failures += 1
+                if circuit == 'half_open' or failures >= self.failure_threshold:
+                    if circuit != 'open':
+                        logger.warning("Opening circuit for %s after %d failures", host, failures)
+                    circuit, opened_at = 'open', now
+            conn.execute('UPDATE host_state SET rate = ?, concurrency = ?, ewma_latency = ?, failures = ?, '
+                         'circuit = ?, opened_at = ? WHERE host = ?',
+                         (rate, concurrency, ewma, failures, circuit, opened_at, host))
+
+    @contextmanager
+    def slot(self, url):
+        """Pace one request to ``url``'s host and record how it went."""
+        host = urlparse(url).netloc or url
+        lease = self.acquire(host)
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.release(host, lease, time.monotonic() - start, ok)
+
+    def snapshot(self):
+        now = time.time()
+        conn = self._conn()
+        hosts = {}
+        for row in conn.execute('SELECT * FROM host_state ORDER BY host'):
+            in_flight = conn.execute('SELECT COUNT(*) FROM leases WHERE host = ? AND expires_at >= ?',
+                                     (row['host'], now)).fetchone()[0]
+            hosts[row['host']] = {
+                'rate': round(row['rate'], 3),
+                'concurrency_limit': int(row['concurrency']),
+                'in_flight': in_flight,
+                'ewma_latency': round(row['ewma_latency'], 3) if row['ewma_latency'] is not None else None,
+                'consecutive_failures': row['failures'],
+                'circuit': row['circuit'],
+            }
+        return hosts
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor(config):
+    """Return the process-wide governor, or None when rate limiting is disabled."""
+    global _governor
+    if not config.get('RATE_LIMIT_ENABLED', True):
+        return None
+    with _governor_lock:
+        if _governor is None:
+            _governor = HostGovernor(
+                config['RATE_LIMIT_DB'],
+                rate=config.get('RATE_LIMIT_RATE', 2.0),
+                burst=config.get('RATE_LIMIT_BURST', 5),
+                min_rate=config.get('RATE_LIMIT_MIN_RATE', 0.2),
+                max_rate=config.get('RATE_LIMIT_MAX_RATE', 10.0),
+                max_concurrency=config.get('RATE_LIMIT_MAX_CONCURRENCY', 8),
+                target_latency=config.get('RATE_LIMIT_TARGET_LATENCY', 5.0),
+                failure_threshold=config.get('CIRCUIT_FAILURE_THRESHOLD', 5),
+                open_seconds=config.get('CIRCUIT_OPEN_SECONDS', 60),
+                acquire_timeout=config.get('RATE_LIMIT_ACQUIRE_TIMEOUT', 30),
+            )
+        return _governor
@@ -0,0 +1,108 @@
+import gzip, hashlib, json, logging, os, tempfile, threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.html.gz'
+
+
+class RawStore:
+    """Content-addressed archive of fetched pages.
+
+    Each distinct page is stored once, gzip-compressed, at
+    ``<root>/objects/<h[:2]>/<h[2:4]>/<sha256>.html.gz``. Every fetch appends
+    one line to ``<root>/index.jsonl`` recording who fetched what and when, so
+    repeat fetches of an unchanged page cost an index line instead of a file.
+    """
+
+    def __init__(self, root, compresslevel=6):
+        self.root = root
+        self.compresslevel = compresslevel
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._index_lock = threading.Lock()
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+    def path_for(self, content_hash):
+        return os.path.join(self.root, 'objects', content_hash[:2], content_hash[2:4], content_hash + SUFFIX)
+
+    def put(self, html, court_type=None, params=None, fetched_at=None):
+        """Store a page and return ``(path, content_hash)``."""
+        data = html.encode('utf-8') if isinstance(html, str) else html
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.path_for(content_hash)
+        written = False
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so concurrent writers of the
+            # same page never expose a partial object.
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=self.compresslevel, mtime=0) as gz:
+                    gz.write(data)
+                os.replace(tmp, path)
+                written = True
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        self._append_index({
+            'hash': content_hash,
+            'court_type': court_type,
+            'params': params or {},
+            'fetched_at': (fetched_at or datetime.utcnow()).isoformat(),
+            'size': len(data),
+            'new': written,
+        })
+        return path, content_hash
+
+    def _append_index(self, record):
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._index_lock, open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def iter_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def migrate_legacy(self, legacy_dir, delete=False):
+        """Import timestamped ``*.html`` dumps into the store.
+
+        Returns ``(files, unique_pages, bytes_before, bytes_after)``.
+        """
+        files, hashes, before = 0, set(), 0
+        for name in sorted(os.listdir(legacy_dir)):
+            path = os.path.join(legacy_dir, name)
+            if not name.endswith('.html') or not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            fetched_at = datetime.utcfromtimestamp(os.path.getmtime(path))
+            _, content_hash = self.put(data, params={'legacy_file': name}, fetched_at=fetched_at)
+            files += 1
+            hashes.add(content_hash)
+            before += len(data)
+            if delete:
+                os.remove(path)
+        after = sum(os.path.getsize(self.path_for(h)) for h in hashes)
+        return files, len(hashes), before, after
+
+
+def open_raw(path):
+    """Open a saved page for reading as text, whether archived or a legacy dump."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def iter_raw(path, chunk_size=64 * 1024):
+    """Yield the decompressed page in chunks without loading it whole."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
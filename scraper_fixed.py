@@ -1,12 +1,61 @@
-import os, time, logging, traceback
+import os, time, json, logging, threading, traceback
+from contextlib import nullcontext
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import requests
+from raw_store import RawStore
+from cause_parser import iter_cause_list
+from case_parser import parse_case_page
+from fetch_backends import FETCH_MODES, FetchError, get_http_backend, needs_browser, record_fetch
+from metrics import DRIVER_LAUNCHES, PAGE_WAIT_OUTCOMES, stage
+from page_waits import blocked_url_patterns, wait_for_page
+
+# Selenium and webdriver-manager are imported when a browser is first started,
+# so processes that never launch Chrome do not pay for them.
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO, handlers=[logging.FileHandler('scraper.log'), logging.StreamHandler()])
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+
+def resolve_chromedriver(path=None, cache_file=None):
+    """Return the ChromeDriver binary to use, resolving it at most once per process.
+
+    An explicit ``path`` wins. Otherwise the location recorded in ``cache_file``
+    is reused while the binary still exists, and only then is webdriver-manager
+    asked (which may hit the network); its answer is written back to
+    ``cache_file``. Returns None if nothing could be resolved, leaving Selenium
+    to look on PATH.
+    """
+    global _chromedriver_path
+    if path:
+        return path
+    with _chromedriver_lock:
+        if _chromedriver_path and os.path.exists(_chromedriver_path):
+            return _chromedriver_path
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file) as f:
+                    cached = json.load(f).get('path')
+                if cached and os.path.exists(cached):
+                    _chromedriver_path = cached
+                    return cached
+            except (OSError, ValueError):
+                logger.warning("Ignoring unreadable ChromeDriver cache %s", cache_file)
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _chromedriver_path = ChromeDriverManager().install()
+        except Exception as e:
+            logger.warning(f"Failed to use ChromeDriverManager: {e}")
+            return None
+        if cache_file:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+                with open(cache_file, 'w') as f:
+                    json.dump({'path': _chromedriver_path, 'resolved_at': datetime.utcnow().isoformat()}, f)
+            except OSError as e:
+                logger.warning("Could not write ChromeDriver cache %s: %s", cache_file, e)
+        return _chromedriver_path
 
 BASE_URLS = {
     'high_court': 'https://hcservices.ecourts.gov.in/hcservices/main.php',
@@ -14,31 +63,82 @@ BASE_URLS = {
 }
 
 class CourtScraper:
-    def __init__(self, headless=True, download_dir='downloads'):
+    def __init__(self, headless=True, download_dir='downloads', fetch_mode='selenium', http_backend=None,
+                 governor=None, driver_path=None, driver_cache=None, base_urls=None, wait_timeouts=None,
+                 wait_poll=0.1, lean=False, max_page_bytes=0, blocked_hosts=()):
+        """
+        Args:
+            fetch_mode (str, optional): 'selenium' drives Chrome for every page.
+                'auto' fetches over plain HTTP and only launches Chrome when a
+                page needs a browser. 'http' never launches Chrome.
+            http_backend (HttpBackend, optional): Shared HTTP session; defaults
+                to the process-wide backend.
+            governor (HostGovernor, optional): Paces requests per court host
+                and fails fast while a host's circuit is open.
+            driver_path (str, optional): ChromeDriver binary; skips lookup.
+            driver_cache (str, optional): File remembering the ChromeDriver
+                path resolved by webdriver-manager across restarts.
+            base_urls (dict, optional): Per-court overrides of BASE_URLS, e.g.
+                to point at a local stand-in server.
+            wait_timeouts (dict, optional): Seconds to wait for each page type
+                ('case', 'cause_list') to become ready after navigating.
+            wait_poll (float, optional): Seconds between readiness checks.
+            lean (bool, optional): Use the eager page-load strategy and block
+                images, fonts and ``blocked_hosts``.
+            max_page_bytes (int, optional): With ``lean``, stop loading a page
+                once this many bytes have been transferred (0 = no cap).
+        """
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"fetch_mode must be one of {FETCH_MODES}, got {fetch_mode!r}")
         self.headless = headless
         self.driver = None
+        self.navigations = 0
         self.download_dir = download_dir
-        os.makedirs(os.path.join(self.download_dir, 'raw'), exist_ok=True)
-        self._init_driver()
+        self.fetch_mode = fetch_mode
+        self.governor = governor
+        self.driver_path = driver_path
+        self.driver_cache = driver_cache
+        self.base_urls = dict(BASE_URLS, **{k: v for k, v in (base_urls or {}).items() if v})
+        self.wait_timeouts = dict(wait_timeouts or {})
+        self.wait_poll = wait_poll
+        self.lean = lean
+        self.max_page_bytes = max_page_bytes if lean else 0
+        self.blocked_hosts = tuple(blocked_hosts)
+        self.http = http_backend or (get_http_backend() if fetch_mode != 'selenium' else None)
+        self._closed = False
+        self.raw_store = RawStore(os.path.join(self.download_dir, 'raw'))
+        if fetch_mode == 'selenium':
+            self._init_driver()
 
     def _init_driver(self):
         try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            from selenium.webdriver.chrome.options import Options
             opts = Options()
             if self.headless:
                 opts.add_argument("--headless=new")
             opts.add_argument('--no-sandbox')
             opts.add_argument('--disable-dev-shm-usage')
             opts.add_argument('--window-size=1920,1080')
-            
-            # Try to use ChromeDriverManager to get the appropriate ChromeDriver
-            try:
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(service=service, options=opts)
-            except Exception as e:
-                logger.warning(f"Failed to use ChromeDriverManager: {e}")
-                # Fallback: Try to find ChromeDriver in the system PATH
-                self.driver = webdriver.Chrome(options=opts)
-            
+            if self.lean:
+                # Hand the page back at DOMContentLoaded; readiness is decided by wait_for_page
+                opts.page_load_strategy = 'eager'
+                opts.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+            with stage('driver_launch'):
+                driver_path = resolve_chromedriver(self.driver_path, self.driver_cache)
+                if driver_path:
+                    self.driver = webdriver.Chrome(service=Service(driver_path), options=opts)
+                else:
+                    # Fallback: Try to find ChromeDriver in the system PATH
+                    self.driver = webdriver.Chrome(options=opts)
+            DRIVER_LAUNCHES.inc()
+            if self.lean:
+                self.driver.execute_cdp_cmd('Network.enable', {})
+                self.driver.execute_cdp_cmd('Network.setBlockedURLs',
+                                            {'urls': blocked_url_patterns(self.blocked_hosts)})
+
             self.driver.set_page_load_timeout(30)
             logger.info("Selenium driver started")
         except Exception as e:
@@ -46,7 +146,67 @@ class CourtScraper:
             logger.error(traceback.format_exc())
             raise
 
+    def is_alive(self):
+        """Cheap health check used by the driver pool before reuse."""
+        if self._closed:
+            return False
+        if not self.driver:
+            # Chrome is launched on demand outside 'selenium' mode.
+            return self.fetch_mode != 'selenium'
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _navigate(self, url):
+        with stage('navigate'):
+            self.driver.get(url)
+        self.navigations += 1
+
+    def _paced(self, url):
+        return self.governor.slot(url) if self.governor else nullcontext()
+
+    def _get_page(self, url, page='case'):
+        """Fetch a page, preferring plain HTTP. Returns (html, backend name).
+
+        In a browser, the page is read as soon as ``page``'s readiness
+        conditions (see page_waits.PAGE_WAITS) hold.
+        """
+        escalated = False
+        if self.fetch_mode != 'selenium':
+            start = time.perf_counter()
+            try:
+                with self._paced(url), stage('http_fetch'):
+                    html, nbytes = self.http.fetch(url)
+                with stage('page_check'):
+                    reason = needs_browser(html)
+            except requests.RequestException as e:
+                reason = f"HTTP error: {e}"
+            if reason is None:
+                record_fetch('http', time.perf_counter() - start, nbytes)
+                return html, 'http'
+            if self.fetch_mode == 'http':
+                raise FetchError(f"Cannot fetch {url} without a browser: {reason}")
+            logger.info("Escalating %s to Selenium: %s", url, reason)
+            escalated = True
+
+        start = time.perf_counter()
+        if self.driver is None:
+            self._init_driver()
+        with self._paced(url):
+            self._navigate(url)
+        with stage('page_wait'):
+            outcome, waited, nbytes = wait_for_page(self.driver, page, timeout=self.wait_timeouts.get(page, 10),
+                                                    poll=self.wait_poll, max_bytes=self.max_page_bytes)
+        PAGE_WAIT_OUTCOMES.inc(page=page, outcome=outcome)
+        html = self.driver.page_source
+        record_fetch('selenium', time.perf_counter() - start, nbytes, escalated=escalated, wait_seconds=waited)
+        logger.info("Fetched %s page via selenium: waited %.2fs (%s), %d bytes", page, waited, outcome, nbytes)
+        return html, 'selenium'
+
     def close(self):
+        self._closed = True
         try:
             if self.driver: 
                 self.driver.quit()
@@ -59,42 +219,88 @@ class CourtScraper:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-    def _save_page(self, html, prefix='case'):
-        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{prefix}_{ts}.html"
-        path = os.path.join(self.download_dir, 'raw', filename)
-        with open(path, 'w', encoding='utf-8') as f: f.write(html)
+    def _save_page(self, html, prefix='case', court_type=None, params=None):
+        params = dict(params or {}, kind=prefix)
+        with stage('save_page'):
+            path, _ = self.raw_store.put(html, court_type=court_type, params=params)
         return path
 
+    def fetch_case_page(self, case_type, case_number, year, court_type='high_court', state=None, district=None):
+        """Fetch a case's status page without saving or parsing it. Returns (html, url, backend)."""
+        logger.info("Fetching case %s/%s/%s on %s", case_type, case_number, year, court_type)
+        url = self.base_urls.get(court_type, self.base_urls['high_court'])
+        html, backend = self._get_page(url, page='case')
+        return html, url, backend
+
+    def case_data_from_page(self, html, url, backend, case_type, case_number, year, court_type='high_court',
+                            state=None, district=None):
+        """Archive a fetched case page and parse it into ``case_data``."""
+        raw_path = self._save_page(html, prefix='case', court_type=court_type,
+                                   params={'case_type': case_type, 'case_number': case_number,
+                                           'year': year, 'state': state, 'district': district})
+        case_data = {
+            'case_details': {
+                'case_number': case_number,
+                'case_type': case_type,
+                'year': year,
+                'status': 'RAW_SAVED',
+                'filing_date': None,
+                'court_name': None,
+                'judge_name': None,
+                'is_disposed': False
+            },
+            'parties': [],
+            'orders': [],
+            'raw_response_path': raw_path,
+            'fetch_backend': backend,
+            'pdf_path': None
+        }
+        parsed = parse_case_page(html, base_url=url)
+        if parsed:
+            case_data['case_details'].update(parsed['case_details'])
+            case_data['parties'], case_data['orders'] = parsed['parties'], parsed['orders']
+        return case_data
+
     def fetch_case_details(self, case_type, case_number, year, court_type='high_court', state=None, district=None):
         try:
-            logger.info("Fetching case %s/%s/%s on %s", case_type, case_number, year, court_type)
-            url = BASE_URLS.get(court_type, BASE_URLS['high_court'])
-            self.driver.get(url)
-            time.sleep(2)
-            html = self.driver.page_source
-            raw_path = self._save_page(html, prefix=f"{court_type}_{case_number}")
-            case_data = {
-                'case_details': {
-                    'case_number': case_number,
-                    'case_type': case_type,
-                    'year': year,
-                    'status': 'RAW_SAVED',
-                    'filing_date': None,
-                    'court_name': None,
-                    'judge_name': None,
-                    'is_disposed': False
-                },
-                'parties': [],
-                'orders': [],
-                'raw_response_path': raw_path,
-                'pdf_path': None
-            }
-            return case_data
+            html, url, backend = self.fetch_case_page(case_type, case_number, year, court_type, state, district)
+            return self.case_data_from_page(html, url, backend, case_type, case_number, year, court_type,
+                                            state, district)
         except Exception:
             logger.error("Error in fetch_case_details: %s", traceback.format_exc())
             raise
 
+    def fetch_cause_list_page(self, date=None, court_type='high_court', state_code='dl', district_code='dl'):
+        """
+        Fetches and archives the cause list page without parsing it.
+
+        Returns:
+            tuple: (raw_path, formatted_date) for use with cause_parser.iter_cause_list
+        """
+        logger.info(f"Fetching cause list for {date} from {court_type}")
+
+        # Format date if provided
+        formatted_date = datetime.now().strftime('%d-%m-%Y')
+        if date:
+            try:
+                # Convert from YYYY-MM-DD to DD-MM-YYYY
+                date_obj = datetime.strptime(date, '%Y-%m-%d')
+                formatted_date = date_obj.strftime('%d-%m-%Y')
+            except ValueError:
+                logger.warning(f"Invalid date format: {date}. Using current date.")
+
+        # Get the base URL based on court type
+        base_url = self.base_urls.get(court_type, self.base_urls['high_court'])
+
+        # Fetch the cause list page, waiting for its table if a browser was needed
+        html, backend = self._get_page(base_url, page='cause_list')
+        logger.info(f"Opened {base_url} via {backend}")
+
+        raw_path = self._save_page(html, prefix='causelist', court_type=court_type,
+                                   params={'date': formatted_date, 'state_code': state_code,
+                                           'district_code': district_code})
+        return raw_path, formatted_date
+
     def fetch_cause_list(self, date=None, court_type='high_court', state_code='dl', district_code='dl'):
         """
         Fetches the cause list for the given date and court type.
@@ -109,63 +315,11 @@ class CourtScraper:
             list: List of cause list entries, each containing case details
         """
         try:
-            logger.info(f"Fetching cause list for {date} from {court_type}")
-            
-            # Format date if provided
-            formatted_date = datetime.now().strftime('%d-%m-%Y')
-            if date:
-                try:
-                    # Convert from YYYY-MM-DD to DD-MM-YYYY
-                    date_obj = datetime.strptime(date, '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%d-%m-%Y')
-                except ValueError:
-                    logger.warning(f"Invalid date format: {date}. Using current date.")
-            
-            # Get the base URL based on court type
-            base_url = BASE_URLS.get(court_type, BASE_URLS['high_court'])
-            
-            # Navigate to the cause list page
-            self.driver.get(base_url)
-            logger.info(f"Opened {base_url}")
-            
-            # Add a small delay to let the page load
-            time.sleep(3)
-            
-            # Save the raw HTML for debugging
-            html = self.driver.page_source
-            raw_path = self._save_page(html, prefix=f"causelist_{court_type}_{formatted_date}")
-            
-            # TODO: Implement actual scraping logic here
-            # This is a placeholder that returns sample data
-            # In a real implementation, you would parse the HTML to extract the cause list
-            
-            sample_cases = [
-                {
-                    'case_number': 'CRL.A. 123/2023',
-                    'parties': 'State vs. John Doe',
-                    'court_name': 'High Court of Delhi',
-                    'judge_name': "Hon'ble Mr. Justice Smith",
-                    'hearing_time': '10:30 AM',
-                    'case_type': 'Criminal Appeal',
-                    'bench': 'Bench 1',
-                    'status': 'Fresh',
-                    'section': '302 IPC'
-                },
-                {
-                    'case_number': 'W.P.(C) 456/2023',
-                    'parties': 'ABC Ltd. vs. XYZ Corporation',
-                    'court_name': 'High Court of Delhi',
-                    'judge_name': "Hon'ble Ms. Justice Johnson",
-                    'hearing_time': '02:15 PM',
-                    'case_type': 'Writ Petition',
-                    'bench': 'Bench 2',
-                    'status': 'Fresh',
-                    'section': 'Article 226'
-                }
-            ]
-            
-            logger.info(f"Successfully fetched {len(sample_cases)} sample cases")
-            return sample_cases
+            raw_path, formatted_date = self.fetch_cause_list_page(date, court_type, state_code, district_code)
+            with stage('parse'):
+                cases = list(iter_cause_list(raw_path, defaults={'court_type': court_type, 'date': formatted_date}))
+            logger.info(f"Parsed {len(cases)} cause list entries")
+            return cases
             
         except Exception as e:
             logger.error(f"Error in fetch_cause_list: {str(e)}")
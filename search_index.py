@@ -0,0 +1,185 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models import db
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_TOKENS = 24
+MAX_PAGE_SIZE = 100
+
+# External-content FTS5 tables over court_orders and parties. The triggers keep
+# them in step with every write, including bulk inserts/updates that bypass
+# the ORM; updates only touch the index when an indexed column changes.
+SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS order_fts USING fts5(
+        order_text, order_type, content='court_orders', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS court_orders_fts_ai AFTER INSERT ON court_orders BEGIN
+        INSERT INTO order_fts (rowid, order_text, order_type) VALUES (new.id, new.order_text, new.order_type);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS court_orders_fts_ad AFTER DELETE ON court_orders BEGIN
+        INSERT INTO order_fts (order_fts, rowid, order_text, order_type)
+        VALUES ('delete', old.id, old.order_text, old.order_type);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS court_orders_fts_au AFTER UPDATE OF order_text, order_type ON court_orders BEGIN
+        INSERT INTO order_fts (order_fts, rowid, order_text, order_type)
+        VALUES ('delete', old.id, old.order_text, old.order_type);
+        INSERT INTO order_fts (rowid, order_text, order_type) VALUES (new.id, new.order_text, new.order_type);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS party_fts USING fts5(
+        name, advocate_name, content='parties', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS parties_fts_ai AFTER INSERT ON parties BEGIN
+        INSERT INTO party_fts (rowid, name, advocate_name) VALUES (new.id, new.name, new.advocate_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS parties_fts_ad AFTER DELETE ON parties BEGIN
+        INSERT INTO party_fts (party_fts, rowid, name, advocate_name)
+        VALUES ('delete', old.id, old.name, old.advocate_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS parties_fts_au AFTER UPDATE OF name, advocate_name ON parties BEGIN
+        INSERT INTO party_fts (party_fts, rowid, name, advocate_name)
+        VALUES ('delete', old.id, old.name, old.advocate_name);
+        INSERT INTO party_fts (rowid, name, advocate_name) VALUES (new.id, new.name, new.advocate_name);
+    END""",
+]
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database has no FTS5 index (not SQLite, or FTS5 missing)."""
+
+
+class SearchQueryError(ValueError):
+    """Raised for malformed search expressions or cursors."""
+
+
+def ensure_search_index():
+    """Create the FTS tables and triggers, back-filling them on first creation.
+
+    Returns False when the database cannot host them; search is then disabled.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    try:
+        with db.engine.begin() as conn:
+            existing = conn.execute(text(
+                "SELECT count(*) FROM sqlite_master WHERE name IN ('order_fts', 'party_fts')")).scalar()
+            for statement in SCHEMA:
+                conn.execute(text(statement))
+            if existing < 2:
+                logger.info("Building full-text index over existing orders and parties")
+                conn.execute(text("INSERT INTO order_fts (order_fts) VALUES ('rebuild')"))
+                conn.execute(text("INSERT INTO party_fts (party_fts) VALUES ('rebuild')"))
+        return True
+    except OperationalError as e:
+        logger.warning("Full-text search disabled: %s", e)
+        return False
+
+
+def rebuild_search_index():
+    """Re-derive both FTS tables from their content tables and merge segments."""
+    with db.engine.begin() as conn:
+        for table in ('order_fts', 'party_fts'):
+            conn.execute(text(f"INSERT INTO {table} ({table}) VALUES ('rebuild')"))
+            conn.execute(text(f"INSERT INTO {table} ({table}) VALUES ('optimize')"))
+
+
+def _encode_cursor(score, order_id):
+    return f'{score!r}:{order_id}'
+
+
+def _decode_cursor(cursor):
+    try:
+        score, order_id = cursor.rsplit(':', 1)
+        return float(score), int(order_id)
+    except (AttributeError, ValueError):
+        raise SearchQueryError('Invalid cursor')
+
+
+def search_orders(query=None, party=None, limit=20, cursor=None):
+    """Rank orders by full-text match on their text and/or their case's parties.
+
+    ``query`` and ``party`` take FTS5 syntax: ``"exact phrase"``, ``AND``/``OR``/
+    ``NOT`` and ``prefix*``. With ``query`` results are ordered by BM25 over
+    the order text (``party`` then only restricts to cases with a matching
+    party); with ``party`` alone, by the best party match. Pages are keyset
+    paginated on ``(score, id)``: pass the returned ``next_cursor`` back as
+    ``cursor``. Returns ``(results, next_cursor)``.
+    """
+    if not query and not party:
+        raise SearchQueryError('Provide q or party')
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    params = {'q': query, 'party': party, 'limit': limit + 1}
+    party_cases = ("SELECT p.case_id FROM party_fts JOIN parties p ON p.id = party_fts.rowid "
+                   "WHERE party_fts MATCH :party")
+    if query:
+        page = ("WITH hits AS (SELECT rowid AS id, bm25(order_fts) AS score FROM order_fts "
+                "WHERE order_fts MATCH :q")
+        if party:
+            page += f" AND rowid IN (SELECT id FROM court_orders WHERE case_id IN ({party_cases}))"
+        page += ")"
+    else:
+        # bm25() cannot be aggregated directly, so score parties in a materialized CTE first.
+        page = ("WITH party_hits AS MATERIALIZED (SELECT rowid AS id, bm25(party_fts) AS score "
+                "FROM party_fts WHERE party_fts MATCH :party), "
+                "case_hits AS (SELECT p.case_id, min(h.score) AS score FROM parties p "
+                "JOIN party_hits h ON h.id = p.id GROUP BY p.case_id), "
+                "hits AS (SELECT o.id AS id, c.score AS score FROM court_orders o "
+                "JOIN case_hits c ON c.case_id = o.case_id)")
+    page += " SELECT id, score FROM hits"
+    if cursor:
+        params['after_score'], params['after_id'] = _decode_cursor(cursor)
+        page += " WHERE (score, id) > (:after_score, :after_id)"
+    page += " ORDER BY score, id LIMIT :limit"
+
+    try:
+        rows = db.session.execute(text(page), params).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        ids = [row.id for row in rows]
+        snippets, matched_parties = {}, {}
+        if ids:
+            id_list = ','.join(str(i) for i in ids)
+            if query:
+                snippets = dict(db.session.execute(text(
+                    f"SELECT rowid, snippet(order_fts, 0, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}) "
+                    f"FROM order_fts WHERE order_fts MATCH :q AND rowid IN ({id_list})"), params).all())
+            if party:
+                for case_id, name in db.session.execute(text(
+                        "SELECT p.case_id, highlight(party_fts, 0, '<mark>', '</mark>') "
+                        "FROM party_fts JOIN parties p ON p.id = party_fts.rowid "
+                        f"WHERE party_fts MATCH :party AND p.case_id IN "
+                        f"(SELECT case_id FROM court_orders WHERE id IN ({id_list}))"), params):
+                    matched_parties.setdefault(case_id, []).append(name)
+            details = {row.id: row for row in db.session.execute(text(
+                "SELECT o.id, o.case_id, o.order_date, o.order_type, o.pdf_url, "
+                "d.search_id, d.cnr_number, d.court_name, s.case_type, s.case_number, s.year, s.court_type "
+                "FROM court_orders o JOIN case_details d ON d.id = o.case_id "
+                f"JOIN case_searches s ON s.id = d.search_id WHERE o.id IN ({id_list})"))}
+    except OperationalError as e:
+        db.session.rollback()
+        message = str(e.orig)
+        if 'no such table' in message:
+            raise SearchUnavailable('Full-text index is not available')
+        raise SearchQueryError(f'Invalid search expression: {message}')
+
+    results = []
+    for row in rows:
+        order = details.get(row.id)
+        if order is None:
+            continue
+        results.append({
+            'order_id': order.id,
+            'search_id': order.search_id,
+            'case': {'case_type': order.case_type, 'case_number': order.case_number, 'year': order.year,
+                     'court_type': order.court_type, 'cnr_number': order.cnr_number,
+                     'court_name': order.court_name},
+            'order_date': str(order.order_date) if order.order_date else None,
+            'order_type': order.order_type,
+            'pdf_url': order.pdf_url,
+            'score': round(row.score, 4),
+            'snippet': snippets.get(row.id),
+            'matched_parties': matched_parties.get(order.case_id, []) if party else None,
+        })
+    next_cursor = _encode_cursor(rows[-1].score, rows[-1].id) if has_more else None
+    return results, next_cursor
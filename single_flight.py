@@ -0,0 +1,199 @@
+import logging, threading, time, uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, LookupLock
+from metrics import LOOKUPS_COALESCED
+
+logger = logging.getLogger(__name__)
+
+
+class LookupFailed(Exception):
+    """Raised to lookups that waited on a scrape which failed in another process."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce identical in-flight lookups so a burst costs one scrape.
+
+    Within a process, the first caller for a key runs the lookup and later
+    callers wait for its result. Across processes sharing the database, that
+    caller also claims the key's ``lookup_locks`` row; if another process
+    holds it, the caller polls the row until the owner records the resulting
+    search id (or error) and loads that instead of scraping. The owner renews
+    its lease every third of ``lease_seconds`` while it scrapes, so only the
+    lock of an owner that died is taken over once the lease runs out.
+    """
+
+    def __init__(self, lease_seconds=120, poll_interval=0.25):
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'local_followers': 0, 'remote_followers': 0, 'takeovers': 0, 'failed': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def run(self, key, lookup, load, on_wait=None):
+        """Return ``lookup()`` for ``key``, or an identical in-flight lookup's result.
+
+        ``lookup()`` must return ``(search_id, case_data)``; ``load(search_id)``
+        rebuilds that pair for callers waiting on another process.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            self._count('local_followers')
+            LOOKUPS_COALESCED.inc(scope='process')
+            if on_wait:
+                on_wait()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            search_id, case_data = call.result
+            return search_id, dict(case_data, coalesced=True)
+        try:
+            call.result = self._run_shared(key, lookup, load, on_wait)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_shared(self, key, lookup, load, on_wait):
+        owner = str(uuid.uuid4())
+        waited = False
+        while True:
+            if self._claim(key, owner):
+                self._count('leaders')
+                stop = self._start_heartbeat(key, owner)
+                try:
+                    search_id, case_data = lookup()
+                except Exception as e:
+                    db.session.rollback()
+                    self._count('failed')
+                    self._finish(key, owner, error=str(e) or type(e).__name__)
+                    raise
+                finally:
+                    stop.set()
+                self._finish(key, owner, search_id=search_id)
+                return search_id, case_data
+            if not waited:
+                waited = True
+                self._count('remote_followers')
+                LOOKUPS_COALESCED.inc(scope='shared')
+                if on_wait:
+                    on_wait()
+            row = self._wait_for_owner(key)
+            if row is None:
+                continue  # owner vanished or its lease expired; try to claim the key
+            status, search_id, error = row
+            if status == 'failed':
+                raise LookupFailed(error)
+            return load(search_id)
+
+    def _claim(self, key, owner):
+        now = datetime.utcnow()
+        values = {'owner': owner, 'status': 'running', 'search_id': None, 'error': None,
+                  'started_at': now, 'expires_at': now + timedelta(seconds=self.lease_seconds)}
+        try:
+            db.session.add(LookupLock(key=key, **values))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+        # Take the row over unless a live owner is still running it.
+        claimed = (LookupLock.query
+                   .filter(LookupLock.key == key)
+                   .filter((LookupLock.status != 'running') | (LookupLock.expires_at < now))
+                   .update(values, synchronize_session=False))
+        db.session.commit()
+        return bool(claimed)
+
+    def _start_heartbeat(self, key, owner):
+        """Keep pushing the lease forward while the owner scrapes; set the returned event to stop."""
+        app, stop = current_app._get_current_object(), threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    with app.app_context():
+                        (LookupLock.query
+                         .filter_by(key=key, owner=owner, status='running')
+                         .update({'expires_at': datetime.utcnow() + timedelta(seconds=self.lease_seconds)},
+                                 synchronize_session=False))
+                        db.session.commit()
+                except Exception:
+                    logger.warning("Could not renew lookup lock %s", key, exc_info=True)
+
+        threading.Thread(target=beat, name='lookup-lock-heartbeat', daemon=True).start()
+        return stop
+
+    def _wait_for_owner(self, key):
+        """Poll the key's row until its owner finishes; None if it disappears or expires."""
+        while True:
+            row = (db.session.query(LookupLock.status, LookupLock.search_id, LookupLock.error, LookupLock.expires_at)
+                   .filter_by(key=key).first())
+            db.session.commit()  # end the read so the next poll sees other processes' writes
+            if row is None:
+                return None
+            status, search_id, error, expires_at = row
+            if status != 'running':
+                return status, search_id, error
+            if expires_at < datetime.utcnow():
+                self._count('takeovers')
+                logger.warning("Lookup lock %s expired; taking over", key)
+                return None
+            time.sleep(self.poll_interval)
+
+    def _finish(self, key, owner, search_id=None, error=None):
+        now = datetime.utcnow()
+        try:
+            (LookupLock.query
+             .filter_by(key=key, owner=owner)
+             .update({'status': 'failed' if error else 'done', 'search_id': search_id, 'error': error,
+                      'expires_at': now}, synchronize_session=False))
+            # Finished rows only matter to lookups still polling them.
+            (LookupLock.query
+             .filter(LookupLock.status != 'running', LookupLock.expires_at < now - timedelta(hours=1))
+             .delete(synchronize_session=False))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error("Could not release lookup lock %s", key, exc_info=True)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats, in_flight=len(self._calls))
+        stats['scrapes_saved'] = stats['local_followers'] + stats['remote_followers']
+        return stats
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight(app):
+    """Return the process-wide lookup coalescer."""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight(
+                lease_seconds=app.config.get('LOOKUP_LOCK_LEASE_SECONDS', 120),
+                poll_interval=app.config.get('LOOKUP_LOCK_POLL_INTERVAL', 0.25),
+            )
+        return _single_flight
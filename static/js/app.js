@@ -72,7 +72,7 @@
         document.getElementById('modalCaseNumber').textContent = caseData.case_number || 'N/A';
         document.getElementById('modalCaseStatus').textContent = caseData.case_status || 'N/A';
         const rawLink = document.getElementById('modalRawLink');
-        if (data.raw_path) { rawLink.href = data.raw_path; rawLink.textContent = 'Download saved HTML'; }
+        if (data.raw_path) { rawLink.href = `/api/search/${searchId}/raw`; rawLink.textContent = 'Download saved HTML'; }
         else { rawLink.href = '#'; rawLink.textContent = 'No raw saved'; }
   
         const pdfContainer = document.getElementById('modalPdfContainer');
@@ -0,0 +1,309 @@
+import hashlib, json, logging, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models import db, CaseSearch, CaseDetail, WatchedCase, CaseChange
+from persistence import detail_values, save_case_graph, upsert_case_graphs
+from case_parser import section_fingerprints
+from metrics import WATCH_CHECKS, WATCH_CHANGES
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('details', 'parties', 'orders')
+
+
+class WatchError(Exception):
+    """Raised for watchlist entries that cannot be added."""
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def case_snapshot(case_data):
+    """The parts of ``case_data`` that changes are reported on, keyed for diffing."""
+    details = {field: _json_value(value) for field, value in detail_values(case_data['case_details']).items()}
+    parties = {}
+    for p in case_data.get('parties') or []:
+        key = f"{p.get('type') or p.get('party_type')}: {p.get('name')}"
+        parties[key] = {'advocate': p.get('advocate') or p.get('advocate_name')}
+    orders = {}
+    for o in case_data.get('orders') or []:
+        key = o.get('pdf_url') or f"{o.get('order_date')} {o.get('order_type')}"
+        orders[key] = {'order_date': o.get('order_date'), 'order_type': o.get('order_type'),
+                       'pdf_url': o.get('pdf_url')}
+    return {'details': details, 'parties': parties, 'orders': orders}
+
+
+def diff_snapshots(old, new, sections=SECTIONS):
+    """``[(section, field, old_value, new_value)]`` between two snapshots, over ``sections`` only.
+
+    Details are compared field by field; parties and orders by key, so an
+    added order is reported with no old value and a removed one with no new value.
+    """
+    changes = []
+    for section in sections:
+        before, after = old.get(section) or {}, new.get(section) or {}
+        for field in sorted(set(before) | set(after)):
+            if before.get(field) != after.get(field):
+                changes.append((section, field, before.get(field), after.get(field)))
+    return changes
+
+
+def fingerprint(section_hashes):
+    return hashlib.sha1(json.dumps(section_hashes, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def add_watch(params, interval_seconds):
+    """Watch a case given its keys or a stored CNR number; returns ``(watch, created)``.
+
+    A CNR number is resolved to case keys through the stored search it was
+    seen on, so it must have been looked up once before.
+    """
+    try:
+        interval_seconds = int(interval_seconds)
+    except (TypeError, ValueError):
+        raise WatchError('interval_seconds must be a number')
+    if interval_seconds <= 0:
+        raise WatchError('interval_seconds must be positive')
+    for field in ('cnr_number', 'case_type', 'court_type', 'state'):
+        if params.get(field) is not None and not isinstance(params[field], str):
+            raise WatchError(f'{field} must be a string')
+    if params.get('case_number') is not None and not isinstance(params['case_number'], (str, int)):
+        raise WatchError('case_number must be a string or number')
+    cnr_number = (params.get('cnr_number') or '').strip() or None
+    if cnr_number and not params.get('case_number'):
+        search = (CaseSearch.query.join(CaseDetail)
+                  .filter(CaseDetail.cnr_number == cnr_number)
+                  .order_by(CaseSearch.search_date.desc())
+                  .first())
+        if search is None:
+            raise WatchError(f'Unknown CNR number {cnr_number}; look the case up once first')
+        params = {'case_type': search.case_type, 'case_number': search.case_number, 'year': search.year,
+                  'court_type': search.court_type, 'state': params.get('state')}
+    if not all(params.get(k) for k in ('case_type', 'case_number', 'year')):
+        raise WatchError('Missing required fields')
+    try:
+        year = int(params['year'])
+    except (TypeError, ValueError):
+        raise WatchError('Year must be a number')
+    key = {'case_type': params['case_type'].strip(), 'case_number': str(params['case_number']).strip(),
+           'year': year, 'court_type': params.get('court_type') or 'high_court', 'state': params.get('state')}
+    watch = WatchedCase.query.filter_by(**key).first()
+    if watch is not None:
+        watch.active = True
+        watch.interval_seconds = interval_seconds
+        db.session.commit()
+        return watch, False
+    watch = WatchedCase(cnr_number=cnr_number, interval_seconds=interval_seconds, next_check_at=datetime.utcnow(),
+                        **key)
+    db.session.add(watch)
+    db.session.commit()
+    return watch, True
+
+
+class Watcher:
+    """Poll watched cases and record what changed.
+
+    Each check fetches the case page and hashes the sections the parser reads
+    (``case_parser.section_fingerprints``). When the hashes match the last
+    check, nothing is parsed or written beyond the watch's schedule. When
+    they differ, the page is parsed, the sections whose hash changed are
+    diffed against the stored snapshot, and only the changed fields are
+    written: one ``case_changes`` row each, plus an in-place update of the
+    watch's stored case. ``on_change(watch, changes)`` is then called with
+    the change dicts.
+
+    Due watches are claimed by pushing their ``next_check_at`` forward with a
+    conditional update, so processes running the scheduler side by side do
+    not check the same case twice.
+    """
+
+    def __init__(self, app, scrapers, interval=60, workers=2, retry_seconds=600, on_change=None):
+        self.app = app
+        self.scrapers = scrapers  # () -> context manager yielding a CourtScraper
+        self.interval = interval
+        self.workers = workers
+        self.retry_seconds = retry_seconds
+        self.on_change = on_change
+        self._wake = threading.Condition()
+        self._stopped = False
+        self._lock = threading.Lock()
+        self.stats = {'runs': 0, 'checked': 0, 'unchanged': 0, 'baseline': 0, 'changed': 0, 'failed': 0,
+                      'changes': 0, 'last_run': None}
+
+    def start(self):
+        threading.Thread(target=self._loop, name='watchlist', daemon=True).start()
+        logger.info("Checking watched cases every %ds with %d workers", self.interval, self.workers)
+
+    def stop(self):
+        with self._wake:
+            self._stopped = True
+            self._wake.notify_all()
+
+    def claim_due(self, limit):
+        """Ids of up to ``limit`` due watches, each claimed for ``retry_seconds``."""
+        now = datetime.utcnow()
+        ids = [watch_id for (watch_id,) in db.session.query(WatchedCase.id)
+               .filter(WatchedCase.active.is_(True), WatchedCase.next_check_at <= now)
+               .order_by(WatchedCase.next_check_at)
+               .limit(limit)]
+        claimed = []
+        for watch_id in ids:
+            if (WatchedCase.query
+                    .filter(WatchedCase.id == watch_id, WatchedCase.next_check_at <= now)
+                    .update({'next_check_at': now + timedelta(seconds=self.retry_seconds)},
+                            synchronize_session=False)):
+                claimed.append(watch_id)
+        db.session.commit()
+        return claimed
+
+    def check(self, watch_id):
+        """Fetch one watched case and record its changes; returns the outcome and change list."""
+        watch = db.session.get(WatchedCase, watch_id)
+        if watch is None:
+            return {'result': 'missing', 'changes': []}
+        params = watch.params()
+        try:
+            with self.scrapers() as scraper:
+                html, url, backend = scraper.fetch_case_page(**params)
+                section_hashes = section_fingerprints(html)
+                if section_hashes is None:
+                    raise ValueError('Page has no case details')
+                case_data = None
+                if fingerprint(section_hashes) != watch.fingerprint or watch.search_id is None:
+                    case_data = scraper.case_data_from_page(html, url, backend, **params)
+            outcome = self._record(watch, section_hashes, case_data)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Watch %s check failed: %s", watch_id, traceback.format_exc())
+            watch = db.session.get(WatchedCase, watch_id)
+            watch.failures += 1
+            watch.last_error = str(e) or type(e).__name__
+            watch.last_checked_at = datetime.utcnow()
+            watch.next_check_at = watch.last_checked_at + timedelta(seconds=self.retry_seconds)
+            db.session.commit()
+            outcome = {'result': 'failed', 'error': watch.last_error, 'changes': []}
+        WATCH_CHECKS.inc(result=outcome['result'])
+        with self._lock:
+            self.stats['checked'] += 1
+            self.stats[outcome['result']] += 1
+            self.stats['changes'] += len(outcome['changes'])
+        if outcome['changes'] and self.on_change:
+            try:
+                self.on_change(watch.to_dict(), outcome['changes'])
+            except Exception:
+                logger.error("Watch %s change handler failed: %s", watch_id, traceback.format_exc())
+        return outcome
+
+    def _record(self, watch, section_hashes, case_data):
+        now = datetime.utcnow()
+        watch.last_checked_at = now
+        watch.next_check_at = now + timedelta(seconds=watch.interval_seconds)
+        watch.failures, watch.last_error = 0, None
+        changes = []
+        if case_data is None:
+            result = 'unchanged'
+            # The stored case was just confirmed current; let lookups reuse it.
+            CaseSearch.query.filter_by(id=watch.search_id).update({'search_date': now}, synchronize_session=False)
+        elif watch.search_id is None:
+            result = 'baseline'
+            watch.search_id = save_case_graph(watch.params(), case_data).id
+            watch.cnr_number = watch.cnr_number or case_data['case_details'].get('cnr_number')
+            watch.snapshot = json.dumps(case_snapshot(case_data))
+        else:
+            result = 'changed'
+            old_hashes = json.loads(watch.section_hashes or '{}')
+            sections = [s for s in SECTIONS if old_hashes.get(s) != section_hashes.get(s)]
+            snapshot = case_snapshot(case_data)
+            diff = diff_snapshots(json.loads(watch.snapshot or '{}'), snapshot, sections)
+            if diff:
+                upsert_case_graphs([(watch.search_id, case_data)])
+                watch.last_changed_at = now
+                rows = [{'watch_id': watch.id, 'search_id': watch.search_id, 'section': section, 'field': field,
+                         'old_value': json.dumps(old) if old is not None else None,
+                         'new_value': json.dumps(new) if new is not None else None, 'detected_at': now}
+                        for section, field, old, new in diff]
+                db.session.execute(insert(CaseChange), rows)
+                changes = [{'section': section, 'field': field, 'old': old, 'new': new}
+                           for section, field, old, new in diff]
+                for section in {section for section, _, _, _ in diff}:
+                    WATCH_CHANGES.inc(section=section)
+            else:
+                result = 'unchanged'  # only markup the parser ignores moved
+            CaseSearch.query.filter_by(id=watch.search_id).update(
+                {'search_date': now, 'raw_response_path': case_data.get('raw_response_path')},
+                synchronize_session=False)
+            watch.snapshot = json.dumps(snapshot)
+        watch.section_hashes = json.dumps(section_hashes)
+        watch.fingerprint = fingerprint(section_hashes)
+        db.session.commit()
+        return {'result': result, 'changes': changes}
+
+    def run_once(self, limit=None):
+        """Check every due watch once; returns this pass's outcome counts."""
+        ids = self.claim_due(limit or self.workers * 10)
+        counts = {'checked': 0, 'unchanged': 0, 'baseline': 0, 'changed': 0, 'failed': 0}
+
+        def check(watch_id):
+            with self.app.app_context():
+                return self.check(watch_id)
+
+        if ids:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(ids)), thread_name_prefix='watchlist') as pool:
+                for outcome in pool.map(check, ids):
+                    counts['checked'] += 1
+                    if outcome['result'] in counts:
+                        counts[outcome['result']] += 1
+        with self._lock:
+            self.stats['runs'] += 1
+            self.stats['last_run'] = datetime.utcnow().isoformat()
+        if ids:
+            logger.info("Watchlist check: %s", counts)
+        return counts
+
+    def _loop(self):
+        while not self._stopped:
+            try:
+                with self.app.app_context():
+                    # Keep going while a pass fills its claim limit so a backlog drains promptly.
+                    while self.run_once()['checked'] >= self.workers * 10 and not self._stopped:
+                        pass
+            except Exception:
+                logger.error("Watchlist error: %s", traceback.format_exc())
+            with self._wake:
+                if not self._stopped:
+                    self._wake.wait(self.interval)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(interval=self.interval, workers=self.workers)
+        return stats
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def make_watcher(app, scrapers, on_change=None):
+    config = app.config
+    return Watcher(
+        app, scrapers,
+        interval=config.get('WATCH_POLL_INTERVAL', 0),
+        workers=config.get('WATCH_WORKERS', 2),
+        retry_seconds=config.get('WATCH_RETRY_SECONDS', 600),
+        on_change=on_change,
+    )
+
+
+def get_watcher(app, scrapers, on_change=None):
+    """Return the process-wide watcher, started on first use, or None when polling is disabled."""
+    global _watcher
+    if app.config.get('WATCH_POLL_INTERVAL', 0) <= 0:
+        return None
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = make_watcher(app, scrapers, on_change)
+            _watcher.start()
+        return _watcher